@@ -1,4 +1,5 @@
 # app.py - PostgreSQL VERSION
+import os
 import logging
 import asyncio
 from aiogram import executor
@@ -22,9 +23,37 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# users_db pool va tarix navbati holati shu oraliqda log ga yoziladi (0 — o'chiq)
+POOL_STATS_LOG_INTERVAL = float(os.getenv('POOL_STATS_LOG_INTERVAL', '300'))
+
+_pool_stats_task = None
+
+
+async def _log_pool_stats(interval):
+    """Pool to'lganligi va tarix navbatini davriy log qilish"""
+    from utils.db_api.async_user_database import pool_stats
+    from utils.db_api.history_writer import history_writer
+
+    while True:
+        await asyncio.sleep(interval)
+        pool = pool_stats()
+        history = history_writer.stats()
+        if not pool['active']:
+            continue
+        level = logging.WARNING if pool['waiting'] or pool['saturation'] >= 0.9 else logging.INFO
+        logger.log(
+            level,
+            f"📈 users_db pool: {pool['in_use']}/{pool['max_size']} band, "
+            f"kutayotgan {pool['waiting']}, timeout {pool['timeouts']}, "
+            f"kutish o'rt. {pool['avg_wait_ms']:.1f} ms / maks. {pool['max_wait_ms']:.1f} ms | "
+            f"tarix navbati: {history['queued']} ta, yozildi {history['written']}, "
+            f"xato {history['failed']}" + ("" if history['running'] else " (to'xtagan)")
+        )
+
 
 async def on_startup(dispatcher):
     """Bot ishga tushganda"""
+    global _pool_stats_task
     # ── Bot API HTTP server (Django uchun) ──────────────────
     try:
         from data.config import BOT_API_PORT
@@ -44,7 +73,7 @@ async def on_startup(dispatcher):
     # 1. POSTGRESQL PHONES DATABASE
     # ============================================
     try:
-        from utils.db_api.database import init_db, test_connection
+        from utils.db_api.database import init_db, test_connection, check_price_lookup_plan
 
         # Avval ulanishni tekshirish
         logger.info("🔄 PostgreSQL ga ulanish tekshirilmoqda...")
@@ -55,6 +84,29 @@ async def on_startup(dispatcher):
             logger.info("🔄 Database strukturasi tekshirilmoqda...")
             init_db()
             logger.info("✅ phones_db tayyor!")
+
+            # get_price() covering indeksdan foydalanayotganini tekshirish
+            try:
+                plan_ok, scans = check_price_lookup_plan()
+                if plan_ok is False:
+                    logger.warning(f"⚠️ get_price rejasi Index Only Scan emas: {scans}")
+                elif plan_ok:
+                    logger.info("✅ get_price: Index Only Scan (covering indeks)")
+            except Exception as e:
+                logger.warning(f"⚠️ get_price rejasini tekshirishda xato: {e}")
+
+            # Handlerlar uchun async pool
+            from utils.db_api.async_database import create_pool
+            pool = await create_pool()
+
+            # Narxlar indeksi (get_price xotiradan ishlaydi)
+            from utils.db_api.price_index import price_index
+            await price_index.load(pool)
+            price_index.start(pool)
+
+            # Katalog keshi — NOTIFY bilan tozalanadi
+            from utils.db_api.catalog_listener import start_listener
+            start_listener()
         else:
             logger.error("❌ PostgreSQL ga ulanib bo'lmadi!")
             logger.error("⚠️ .env faylni tekshiring!")
@@ -77,6 +129,21 @@ async def on_startup(dispatcher):
         from utils.db_api.user_database import init_user_db
         init_user_db()
         logger.info("✅ stats.db yaratildi!")
+
+        # Handlerlar uchun async pool (balans, narxlash)
+        from utils.db_api.async_user_database import create_user_pool
+        user_pool = await create_user_pool()
+
+        # pricing_history write-behind navbati
+        from utils.db_api.history_writer import history_writer
+        history_writer.start(user_pool)
+
+        # Admin statistikasi uchun kunlik jamlanmalar
+        from utils.db_api.stats_rollup import stats_rollup
+        stats_rollup.start(user_pool)
+
+        if POOL_STATS_LOG_INTERVAL > 0 and _pool_stats_task is None:
+            _pool_stats_task = asyncio.create_task(_log_pool_stats(POOL_STATS_LOG_INTERVAL))
     except ImportError:
         logger.warning("⚠️ user_database.py topilmadi, statistika o'chirilgan")
     except Exception as e:
@@ -123,6 +190,7 @@ async def on_startup(dispatcher):
 
 async def on_shutdown(dispatcher):
     """Bot to'xtaganda"""
+    global _pool_stats_task
 
     logger.warning("=" * 60)
     logger.warning("⛔ BOT TO'XTATILMOQDA...")
@@ -167,14 +235,48 @@ async def on_shutdown(dispatcher):
     # ============================================
     logger.info("🔄 Connection'lar yopilmoqda...")
 
+    # Fon importlari bot va pool lardan foydalanadi — avval ular
+    try:
+        from handlers.users.admin import stop_import_jobs
+        await stop_import_jobs()
+    except Exception as e:
+        logger.error(f"❌ Import vazifalarini to'xtatishda xato: {e}")
+
     try:
         await bot.close()
         logger.info("✅ Bot connection yopildi")
     except Exception as e:
         logger.error(f"❌ Bot connection yopishda xato: {e}")
 
-    # PostgreSQL connection'larni yopish kerak emas
-    # Chunki har bir funksiya o'z connection'ini ochadi va yopadi
+    try:
+        from utils.db_api.async_database import close_pool
+        from utils.db_api.price_index import price_index
+        from utils.db_api.catalog_listener import stop_listener
+        await stop_listener()
+        await price_index.stop()
+        await close_pool()
+    except Exception as e:
+        logger.error(f"❌ phones_db pool yopishda xato: {e}")
+
+    try:
+        from utils.db_api.async_user_database import close_user_pool
+        from utils.db_api.history_writer import history_writer
+        from utils.db_api.stats_rollup import stats_rollup
+        if _pool_stats_task is not None:
+            _pool_stats_task.cancel()
+            _pool_stats_task = None
+        await stats_rollup.stop()
+        # Avval navbatdagi tarix qatorlari yoziladi, keyin pool yopiladi
+        await history_writer.stop()
+        await close_user_pool()
+    except Exception as e:
+        logger.error(f"❌ users_db pool yopishda xato: {e}")
+
+    try:
+        from utils.price_import import shutdown_import_executor
+        shutdown_import_executor()
+    except Exception as e:
+        logger.error(f"❌ Import process pool yopishda xato: {e}")
 
     logger.warning("=" * 60)
     logger.warning("✅ BOT TO'LIQ TO'XTATILDI!")
@@ -2,9 +2,9 @@
 import os
 import re
 import asyncio
+import logging
 import traceback
 from datetime import datetime
-import pandas as pd
 from aiogram import types
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
@@ -29,9 +29,13 @@ from utils.db_api.database import (
     add_price_record,
     clear_all_prices,
     get_total_prices_count,
-    normalize_damage_format,
     get_conn
 )
+from utils.db_api.async_database import get_pool, get_total_prices_count as get_total_prices_count_async
+from utils.db_api.async_user_database import pool_stats as user_pool_stats
+from utils.db_api.history_writer import history_writer
+from utils.price_import import import_price_sheet, get_import_executor, new_progress_queue, next_progress_event
+from utils.db_api.price_index import price_index
 
 # ============================================
 # USER DATABASE IMPORT
@@ -55,8 +59,14 @@ from utils.misc.maintenance import get_maintenance_config, toggle_feature, is_fe
 # KONSTANTALAR (OPTIMIZED)
 # ============================================
 MAX_FILE_SIZE_MB = 50
-BATCH_SIZE = 10000  # Katta batch = kamroq database query
-PROGRESS_UPDATE_INTERVAL = 2000  # Kamroq yangilanish = tezroq ishlash
+# on_shutdown da tugallanmagan importlarni kutish vaqti (soniya)
+IMPORT_SHUTDOWN_TIMEOUT = float(os.getenv('IMPORT_SHUTDOWN_TIMEOUT', '30'))
+
+logger = logging.getLogger(__name__)
+
+# Fon import vazifalari — event loop vazifalarga faqat kuchsiz havola
+# saqlaydi, shuning uchun ular shu yerda ushlab turiladi
+_import_tasks = set()
 
 
 # ============================================
@@ -96,147 +106,6 @@ async def safe_edit_message(progress_msg, text, parse_mode="HTML"):
         pass
 
 
-def get_cell_value(row, col_name, default=''):
-    """Excel katak qiymatini olish"""
-    try:
-        val = row[col_name]
-        if pd.isna(val):
-            return str(default)
-        return str(val).strip()
-    except:
-        return str(default)
-
-
-def detect_columns(df_columns):
-    """Ustunlarni avtomatik aniqlash"""
-    mapping = {
-        'model': None,
-        'storage': None,
-        'color': None,
-        'sim': None,
-        'battery': None,
-        'box': None,
-        'damage': None,
-        'price': None
-    }
-
-    # Model
-    for col in df_columns:
-        col_lower = col.lower()
-        if 'model' in col_lower or 'телефон' in col_lower:
-            mapping['model'] = col
-            break
-
-    # Storage
-    for col in df_columns:
-        col_lower = col.lower()
-        if 'xotira' in col_lower or 'storage' in col_lower or 'память' in col_lower or 'gb' in col_lower:
-            mapping['storage'] = col
-            break
-
-    # Color
-    for col in df_columns:
-        col_lower = col.lower()
-        if 'rang' in col_lower or 'color' in col_lower or 'цвет' in col_lower:
-            mapping['color'] = col
-            break
-
-    # SIM
-    for col in df_columns:
-        col_lower = col.lower()
-        if 'sim' in col_lower:
-            mapping['sim'] = col
-            break
-
-    # Battery
-    for col in df_columns:
-        col_lower = col.lower()
-        if 'batar' in col_lower or 'battery' in col_lower or 'батарея' in col_lower or 'akkum' in col_lower:
-            mapping['battery'] = col
-            break
-
-    # Box
-    for col in df_columns:
-        col_lower = col.lower()
-        if 'quti' in col_lower or 'box' in col_lower or 'коробка' in col_lower:
-            mapping['box'] = col
-            break
-
-    # Damage
-    for col in df_columns:
-        col_lower = col.lower()
-        if 'qism' in col_lower or 'damage' in col_lower or 'повреж' in col_lower or 'част' in col_lower:
-            mapping['damage'] = col
-            break
-
-    # Price
-    for col in df_columns:
-        col_lower = col.lower()
-        if 'narx' in col_lower or 'price' in col_lower or 'цена' in col_lower or 'сум' in col_lower or 'usd' in col_lower:
-            mapping['price'] = col
-            break
-
-    return mapping
-
-
-# ============================================
-# BULK INSERT FUNKSIYASI (TEZKOR)
-# ============================================
-
-def bulk_insert_prices(prices_batch):
-    """
-    Bir nechta narxlarni bir vaqtning o'zida qo'shish
-    PostgreSQL COPY yoki VALUES bilan - 10x tezroq!
-    """
-    if not prices_batch:
-        return 0
-
-    try:
-        conn = get_conn()
-        cursor = conn.cursor()
-
-        # VALUES qismini tayyorlash
-        values_list = []
-        for item in prices_batch:
-            values_list.append(
-                f"({item['model_id']}, "
-                f"'{item['storage_size']}', "
-                f"'{item['color_name']}', "
-                f"'{item['sim_type']}', "
-                f"'{item['battery_label']}', "
-                f"{item['has_box']}, "
-                f"'{item['damage_pct']}', "
-                f"{item['price']}, "
-                f"CURRENT_TIMESTAMP, "
-                f"CURRENT_TIMESTAMP)"
-            )
-
-        values_str = ','.join(values_list)
-
-        # Bir SQL bilan hammасini qo'shish
-        query = f"""
-            INSERT INTO prices 
-            (model_id, storage_size, color_name, sim_type, battery_label, 
-             has_box, damage_pct, price, created_at, updated_at)
-            VALUES {values_str}
-            ON CONFLICT (model_id, storage_size, color_name, sim_type, battery_label, has_box, damage_pct)
-            DO UPDATE SET 
-                price = EXCLUDED.price,
-                updated_at = EXCLUDED.updated_at
-        """
-
-        cursor.execute(query)
-        conn.commit()
-
-        inserted = cursor.rowcount
-        cursor.close()
-        conn.close()
-
-        return inserted
-
-    except Exception as e:
-        print(f"Bulk insert error: {e}")
-        return 0
 
 
 # ============================================
@@ -290,48 +159,132 @@ async def process_import(message: types.Message, state: FSMContext):
     )
 
     file_path = f"temp_{user_id}_{datetime.now().timestamp()}.xlsx"
-    start_time = datetime.now()
 
+    # ============================================
+    # 2. FAYLNI YUKLAB OLISH
+    # ============================================
     try:
-        # ============================================
-        # 2. FAYLNI YUKLAB OLISH
-        # ============================================
-        try:
-            await asyncio.wait_for(
-                message.document.download(destination_file=file_path),
-                timeout=300.0
-            )
-        except asyncio.TimeoutError:
+        await asyncio.wait_for(
+            message.document.download(destination_file=file_path),
+            timeout=300.0
+        )
+    except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
             await message.answer("❌ Fayl yuklanish vaqti tugadi (5 min). Kichikroq fayl yuboring!")
-            return
-        except Exception as e:
+        else:
             await message.answer(f"❌ Fayl yuklanishda xato: {e}")
-            return
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        await state.finish()
+        return
+
+    # ============================================
+    # 3. FON VAZIFA — bot boshqa foydalanuvchilarga javob berishda davom etadi
+    # ============================================
+    await state.finish()
+    task = asyncio.create_task(run_import_job(message, progress_msg, file_path))
+    _import_tasks.add(task)
+    task.add_done_callback(_on_import_done)
+
+
+def _on_import_done(task):
+    """Import vazifasi tugadi: ro'yxatdan olib tashlash va xatoni log qilish"""
+    _import_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("❌ Import vazifasi xato bilan tugadi", exc_info=task.exception())
 
-        await safe_edit_message(progress_msg, "📊 O'qilmoqda...")
+
+async def stop_import_jobs(timeout=IMPORT_SHUTDOWN_TIMEOUT):
+    """Tugallanmagan importlarni kutish, vaqt tugasa bekor qilish (on_shutdown)"""
+    if not _import_tasks:
+        return
+    logger.info(f"🔄 {len(_import_tasks)} ta import tugashi kutilmoqda...")
+    tasks = list(_import_tasks)
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.warning(f"⚠️ {len(pending)} ta import bekor qilindi")
+
+
+def _format_import_progress(event, start_time):
+    """import_price_sheet() hodisasini progress matniga aylantirish"""
+    kind = event[0]
+
+    if kind == 'merge':
+        return (
+            f"🔄 <b>Bazaga birlashtirilmoqda...</b>\n"
+            f"📊 {event[1]:,} ta"
+        )
+
+    _, staged, total = event
+    elapsed = (datetime.now() - start_time).total_seconds()
+    speed = staged / elapsed if elapsed > 0 else 0
+
+    # total — varaq o'lchamidan taxmin, noma'lum bo'lishi mumkin
+    if total:
+        progress_percent = min(staged / total * 100, 100)
+        progress_bar = "█" * int(progress_percent / 5) + "░" * (20 - int(progress_percent / 5))
+        remaining = max(total - staged, 0) / speed if speed > 0 else 0
+        return (
+            f"💾 <b>Yuklanmoqda...</b>\n\n"
+            f"[{progress_bar}] {progress_percent:.1f}%\n\n"
+            f"✅ <b>{staged:,}</b> / ~{total:,}\n"
+            f"⚡ {speed:.0f} ta/sek\n"
+            f"🕐 ~{int(remaining)}s"
+        )
+
+    return (
+        f"💾 <b>Yuklanmoqda...</b>\n\n"
+        f"✅ <b>{staged:,}</b> ta\n"
+        f"⚡ {speed:.0f} ta/sek"
+    )
+
+
+async def run_import_job(message: types.Message, progress_msg, file_path):
+    """Import fon vazifasi: o'qish va yozish — bitta process pool worker da"""
+    loop = asyncio.get_running_loop()
+    start_time = datetime.now()
+
+    try:
+        await safe_edit_message(
+            progress_msg,
+            f"💾 <b>Narxlar yuklanmoqda...</b>\n"
+            f"⚡ Tezkor rejim (COPY)",
+            parse_mode="HTML"
+        )
 
         # ============================================
-        # 3. EXCEL NI O'QISH
+        # 4. O'QISH VA YOZISH (process pool, progress — Manager navbati orqali)
         # ============================================
+        progress = new_progress_queue()
+        job = loop.run_in_executor(get_import_executor(), import_price_sheet, file_path, progress)
+        job.add_done_callback(lambda _: progress.put(None))
+
+        while True:
+            event = await asyncio.to_thread(next_progress_event, progress)
+            if event is None:
+                break
+            await safe_edit_message(
+                progress_msg,
+                _format_import_progress(event, start_time),
+                parse_mode="HTML"
+            )
+
         try:
-            df = pd.read_excel(file_path, dtype=str, engine='openpyxl')
-            df.columns = [str(c).strip() for c in df.columns]
+            result = await job
         except Exception as e:
-            await message.answer(f"❌ Excel o'qishda xato: {e}")
+            await message.answer(f"❌ Excel importida xato: {e}")
             return
 
-        total_rows = len(df)
+        total_rows = result['total_rows']
 
         if total_rows == 0:
             await message.answer("❌ Fayl bo'sh!")
             return
 
-        # ============================================
-        # 4. USTUNLARNI ANIQLASH
-        # ============================================
-        col_map = detect_columns(df.columns)
-
-        if not col_map['model'] or not col_map['price']:
+        if not result['can_parse']:
             await message.answer(
                 "❌ <b>Zarur ustunlar topilmadi!</b>\n\n"
                 "Kerakli ustunlar:\n"
@@ -341,255 +294,19 @@ async def process_import(message: types.Message, state: FSMContext):
             )
             return
 
-        await safe_edit_message(
-            progress_msg,
-            f"🔄 <b>Tayyorlanmoqda...</b>\n"
-            f"📊 Qatorlar: {total_rows:,}",
-            parse_mode="HTML"
-        )
-
-        # ============================================
-        # 5. MA'LUMOTLARNI TAYYORLASH
-        # ============================================
-        models_to_add = set()
-        prices_data = []
-        skipped = 0
-
-        for index, row in df.iterrows():
-            model_name = get_cell_value(row, col_map['model'])
-            if not model_name:
-                skipped += 1
-                continue
-
-            price_raw = get_cell_value(row, col_map['price'], '0')
-            price_clean = re.sub(r'[^\d.]', '', price_raw)
-            price = float(price_clean) if price_clean else 0
-
-            if price <= 0:
-                skipped += 1
-                continue
-
-            models_to_add.add(model_name)
-
-            storage = get_cell_value(row, col_map['storage'], '128GB') if col_map['storage'] else '128GB'
-            color = get_cell_value(row, col_map['color'], '') if col_map['color'] else ''
-
-            sim_raw = get_cell_value(row, col_map['sim'], 'physical') if col_map['sim'] else 'physical'
-            sim_type = 'esim' if 'esim' in sim_raw.lower() else 'physical'
-
-            battery = get_cell_value(row, col_map['battery'], '100%') if col_map['battery'] else '100%'
-
-            box_raw = get_cell_value(row, col_map['box'], 'Bor') if col_map['box'] else 'Bor'
-            has_box = any(x in box_raw.lower() for x in ['bor', 'ha', 'yes', '1'])
-
-            damage_raw = get_cell_value(row, col_map['damage'], 'Yangi') if col_map['damage'] else 'Yangi'
-            damage = normalize_damage_format(damage_raw)
-
-            prices_data.append({
-                'model': model_name,
-                'storage': storage,
-                'color': color,
-                'sim': sim_type,
-                'battery': battery,
-                'box': has_box,
-                'damage': damage,
-                'price': price
-            })
-
-        valid_count = len(prices_data)
-
-        if valid_count == 0:
+        if result['valid_count'] == 0:
             await message.answer("❌ Yaroqli ma'lumotlar topilmadi!")
             return
 
-        # ============================================
-        # 6. MODELLAR VA PARAMETRLARNI QO'SHISH
-        # ============================================
-        await safe_edit_message(
-            progress_msg,
-            f"📱 <b>Modellar qo'shilmoqda...</b>\n"
-            f"📊 {len(models_to_add)} ta model",
-            parse_mode="HTML"
-        )
-
-        model_ids = {}
-        unique_storages = {}
-        unique_colors = {}
-        unique_batteries = {}
-        unique_sim_types = {}
-
-        try:
-            conn = get_conn()
-            cursor = conn.cursor()
-
-            # Modellarni qo'shish
-            for model_name in models_to_add:
-                cursor.execute(
-                    "INSERT INTO models (name) VALUES (%s) ON CONFLICT (name) DO NOTHING RETURNING id",
-                    (model_name,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    model_ids[model_name] = result[0]
-                else:
-                    cursor.execute("SELECT id FROM models WHERE name = %s", (model_name,))
-                    model_ids[model_name] = cursor.fetchone()[0]
-
-            conn.commit()
-
-            # Parametrlarni yig'ish
-            for item in prices_data:
-                model_name = item['model']
-                model_id = model_ids.get(model_name)
-
-                if not model_id:
-                    continue
-
-                if model_id not in unique_storages:
-                    unique_storages[model_id] = set()
-                unique_storages[model_id].add(item['storage'])
-
-                if model_id not in unique_colors:
-                    unique_colors[model_id] = set()
-                if item['color']:
-                    unique_colors[model_id].add(item['color'])
-
-                if model_id not in unique_batteries:
-                    unique_batteries[model_id] = set()
-                unique_batteries[model_id].add(item['battery'])
-
-                if model_id not in unique_sim_types:
-                    unique_sim_types[model_id] = set()
-                unique_sim_types[model_id].add(item['sim'])
-
-            # Parametrlarni qo'shish
-            for model_id, storages in unique_storages.items():
-                for storage in storages:
-                    cursor.execute(
-                        "INSERT INTO storages (model_id, size) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                        (model_id, storage)
-                    )
-
-            for model_id, colors in unique_colors.items():
-                for color in colors:
-                    cursor.execute(
-                        "INSERT INTO colors (model_id, name) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                        (model_id, color)
-                    )
-
-            for model_id, batteries in unique_batteries.items():
-                for battery in batteries:
-                    cursor.execute(
-                        "INSERT INTO batteries (model_id, label) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                        (model_id, battery)
-                    )
-
-            for model_id, sim_types in unique_sim_types.items():
-                for sim_type in sim_types:
-                    cursor.execute(
-                        "INSERT INTO sim_types (model_id, type) VALUES (%s, %s) ON CONFLICT DO NOTHING",
-                        (model_id, sim_type)
-                    )
-
-            conn.commit()
-            cursor.close()
-            conn.close()
-
-        except Exception as e:
-            print(f"Models/params error: {e}")
-            conn.rollback()
+        skipped = result['skipped']
+        success_count = result['success_count']
+        error_count = result['error_count']
 
         # ============================================
-        # 7. NARXLARNI BULK INSERT
-        # ============================================
-        await safe_edit_message(
-            progress_msg,
-            f"💾 <b>Narxlar yuklanmoqda...</b>\n"
-            f"⚡ Tezkor rejim\n"
-            f"📊 {valid_count:,} ta",
-            parse_mode="HTML"
-        )
-
-        success_count = 0
-        error_count = 0
-        last_update_time = datetime.now()
-        bulk_batch = []
-
-        for i, item in enumerate(prices_data):
-            model_id = model_ids.get(item['model'])
-            if not model_id:
-                error_count += 1
-                continue
-
-            damage_normalized = item['damage']
-            if not damage_normalized or damage_normalized.lower() in ['yangi', 'nan', 'none']:
-                damage_normalized = "Yangi"
-            else:
-                damage_normalized = normalize_damage_format(damage_normalized)
-
-            bulk_batch.append({
-                'model_id': model_id,
-                'storage_size': item['storage'].replace("'", "''"),
-                'color_name': item['color'].replace("'", "''"),
-                'sim_type': item['sim'],
-                'battery_label': item['battery'].replace("'", "''"),
-                'has_box': 'TRUE' if item['box'] else 'FALSE',
-                'damage_pct': damage_normalized.replace("'", "''"),
-                'price': item['price']
-            })
-
-            if len(bulk_batch) >= BATCH_SIZE or i == len(prices_data) - 1:
-                # Dublikatlarni tozalash
-                unique_batch = []
-                seen_keys = set()
-
-                for batch_item in bulk_batch:
-                    key = (
-                        batch_item['model_id'],
-                        batch_item['storage_size'],
-                        batch_item['color_name'],
-                        batch_item['sim_type'],
-                        batch_item['battery_label'],
-                        batch_item['has_box'],
-                        batch_item['damage_pct']
-                    )
-
-                    if key not in seen_keys:
-                        seen_keys.add(key)
-                        unique_batch.append(batch_item)
-
-                if unique_batch:
-                    inserted = bulk_insert_prices(unique_batch)
-                    success_count += inserted
-
-                # Progress yangilash
-                now = datetime.now()
-                if (i % PROGRESS_UPDATE_INTERVAL == 0) or i == len(prices_data) - 1:
-                    elapsed = (now - start_time).total_seconds()
-                    speed = success_count / elapsed if elapsed > 0 else 0
-                    remaining = (valid_count - i) / speed if speed > 0 else 0
-
-                    progress_percent = ((i + 1) / valid_count) * 100
-                    progress_bar = "█" * int(progress_percent / 5) + "░" * (20 - int(progress_percent / 5))
-
-                    await safe_edit_message(
-                        progress_msg,
-                        f"💾 <b>Yuklanmoqda...</b>\n\n"
-                        f"[{progress_bar}] {progress_percent:.1f}%\n\n"
-                        f"✅ <b>{success_count:,}</b> / {valid_count:,}\n"
-                        f"⚡ {speed:.0f} ta/sek\n"
-                        f"🕐 ~{int(remaining)}s",
-                        parse_mode="HTML"
-                    )
-                    last_update_time = now
-
-                bulk_batch = []
-
-        # ============================================
-        # 8. YAKUNIY NATIJA
+        # 5. YAKUNIY NATIJA
         # ============================================
         total_time = (datetime.now() - start_time).total_seconds()
-        total_prices = get_total_prices_count()
+        total_prices = await get_total_prices_count_async()
 
         await message.answer(
             f"✅ <b>Import yakunlandi!</b>\n\n"
@@ -619,8 +336,6 @@ async def process_import(message: types.Message, state: FSMContext):
         if os.path.exists(file_path):
             os.remove(file_path)
 
-        await state.finish()
-
 
 # ============================================
 # TOZALASH
@@ -651,6 +366,7 @@ async def cleanup_confirm(message: types.Message, state: FSMContext):
 
         try:
             if clear_all_prices():
+                await price_index.load(get_pool())
                 await progress_msg.edit_text(
                     "✅ <b>Barcha narxlar tozalandi!</b>",
                     parse_mode="HTML"
@@ -671,6 +387,13 @@ async def cleanup_confirm(message: types.Message, state: FSMContext):
 # STATISTIKA MENU - YANGI!
 # ============================================
 
+def _rollup_note(stats):
+    """Kunlik jamlanma hali to'ldirilayotgan bo'lsa ogohlantirish qatori"""
+    if stats.get('rollup_ready', True):
+        return ""
+    return "⏳ <i>Kunlik jamlanma tayyorlanmoqda — sonlar to'g'ridan-to'g'ri hisoblandi</i>\n"
+
+
 def _stats_keyboard():
     # Hammasi KO'K: bu — ko'rish uchun ro'yxat, hech biri hech narsani
     # o'zgartirmaydi, ya'ni birontasini ajratib ko'rsatishga asos yo'q.
@@ -711,6 +434,7 @@ async def stats_command(message: types.Message):
         f"  • Jami: <b>{total_pricings:,}</b>\n"
         f"  • Bugun aktiv: <b>{stats['today_active_users']}</b>\n"
         f"  • Oy aktiv: <b>{stats['month_active_users']:,}</b>\n\n"
+        f"{_rollup_note(stats)}"
         f"⏰ <i>{result['timestamp']}</i>"
     )
     await message.answer(text, parse_mode="HTML", reply_markup=_stats_keyboard())
@@ -731,6 +455,27 @@ async def show_statistics_menu(message: types.Message):
 # DATABASE STATISTIKASI
 # ============================================
 
+def _user_pool_text():
+    """users_db pool va pricing_history navbati holati (DB statistikasi uchun)"""
+    pool = user_pool_stats()
+    if not pool['active']:
+        return "<b>👥 users_db pool:</b> ishlamayapti\n\n"
+
+    history = history_writer.stats()
+    history_state = "ishlayapti" if history['running'] else "to'xtagan"
+    return (
+        f"<b>👥 users_db pool:</b>\n"
+        f"  • Band: {pool['in_use']} / {pool['max_size']} ({pool['saturation'] * 100:.0f}%)\n"
+        f"  • Kutayotgan: {pool['waiting']}\n"
+        f"  • Kutish: o'rt. {pool['avg_wait_ms']:.1f} ms, maks. {pool['max_wait_ms']:.1f} ms\n"
+        f"  • Timeout: {pool['timeouts']:,}\n\n"
+        f"<b>📝 Tarix navbati:</b> {history_state}\n"
+        f"  • Navbatda: {history['queued']:,}\n"
+        f"  • Yozildi: {history['written']:,} ({history['batches']:,} partiya)\n"
+        f"  • Xato: {history['failed']:,}\n\n"
+    )
+
+
 @dp.callback_query_handler(lambda c: c.data == "stats_database", user_id=ADMINS)
 async def show_database_statistics(callback: types.CallbackQuery):
     """Database statistikasi"""
@@ -789,6 +534,7 @@ async def show_database_statistics(callback: types.CallbackQuery):
             f"  • Jami: {conn_stats[0]}\n"
             f"  • Aktiv: {conn_stats[1]}\n"
             f"  • Idle: {conn_stats[2]}\n\n"
+            f"{_user_pool_text()}"
             f"<b>📋 Top 5 jadvallar:</b>\n"
         )
 
@@ -838,6 +584,7 @@ async def show_users_statistics(callback: types.CallbackQuery):
             f"  • Telefon bor: {stats['users_with_phone']:,} ({stats['phone_percentage']}%)\n"
             f"  • Balans bor: {stats['users_with_balance']:,}\n"
             f"  • Bepul urinish bor: {stats['users_with_free_trials']:,}\n\n"
+            f"{_rollup_note(stats)}"
             f"⏰ <i>{result['timestamp']}</i>"
         )
 
@@ -944,7 +691,8 @@ async def show_detailed_statistics(callback: types.CallbackQuery):
             f"  • Jami: {stats['total_payments']}\n"
             f"  • Yakunlangan: {stats['completed_payments']}\n"
             f"  • Kutilayotgan: {stats['pending_payments']}\n"
-            f"  • Summa: ${stats['total_paid_amount']:,.2f}"
+            f"  • Summa: ${stats['total_paid_amount']:,.2f}\n\n"
+            f"{_rollup_note(stats)}"
         )
 
         await callback.message.edit_text(text1, parse_mode="HTML")
@@ -37,8 +37,8 @@ from .subscription import (
 )
 
 from utils.api import api
-from utils.db_api.database import get_models, get_storages, get_colors, get_batteries, get_price
-from utils.db_api.user_database import (
+from utils.db_api.async_database import get_models, get_storages, get_colors, get_batteries, get_price
+from utils.db_api.async_user_database import (
     check_can_price,
     create_user,
     get_user_balance,
@@ -121,13 +121,13 @@ def should_ask_sim_type(model_name: str) -> bool:
     return match and int(match.group(1)) >= 14
 
 
-def calculate_final_price(data: dict) -> str:
+async def calculate_final_price(data: dict) -> str:
     """Yakuniy narx hisoblash"""
     try:
         selected_parts = data.get('selected_parts', [])
         damage = "Yangi" if not selected_parts else "+".join(sorted(selected_parts))
 
-        price = get_price(
+        price = await get_price(
             model_id=data.get('model_id'),
             storage=data.get('storage', ''),
             color=data.get('color', ''),
@@ -141,7 +141,7 @@ def calculate_final_price(data: dict) -> str:
             return f"{price:,.0f} $".replace(",", " ") if isinstance(price, (int, float)) else str(price)
 
         # Fallback
-        base_price = get_price(
+        base_price = await get_price(
             model_id=data.get('model_id'),
             storage=data.get('storage', ''),
             color=data.get('color', ''),
@@ -278,8 +278,7 @@ async def start(message: types.Message, state: FSMContext):
         )
 
         # Local database ga user yaratish/yangilash
-        local_task = asyncio.to_thread(
-            create_user,
+        local_task = create_user(
             user.id,
             user.full_name or f"User{user.id}",
             user.username or "",
@@ -319,7 +318,7 @@ async def start(message: types.Message, state: FSMContext):
         local_balance = 0
 
         try:
-            local_data = get_user_balance(user.id)
+            local_data = await get_user_balance(user.id)
             if local_data.get('success'):
                 free_trials = int(local_data.get('free_trials_left', FREE_TRIALS_DEFAULT))
                 local_balance = int(local_data.get('balance', 0))
@@ -334,11 +333,7 @@ async def start(message: types.Message, state: FSMContext):
         # ============================================================
         if phone and not isinstance(local_result, Exception):
             try:
-                await asyncio.to_thread(
-                    update_phone_number,
-                    user.id,
-                    phone
-                )
+                await update_phone_number(user.id, phone)
                 logger.info(f"Phone synced for user {user.id}")
             except Exception as e:
                 logger.warning(f"Phone sync failed: {e}")
@@ -425,8 +420,7 @@ async def check_subscription_callback(call: types.CallbackQuery, state: FSMConte
                 user.username or ""
             )
 
-            local_task = asyncio.to_thread(
-                create_user,
+            local_task = create_user(
                 user.id,
                 user.full_name or f"User{user.id}",
                 user.username or "",
@@ -456,7 +450,7 @@ async def check_subscription_callback(call: types.CallbackQuery, state: FSMConte
             local_balance = 0
 
             try:
-                local_data = get_user_balance(user.id)
+                local_data = await get_user_balance(user.id)
                 if local_data.get('success'):
                     free_trials = int(local_data.get('free_trials_left', FREE_TRIALS_DEFAULT))
                     local_balance = int(local_data.get('balance', 0))
@@ -468,7 +462,7 @@ async def check_subscription_callback(call: types.CallbackQuery, state: FSMConte
             # Phone sinxlash
             if phone and not isinstance(local_result, Exception):
                 try:
-                    await asyncio.to_thread(update_phone_number, user.id, phone)
+                    await update_phone_number(user.id, phone)
                 except:
                     pass
 
@@ -545,10 +539,7 @@ async def receive_phone(message: types.Message, state: FSMContext):
 
     try:
         api_task = api.update_phone(message.from_user.id, phone)
-        local_task = asyncio.to_thread(
-            lambda: __import__('utils.db_api.user_database', fromlist=['update_phone_number']).update_phone_number(
-                message.from_user.id, phone)
-        )
+        local_task = update_phone_number(message.from_user.id, phone)
 
         api_result, _ = await asyncio.gather(api_task, local_task, return_exceptions=True)
 
@@ -570,13 +561,13 @@ async def receive_phone(message: types.Message, state: FSMContext):
         balance = 0
 
     try:
-        local_data = get_user_balance(message.from_user.id)
+        local_data = await get_user_balance(message.from_user.id)
         free_trials = local_data.get('free_trials_left', FREE_TRIALS_DEFAULT)
     except:
         free_trials = FREE_TRIALS_DEFAULT
 
     try:
-        models = get_models()
+        models = await get_models()
         models_text = f"✅ <b>{len(models)}</b> ta model\n"
     except:
         models_text = ""
@@ -610,10 +601,10 @@ async def phone_state_handler(message: types.Message, state: FSMContext):
 async def admin_panel_handler(message: types.Message, state: FSMContext):
     """Admin panel"""
     await state.finish()
-    from utils.db_api.database import get_total_prices_count
+    from utils.db_api.async_database import get_total_prices_count
 
-    models_count = len(get_models())
-    prices_count = get_total_prices_count()
+    models_count = len(await get_models())
+    prices_count = await get_total_prices_count()
     tariffs_result = await api.get_tariffs()
     tariffs_count = len(tariffs_result.get('tariffs', [])) if tariffs_result.get('success') else 0
 
@@ -666,7 +657,7 @@ Tushunganingiz uchun rahmat!"""
         return
 
     # ✅ ODDIY HISOB KO'RSATISH
-    result = get_user_balance(message.from_user.id)
+    result = await get_user_balance(message.from_user.id)
 
     if not result.get('success'):
         await message.answer("❌ Xatolik")
@@ -696,7 +687,7 @@ Tushunganingiz uchun rahmat!"""
         text += "\n⚠️ Balans yetarli emas!\n💳 Hisobni to'ldiring."
 
     # So'nggi to'lovlar
-    pay_result = get_user_payment_history(message.from_user.id, limit=3)
+    pay_result = await get_user_payment_history(message.from_user.id, limit=3)
     payments = pay_result.get('payments', [])
     if payments:
         text += "\n\n💳 <b>So'nggi to'lovlar:</b>\n"
@@ -929,7 +920,7 @@ Narxlash funksiyasi vaqtincha ishlamaydi.
     # ============================================================
     # ⭐ USER MAVJUDLIGINI TEKSHIRISH
     # ============================================================
-    local_check = check_can_price(user_id)
+    local_check = await check_can_price(user_id)
 
     # Agar user bazada yo'q bo'lsa - /start bosishni talab qilish
     if local_check.get('reason') == 'User topilmadi':
@@ -955,7 +946,7 @@ Narxlash funksiyasi vaqtincha ishlamaydi.
         free_trials = int(local_check.get("free_trials_left", 0) or 0)
         api_balance = 0
         status = f"🆓 <b>Bepul rejim</b>"
-        models = get_models()
+        models = await get_models()
         if not models:
             await message.answer("❌ Modellar topilmadi")
             return
@@ -1000,7 +991,7 @@ Narxlash funksiyasi vaqtincha ishlamaydi.
         await message.answer(text, reply_markup=kb, parse_mode="HTML")
         return
 
-    models = get_models()
+    models = await get_models()
     if not models:
         await message.answer("❌ Modellar topilmadi")
         return
@@ -1028,7 +1019,7 @@ async def model_selected(message: types.Message, state: FSMContext):
         await message.answer("🏠 Bosh menyu", reply_markup=main_menu(message.from_user.id in ADMINS))
         return
 
-    models = get_models() or []
+    models = await get_models() or []
     if not models:
         await state.finish()
         await message.answer("❌ Modellar topilmadi", reply_markup=main_menu(message.from_user.id in ADMINS))
@@ -1045,7 +1036,7 @@ async def model_selected(message: types.Message, state: FSMContext):
 
     await state.update_data(model_id=selected["id"], model_name=selected["name"])
 
-    storages = get_storages(selected["id"]) or []
+    storages = await get_storages(selected["id"]) or []
 
     if not storages:
         sorted_models = sort_models_naturally(models)
@@ -1076,14 +1067,14 @@ async def storage_selected(message: types.Message, state: FSMContext):
             await state.finish()
             await message.answer("🏠 Bosh menyu", reply_markup=main_menu(message.from_user.id in ADMINS))
         else:
-            models = get_models()
+            models = await get_models()
             sorted_models = sort_models_naturally(models)
             kb = create_keyboard([m['name'] for m in sorted_models], row_width=2)
             await message.answer("<b>📱 Model:</b>", reply_markup=kb, parse_mode="HTML")
             await UserState.waiting_model.set()
         return
 
-    sorted_storages = sort_storages_naturally(get_storages(data['model_id']) or [])
+    sorted_storages = sort_storages_naturally(await get_storages(data['model_id']) or [])
     if message.text not in [s['size'] for s in sorted_storages]:
         kb = create_keyboard([s['size'] for s in sorted_storages], row_width=2)
         await message.answer("❌ Bunday xotira yo'q. Quyidagilardan tanlang:", reply_markup=kb)
@@ -1092,7 +1083,7 @@ async def storage_selected(message: types.Message, state: FSMContext):
     await state.update_data(storage=message.text)
     data = await state.get_data()
 
-    colors = get_colors(data['model_id']) or []
+    colors = await get_colors(data['model_id']) or []
 
     if colors:
         kb = create_keyboard([c['name'] for c in colors], row_width=2)
@@ -1100,7 +1091,7 @@ async def storage_selected(message: types.Message, state: FSMContext):
         await UserState.waiting_color.set()
     else:
         await state.update_data(color="Standart")
-        batteries = get_batteries(data['model_id']) or [{"label": "100%"}]
+        batteries = await get_batteries(data['model_id']) or [{"label": "100%"}]
         sorted_batteries = sort_batteries_naturally(batteries)
         kb = create_keyboard([b['label'] for b in sorted_batteries], row_width=2)
         await message.answer("<b>🔋 Batareya:</b>", reply_markup=kb, parse_mode="HTML")
@@ -1123,7 +1114,7 @@ async def color_selected(message: types.Message, state: FSMContext):
             await state.finish()
             await message.answer("🏠 Bosh menyu", reply_markup=main_menu(message.from_user.id in ADMINS))
         else:
-            storages = get_storages(data['model_id']) or []
+            storages = await get_storages(data['model_id']) or []
             sorted_storages = sort_storages_naturally(storages)
             kb = create_keyboard([s['size'] for s in sorted_storages], row_width=2)
             await message.answer("<b>💾 Xotira:</b>", reply_markup=kb, parse_mode="HTML")
@@ -1133,7 +1124,7 @@ async def color_selected(message: types.Message, state: FSMContext):
     await state.update_data(color=message.text)
     data = await state.get_data()
 
-    batteries = get_batteries(data['model_id']) or [{"label": "100%"}]
+    batteries = await get_batteries(data['model_id']) or [{"label": "100%"}]
     sorted_batteries = sort_batteries_naturally(batteries)
     kb = create_keyboard([b['label'] for b in sorted_batteries], row_width=2)
     await message.answer("<b>🔋 Batareya:</b>", reply_markup=kb, parse_mode="HTML")
@@ -1149,13 +1140,13 @@ async def battery_selected(message: types.Message, state: FSMContext):
             await message.answer("🏠 Bosh menyu", reply_markup=main_menu(message.from_user.id in ADMINS))
         else:
             data = await state.get_data()
-            colors = get_colors(data['model_id'])
+            colors = await get_colors(data['model_id'])
             if colors:
                 kb = create_keyboard([c['name'] for c in colors], row_width=2)
                 await message.answer("<b>🎨 Rang:</b>", reply_markup=kb, parse_mode="HTML")
                 await UserState.waiting_color.set()
             else:
-                storages = get_storages(data['model_id'])
+                storages = await get_storages(data['model_id'])
                 sorted_storages = sort_storages_naturally(storages)
                 kb = create_keyboard([s['size'] for s in sorted_storages], row_width=2)
                 await message.answer("<b>💾 Xotira:</b>", reply_markup=kb, parse_mode="HTML")
@@ -1192,7 +1183,7 @@ async def sim_selected(message: types.Message, state: FSMContext):
             await message.answer("🏠 Bosh menyu", reply_markup=main_menu(message.from_user.id in ADMINS))
         else:
             data = await state.get_data()
-            batteries = get_batteries(data['model_id']) or [{"label": "100%"}]
+            batteries = await get_batteries(data['model_id']) or [{"label": "100%"}]
             sorted_batteries = sort_batteries_naturally(batteries)
             kb = create_keyboard([b['label'] for b in sorted_batteries], row_width=2)
             await message.answer("<b>🔋 Batareya:</b>", reply_markup=kb, parse_mode="HTML")
@@ -1235,7 +1226,7 @@ async def box_selected(message: types.Message, state: FSMContext):
                                  reply_markup=main_menu(message.from_user.id in ADMINS))
             return
 
-        batteries = get_batteries(data['model_id']) or [{"label": "100%"}]
+        batteries = await get_batteries(data['model_id']) or [{"label": "100%"}]
         sorted_batteries = sort_batteries_naturally(batteries)
         kb = create_keyboard([b['label'] for b in sorted_batteries], row_width=2)
         await message.answer("<b>🔋 Batareya:</b>", reply_markup=kb, parse_mode="HTML")
@@ -1406,7 +1397,7 @@ async def show_final_price_from_callback(call: types.CallbackQuery, state: FSMCo
         'selected_parts': selected
     }
 
-    final_price = calculate_final_price(safe_data)
+    final_price = await calculate_final_price(safe_data)
     phone_model = f"{data['model_name']} {data['storage']}"
 
     if isinstance(final_price, str):
@@ -1428,20 +1419,14 @@ async def show_final_price_from_callback(call: types.CallbackQuery, state: FSMCo
         # Bepul rejim — hech narsa ayirmaymiz
         is_free = True
     else:
-        local_check = check_can_price(user_id)
-        free_trials = int(local_check.get("free_trials_left", 0) or 0)
-
-        if free_trials > 0:
-            local_res = use_pricing_local(
-                user_id, phone_model, data['storage'], color,
-                battery, sim_type, has_box, damage_display, price_value
-            )
-
-            if not local_res.get("success"):
-                await call.message.answer(f"❌ {local_res.get('error')}", reply_markup=main_menu(user_id in ADMINS))
-                await state.finish()
-                return
+        # Bepul urinish bo'lsa bitta atomar so'rov bilan yechiladi (tekshiruv shart emas)
+        local_res = await use_pricing_local(
+            user_id, phone_model, data['storage'], color,
+            battery, sim_type, has_box, damage_display, price_value,
+            allow_balance=False
+        )
 
+        if local_res.get("success"):
             is_free = True
             free_trials = int(local_res.get("free_trials_left", 0) or 0)
 
@@ -1451,7 +1436,16 @@ async def show_final_price_from_callback(call: types.CallbackQuery, state: FSMCo
             except:
                 balance = 0
 
+        elif local_res.get("reason") == "error":
+            # Kredit so'rovi yuborilgan, natijasi noma'lum — bepul urinish
+            # yechilgan bo'lishi mumkin, shuning uchun pullik API ga o'tmaymiz
+            await call.message.answer(f"❌ {local_res.get('error')}", reply_markup=main_menu(user_id in ADMINS))
+            await state.finish()
+            return
+
         else:
+            # Bepul urinish yo'q, lokal user yo'q yoki users_db ishlamayapti
+            # (kredit yechilmagan) — pullik API orqali
             try:
                 api_res = await api.use_pricing(user_id, phone_model, price_value)
             except Exception as e:
@@ -1525,7 +1519,7 @@ async def show_final_price(message: types.Message, state: FSMContext):
         "damage_display": damage_display
     })
 
-    final_price = calculate_final_price(safe_data)
+    final_price = await calculate_final_price(safe_data)
     phone_model = f"{model_name} {storage}"
 
     if isinstance(final_price, str):
@@ -1547,20 +1541,14 @@ async def show_final_price(message: types.Message, state: FSMContext):
         # Bepul rejim — hech narsa ayirmaymiz
         is_free = True
     else:
-        local_check = check_can_price(user_id)
-        free_trials = int(local_check.get("free_trials_left", 0) or 0)
-
-        if free_trials > 0:
-            local_res = use_pricing_local(
-                user_id, phone_model, storage, color, battery,
-                sim_type, has_box, damage_display, price_value
-            )
-
-            if not local_res.get("success"):
-                await message.answer(f"❌ {local_res.get('error')}", reply_markup=main_menu(user_id in ADMINS))
-                await state.finish()
-                return
+        # Bepul urinish bo'lsa bitta atomar so'rov bilan yechiladi (tekshiruv shart emas)
+        local_res = await use_pricing_local(
+            user_id, phone_model, storage, color, battery,
+            sim_type, has_box, damage_display, price_value,
+            allow_balance=False
+        )
 
+        if local_res.get("success"):
             is_free = True
             free_trials = int(local_res.get("free_trials_left", 0) or 0)
 
@@ -1570,7 +1558,16 @@ async def show_final_price(message: types.Message, state: FSMContext):
             except:
                 balance = 0
 
+        elif local_res.get("reason") == "error":
+            # Kredit so'rovi yuborilgan, natijasi noma'lum — bepul urinish
+            # yechilgan bo'lishi mumkin, shuning uchun pullik API ga o'tmaymiz
+            await message.answer(f"❌ {local_res.get('error')}", reply_markup=main_menu(user_id in ADMINS))
+            await state.finish()
+            return
+
         else:
+            # Bepul urinish yo'q, lokal user yo'q yoki users_db ishlamayapti
+            # (kredit yechilmagan) — pullik API orqali
             try:
                 api_res = await api.use_pricing(user_id, phone_model, price_value)
             except Exception as e:
@@ -1632,7 +1629,7 @@ async def reprice_callback(call: types.CallbackQuery, state: FSMContext):
             await call.message.answer(text, reply_markup=subscription_keyboard(), parse_mode="HTML")
             return
 
-    local_check = check_can_price(user_id)
+    local_check = await check_can_price(user_id)
     if local_check.get('reason') == 'User topilmadi':
         await call.message.answer("❌ Iltimos, /start bosing.", reply_markup=main_menu(user_id in ADMINS))
         return
@@ -1642,7 +1639,7 @@ async def reprice_callback(call: types.CallbackQuery, state: FSMContext):
 
     # Bepul rejim
     if is_free_mode():
-        models = get_models()
+        models = await get_models()
         if not models:
             await call.message.answer("❌ Modellar topilmadi")
             return
@@ -1675,7 +1672,7 @@ async def reprice_callback(call: types.CallbackQuery, state: FSMContext):
         )
         return
 
-    models = get_models()
+    models = await get_models()
     if not models:
         await call.message.answer("❌ Modellar topilmadi")
         return
@@ -1,5 +1,6 @@
 # admin.py - TO'LIQTA TO'G'RILANGAN VERSIYA (Maksimal ayriladigan summa to'g'ri ishlaydi)
 import decimal
+import logging
 
 from django.contrib import admin
 from django import forms
@@ -11,18 +12,39 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from django.http import HttpResponse
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.http import HttpResponse, FileResponse
 from decimal import Decimal, ROUND_HALF_UP
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from io import BytesIO
-from itertools import combinations
+import tempfile
+import time
 
+from . import counters
+from .catalog_bootstrap import (
+    STANDARD_PARTS, bootstrap_catalog, format_report, upsert_battery_ranges, upsert_parts
+)
+from .combination_generator import CombinationRule, plan_combinations, save_combinations
+from .excel_reader import ExcelSheetReader
+from .price_generator import generate_price_entries
+from .price_import import PriceEntryImporter
 from .models import (
     iPhoneModel, StorageOption, Color,
     BatteryRange, ReplacedPart, ReplacedPartCombination, PriceEntry
 )
 
+logger = logging.getLogger(__name__)
+
+# Export da bitta server-side cursor bo'lagidagi qatorlar soni
+EXPORT_CHUNK_SIZE = 2000
+
+# Kombinatsiyalarni oldindan ko'rishda jadvaldagi qatorlar soni
+COMBINATION_PREVIEW_LIMIT = 200
+
 
 # ============= HELPER FUNCTIONS =============
 
@@ -70,6 +92,23 @@ def round_to_5_or_0(value):
         return Decimal('0')
 
 
+# ============= PAGINATOR =============
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Filtrsiz ro'yxatda COUNT(*) o'rniga admin hisoblagichi (counters.py —
+    bazadagi, barcha worker lar uchun umumiy). Filtr/qidiruv bo'lsa aniq
+    COUNT(*) — u indeks bo'yicha toraygan bo'ladi.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and self.object_list.model is PriceEntry:
+            return counters.get_counts()['total_prices']
+        return super().count
+
+
 # ============= INLINE'LAR =============
 
 class StorageOptionInline(admin.TabularInline):
@@ -230,6 +269,13 @@ class AutoCombinationForm(forms.Form):
         label="⚠️ Mavjud kombinatsiyalarni qayta yozish"
     )
 
+    all_models = forms.BooleanField(
+        initial=False,
+        required=False,
+        label="🌐 Barcha faol modellar uchun",
+        help_text="Har bir faol modelning o'z qismlaridan kombinatsiyalar yaratiladi"
+    )
+
     def __init__(self, *args, **kwargs):
         model_id = kwargs.pop('model_id', None)
         super().__init__(*args, **kwargs)
@@ -312,6 +358,7 @@ class iPhoneModelAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     ordering = ('order',)
     inlines = [StorageOptionInline, ColorInline, BatteryRangeInline, ReplacedPartInline, ReplacedPartCombinationInline]
+    actions = ['bootstrap_catalog_action']
     fieldsets = (
         (_('Asosiy'), {'fields': ('name', 'order', 'is_active')}),
         (_('Narx'), {'fields': (
@@ -328,6 +375,17 @@ class iPhoneModelAdmin(admin.ModelAdmin):
             )
         super().save_model(request, obj, form, change)
 
+    @admin.action(description="⚡ Katalogni tayyorlash (batareya + qismlar + kombinatsiyalar)")
+    def bootstrap_catalog_action(self, request, queryset):
+        """Tanlangan modellar uchun hamma narsa bir yo'la (bulk upsert)"""
+        try:
+            with transaction.atomic():
+                report = bootstrap_catalog(queryset.values_list('pk', flat=True))
+        except Exception as e:
+            messages.error(request, f"❌ Xatolik yuz berdi: {str(e)}")
+            return
+        messages.success(request, f"✅ {queryset.count()} ta model tayyorlandi! {format_report(report)}")
+
     # =========== BARCHA AVTOMATIK TUGMALARI BIRGA ===========
     def all_auto_buttons(self, obj):
         """Barcha avtomatik tugmalari bir qatorda"""
@@ -385,42 +443,8 @@ class iPhoneModelAdmin(admin.ModelAdmin):
             messages.error(request, "Model topilmadi!")
             return redirect('admin:botapp_iphonemodel_changelist')
 
-        # Batareyka oralig'lari (rasmdagidek)
-        battery_ranges = [
-            ("100%", 100, 100, 0, True),
-            ("98-99%", 98, 99, -10, False),
-            ("95-97%", 95, 97, -20, False),
-            ("90-93%", 90, 93, -30, False),
-            ("86-89%", 86, 89, -40, False),
-            ("83-85%", 83, 85, -50, False),
-            ("80-82%", 80, 82, -60, False),
-            ("75-78%", 75, 78, -70, False),
-            ("70-74%", 70, 74, -80, False),
-        ]
-
-        created_count = 0
-        updated_count = 0
-
-        for label, min_percent, max_percent, price_diff, is_standard in battery_ranges:
-            existing = BatteryRange.objects.filter(model=model, label=label).first()
-
-            if existing:
-                existing.min_percent = min_percent
-                existing.max_percent = max_percent
-                existing.price_difference = price_diff
-                existing.is_standard = is_standard
-                existing.save()
-                updated_count += 1
-            else:
-                BatteryRange.objects.create(
-                    model=model,
-                    label=label,
-                    min_percent=min_percent,
-                    max_percent=max_percent,
-                    price_difference=price_diff,
-                    is_standard=is_standard
-                )
-                created_count += 1
+        result = upsert_battery_ranges([model.pk])
+        created_count, updated_count = result['created'], result['updated']
 
         messages.success(
             request,
@@ -437,43 +461,8 @@ class iPhoneModelAdmin(admin.ModelAdmin):
             messages.error(request, "Model topilmadi!")
             return redirect('admin:botapp_iphonemodel_changelist')
 
-        # Standart almashgan qismlar ro'yxati
-        standard_parts = [
-            ('battery', 'Batareyka', -100, 1, "Telefon batareykasi almashgan"),
-            ('back_cover', 'Krishka', -80, 2, "Telefon krishkasi almashgan"),
-            ('face_id', 'Face ID', -120, 3, "Face ID tizimi ishlamaydi"),
-            ('glass', 'Oyna', -70, 4, "Old oyna yorilgan/siniq"),
-            ('screen', 'Ekran', -150, 5, "Ekran almashgan (LCD/LED)"),
-            ('camera', 'Kamera', -90, 6, "Kamera almashgan"),
-            ('broken', 'Qirilgan', -200, 7, "Telefon qirilgan/tushib qolgan"),
-            ('body', 'Korpus', -110, 8, "Korpus almashgan"),
-        ]
-
-        created_count = 0
-        updated_count = 0
-
-        for part_type, display_name, price_reduction, order, description in standard_parts:
-            existing = ReplacedPart.objects.filter(
-                model=model,
-                part_type=part_type
-            ).first()
-
-            if existing:
-                existing.price_reduction = price_reduction
-                existing.order = order
-                existing.description = description
-                existing.save()
-                updated_count += 1
-            else:
-                ReplacedPart.objects.create(
-                    model=model,
-                    part_type=part_type,
-                    price_reduction=price_reduction,
-                    order=order,
-                    description=description,
-                    is_active=True
-                )
-                created_count += 1
+        result = upsert_parts([model.pk], STANDARD_PARTS)
+        created_count, updated_count = result['created'], result['updated']
 
         messages.success(
             request,
@@ -490,72 +479,10 @@ class iPhoneModelAdmin(admin.ModelAdmin):
             messages.error(request, "Model topilmadi!")
             return redirect('admin:botapp_iphonemodel_changelist')
 
-        total_created = 0
-        total_updated = 0
-
-        # 1. Batareyka oralig'larini yaratish
-        battery_ranges = [
-            ("100%", 100, 100, 0, True),
-            ("98-99%", 98, 99, -10, False),
-            ("95-97%", 95, 97, -20, False),
-            ("90-93%", 90, 93, -30, False),
-            ("86-89%", 86, 89, -40, False),
-            ("83-85%", 83, 85, -50, False),
-            ("80-82%", 80, 82, -60, False),
-            ("75-78%", 75, 78, -70, False),
-            ("70-74%", 70, 74, -80, False),
-        ]
-
-        for label, min_percent, max_percent, price_diff, is_standard in battery_ranges:
-            existing = BatteryRange.objects.filter(model=model, label=label).first()
-            if existing:
-                existing.min_percent = min_percent
-                existing.max_percent = max_percent
-                existing.price_difference = price_diff
-                existing.is_standard = is_standard
-                existing.save()
-                total_updated += 1
-            else:
-                BatteryRange.objects.create(
-                    model=model,
-                    label=label,
-                    min_percent=min_percent,
-                    max_percent=max_percent,
-                    price_difference=price_diff,
-                    is_standard=is_standard
-                )
-                total_created += 1
-
-        # 2. Almashgan qismlarni yaratish
-        standard_parts = [
-            ('battery', 'Batareyka', -100, 1, "Telefon batareykasi almashgan"),
-            ('back_cover', 'Krishka', -90, 2, "Telefon krishkasi almashgan"),
-            ('face_id', 'Face ID', -110, 3, "Face ID tizimi ishlamaydi"),
-            ('glass', 'Oyna', -105, 4, "Old oyna yorilgan/siniq"),
-            ('screen', 'Ekran', -125, 5, "Ekran almashgan (LCD/LED)"),
-            ('camera', 'Kamera', -110, 6, "Kamera almashgan"),
-            ('broken', 'Qirilgan', -50, 7, "Telefon qirilgan/tushib qolgan"),
-            ('body', 'Korpus', -150, 8, "Korpus almashgan"),
-        ]
-
-        for part_type, display_name, price_reduction, order, description in standard_parts:
-            existing = ReplacedPart.objects.filter(model=model, part_type=part_type).first()
-            if existing:
-                existing.price_reduction = price_reduction
-                existing.order = order
-                existing.description = description
-                existing.save()
-                total_updated += 1
-            else:
-                ReplacedPart.objects.create(
-                    model=model,
-                    part_type=part_type,
-                    price_reduction=price_reduction,
-                    order=order,
-                    description=description,
-                    is_active=True
-                )
-                total_created += 1
+        # Kombinatsiyalar bu tugmada yaratilmaydi — alohida sahifada sozlanadi
+        report = bootstrap_catalog([model.pk], combination_rules=())
+        total_created = sum(stage['created'] for stage in report.values())
+        total_updated = sum(stage['updated'] for stage in report.values())
 
         messages.success(
             request,
@@ -574,169 +501,69 @@ class iPhoneModelAdmin(admin.ModelAdmin):
             return redirect('admin:botapp_iphonemodel_changelist')
 
         parts = model.replaced_parts.filter(is_active=True).order_by('order')
+        preview = None
 
         if request.method == 'POST':
             form = AutoCombinationForm(request.POST, model_id=model_id)
             if form.is_valid():
                 data = form.cleaned_data
 
+                if data['all_models']:
+                    model_ids = list(iPhoneModel.objects.filter(is_active=True).values_list('pk', flat=True))
+                else:
+                    model_ids = [model.pk]
+
+                rules = []
+                if data['generate_pairs']:
+                    rules.append(CombinationRule(
+                        2, int(data['pair_discount_percent']), int(data.get('pair_max_reduction') or 0)))
+                if data['generate_triples']:
+                    rules.append(CombinationRule(
+                        3, int(data['triple_discount_percent']), int(data.get('triple_max_reduction') or 0)))
+
                 try:
-                    with transaction.atomic():
-                        created_count = 0
-                        skipped_count = 0
-                        limited_count_2 = 0
-                        limited_count_3 = 0
-                        rounded_count = 0
-
-                        if data['overwrite_existing']:
-                            deleted_count = model.part_combinations.all().delete()[0]
-                            messages.info(request, f"🗑️ {deleted_count} ta eski kombinatsiya o'chirildi")
-
-                        parts_list = list(parts)
-
-                        def calculate_final_price(individual_total, discount_percent, max_reduction_input,
-                                                  use_rounding):
-                            try:
-                                if individual_total >= 0:
-                                    discounted = individual_total * (
-                                            Decimal('1') - Decimal(str(discount_percent)) / 100)
-                                    return discounted, False, False
-
-                                base_reduction = abs(individual_total)
-                                discount_amount = base_reduction * (Decimal(str(discount_percent)) / 100)
-                                price_after_discount = individual_total + discount_amount
-
-                                limited = False
-                                if max_reduction_input is not None and max_reduction_input != "":
-                                    try:
-                                        max_val = Decimal(str(max_reduction_input))
-                                        if max_val > 0:
-                                            max_allowed = -max_val
-                                            if price_after_discount < max_allowed:
-                                                price_after_discount = max_allowed
-                                                limited = True
-                                    except:
-                                        pass
-
-                                rounded = False
-                                if use_rounding:
-                                    original = price_after_discount
-                                    price_after_discount = round_to_5_or_0(price_after_discount)
-                                    if original != price_after_discount:
-                                        rounded = True
-
-                                return price_after_discount, limited, rounded
-                            except Exception as e:
-                                print(f"Error in calculate_final_price: {e}")
-                                return individual_total, False, False
-
-                        # 2-TALIK KOMBINATSIYALAR
-                        if data['generate_pairs'] and len(parts_list) >= 2:
-                            pair_discount = data['pair_discount_percent']
-                            pair_max = data.get('pair_max_reduction') or 0
-                            use_rounding = data.get('round_to_5_or_0', True)
-
-                            for part1, part2 in combinations(parts_list, 2):
-                                if data['skip_glass_screen']:
-                                    if {part1.part_type, part2.part_type} == {'glass', 'screen'}:
-                                        skipped_count += 1
-                                        continue
-
-                                name = f"{part1.get_part_type_display()} + {part2.get_part_type_display()}"
-                                individual_total = part1.price_reduction + part2.price_reduction
-
-                                custom_price, limited, rounded = calculate_final_price(
-                                    individual_total, pair_discount, pair_max, use_rounding
-                                )
-
-                                if limited:
-                                    limited_count_2 += 1
-                                if rounded:
-                                    rounded_count += 1
-
-                                existing = model.part_combinations.filter(name=name).first()
-                                if existing and not data['overwrite_existing']:
-                                    skipped_count += 1
-                                    continue
-
-                                if existing:
-                                    existing.custom_price = custom_price
-                                    existing.priority = 5
-                                    existing.save()
-                                    existing.parts.set([part1, part2])
-                                else:
-                                    combo = ReplacedPartCombination.objects.create(
-                                        model=model,
-                                        name=name,
-                                        custom_price=custom_price,
-                                        priority=5,
-                                        is_active=True
-                                    )
-                                    combo.parts.set([part1, part2])
-
-                                created_count += 1
-
-                        # 3-TALIK KOMBINATSIYALAR
-                        if data['generate_triples'] and len(parts_list) >= 3:
-                            triple_discount = data['triple_discount_percent']
-                            triple_max = data.get('triple_max_reduction') or 0
-                            use_rounding = data.get('round_to_5_or_0', True)
-
-                            for part1, part2, part3 in combinations(parts_list, 3):
-                                if data['skip_glass_screen']:
-                                    part_types = {part1.part_type, part2.part_type, part3.part_type}
-                                    if 'glass' in part_types and 'screen' in part_types:
-                                        skipped_count += 1
-                                        continue
-
-                                name = f"{part1.get_part_type_display()} + {part2.get_part_type_display()} + {part3.get_part_type_display()}"
-                                individual_total = part1.price_reduction + part2.price_reduction + part3.price_reduction
-
-                                custom_price, limited, rounded = calculate_final_price(
-                                    individual_total, triple_discount, triple_max, use_rounding
-                                )
-
-                                if limited:
-                                    limited_count_3 += 1
-                                if rounded:
-                                    rounded_count += 1
-
-                                existing = model.part_combinations.filter(name=name).first()
-                                if existing and not data['overwrite_existing']:
-                                    skipped_count += 1
-                                    continue
-
-                                if existing:
-                                    existing.custom_price = custom_price
-                                    existing.priority = 10
-                                    existing.save()
-                                    existing.parts.set([part1, part2, part3])
-                                else:
-                                    combo = ReplacedPartCombination.objects.create(
-                                        model=model,
-                                        name=name,
-                                        custom_price=custom_price,
-                                        priority=10,
-                                        is_active=True
-                                    )
-                                    combo.parts.set([part1, part2, part3])
-
-                                created_count += 1
+                    plan = plan_combinations(
+                        model_ids, rules,
+                        use_rounding=data.get('round_to_5_or_0', True),
+                        skip_glass_screen=data['skip_glass_screen'],
+                    )
+
+                    if 'preview' in request.POST:
+                        # Oldindan ko'rish — bazaga hech narsa yozilmaydi
+                        model_names = dict(iPhoneModel.objects.filter(pk__in=model_ids).values_list('pk', 'name'))
+                        preview = {
+                            'plan': plan,
+                            'total': len(plan.combinations),
+                            'models_count': len(model_ids),
+                            'limited_count': sum(plan.limited.values()),
+                            'rows': [
+                                (model_names.get(c.model_id), c)
+                                for c in plan.combinations[:COMBINATION_PREVIEW_LIMIT]
+                            ],
+                        }
+                    else:
+                        with transaction.atomic():
+                            result = save_combinations(plan, model_ids, overwrite=data['overwrite_existing'])
+
+                        if result['deleted']:
+                            messages.info(request, f"🗑️ {result['deleted']} ta eski kombinatsiya o'chirildi")
 
                         # Xabarlar
-                        message_parts = [f"✅ {created_count} ta kombinatsiya yaratildi/yangilandi!"]
+                        skipped_count = plan.excluded + result['skipped']
+                        message_parts = [f"✅ {result['created']} ta kombinatsiya yaratildi/yangilandi!"]
+                        if len(model_ids) > 1:
+                            message_parts.append(f"({len(model_ids)} ta model)")
                         if skipped_count > 0:
                             message_parts.append(f"({skipped_count} ta o'tkazib yuborildi)")
-                        if limited_count_2 > 0 or limited_count_3 > 0:
-                            limit_msg = []
-                            if limited_count_2 > 0:
-                                limit_msg.append(f"2-talik: {limited_count_2}")
-                            if limited_count_3 > 0:
-                                limit_msg.append(f"3-talik: {limited_count_3}")
+                        if any(plan.limited.values()):
+                            limit_msg = [
+                                f"{size}-talik: {count}" for size, count in sorted(plan.limited.items()) if count
+                            ]
                             message_parts.append(
                                 f"🔴 Maksimal ayriladigan summa limitiga tushdi: {' + '.join(limit_msg)} ta")
-                        if rounded_count > 0:
-                            message_parts.append(f"💰 {rounded_count} ta 5/0 ga yaxlitlandi")
+                        if plan.rounded > 0:
+                            message_parts.append(f"💰 {plan.rounded} ta 5/0 ga yaxlitlandi")
+                        message_parts.append(f"⏱ {plan.elapsed + result['elapsed']:.2f} s")
 
                         messages.success(request, " ".join(message_parts))
                         return redirect('admin:botapp_iphonemodel_change', model.pk)
@@ -767,6 +594,7 @@ class iPhoneModelAdmin(admin.ModelAdmin):
             'pair_count': pair_count,
             'triple_count': triple_count,
             'glass_screen_combos': glass_screen_combos,
+            'preview': preview,
             'title': f'{model.name} - Avtomatik kombinatsiyalar',
             'opts': self.model._meta,
             'has_permission': True,
@@ -809,6 +637,16 @@ class PriceEntryAdmin(admin.ModelAdmin):
     list_filter = ('model', 'has_box', 'sim_type')
     search_fields = ('model__name', 'note')
     filter_horizontal = ('replaced_parts',)
+    paginator = EstimatedCountPaginator
+    list_per_page = 100
+    # "Jami N ta" uchun qo'shimcha COUNT(*) qilinmasin
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """Ro'yxat ustunlari va __str__ (action checkbox) uchun hamma narsa oldindan"""
+        return super().get_queryset(request).select_related(
+            'model', 'storage__model', 'color__model', 'battery', 'combination'
+        ).prefetch_related('replaced_parts', 'combination__parts')
 
     def get_urls(self):
         urls = super().get_urls()
@@ -819,6 +657,15 @@ class PriceEntryAdmin(admin.ModelAdmin):
             path('import/', self.admin_site.admin_view(self.import_from_excel), name='botapp_priceentry_import'),
         ] + urls
 
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        counters.adjust('total_prices', -1)
+
+    def delete_queryset(self, request, queryset):
+        # PriceEntry da post_delete signal yo'q (fast delete) — shu yerda hisoblaymiz
+        deleted = queryset.delete()[1].get(PriceEntry._meta.label, 0)
+        counters.adjust('total_prices', -deleted)
+
     def bulk_generate_view(self, request):
         """Avtomatik narxlar yaratish"""
         if request.method == 'POST':
@@ -843,71 +690,17 @@ class PriceEntryAdmin(admin.ModelAdmin):
                                 'opts': self.model._meta
                             })
 
-                        created, skipped = 0, 0
-
-                        for storage in data['storages']:
-                            for color in data['colors']:
-                                for battery in data['batteries']:
-                                    for sim_type in data['sim_types']:
-                                        for box_opt in data['box_options']:
-                                            has_box = (box_opt == 'yes')
-
-                                            # 1. YANGI TELEFON
-                                            if data['include_clean']:
-                                                clean_entries = PriceEntry.objects.filter(
-                                                    model=data['model'], storage=storage, color=color,
-                                                    sim_type=sim_type, battery=battery, has_box=has_box,
-                                                    combination__isnull=True
-                                                )
-                                                exists = any(e.replaced_parts.count() == 0 for e in clean_entries)
-                                                if not exists:
-                                                    PriceEntry.objects.create(
-                                                        model=data['model'], storage=storage, color=color,
-                                                        sim_type=sim_type, battery=battery, has_box=has_box
-                                                    )
-                                                    created += 1
-                                                else:
-                                                    skipped += 1
-
-                                            # 2. KOMBINATSIYALAR
-                                            for combination in data.get('combinations', []):
-                                                if not PriceEntry.objects.filter(
-                                                        model=data['model'], storage=storage, color=color,
-                                                        sim_type=sim_type, battery=battery, has_box=has_box,
-                                                        combination=combination
-                                                ).exists():
-                                                    PriceEntry.objects.create(
-                                                        model=data['model'], storage=storage, color=color,
-                                                        sim_type=sim_type, battery=battery, has_box=has_box,
-                                                        combination=combination
-                                                    )
-                                                    created += 1
-                                                else:
-                                                    skipped += 1
-
-                                            # 3. ALOHIDA QISMLAR
-                                            for part in data.get('individual_parts', []):
-                                                entries = PriceEntry.objects.filter(
-                                                    model=data['model'], storage=storage, color=color,
-                                                    sim_type=sim_type, battery=battery, has_box=has_box,
-                                                    combination__isnull=True
-                                                )
-                                                exists = any(
-                                                    list(e.replaced_parts.all()) == [part]
-                                                    for e in entries
-                                                )
-                                                if not exists:
-                                                    entry = PriceEntry.objects.create(
-                                                        model=data['model'], storage=storage, color=color,
-                                                        sim_type=sim_type, battery=battery, has_box=has_box
-                                                    )
-                                                    entry.replaced_parts.add(part)
-                                                    created += 1
-                                                else:
-                                                    skipped += 1
+                        result = generate_price_entries(
+                            data['model'], data['storages'], data['colors'], data['batteries'],
+                            data['sim_types'], data['box_options'],
+                            include_clean=data['include_clean'],
+                            combinations=data.get('combinations') or [],
+                            individual_parts=data.get('individual_parts') or [],
+                        )
+                        created, skipped = result['created'], result['skipped']
 
                         messages.success(request,
-                                         f"✅ {created} ta yaratildi! ({skipped} ta mavjud)" if created > 0 else f"⚠️ Yangi narx yo'q ({skipped} ta mavjud)")
+                                         f"✅ {created} ta yaratildi! ({skipped} ta mavjud, {result['elapsed']:.1f}s)" if created > 0 else f"⚠️ Yangi narx yo'q ({skipped} ta mavjud)")
                         return redirect('admin:botapp_priceentry_changelist')
                 except Exception as e:
                     messages.error(request, f"❌ Xatolik: {str(e)}")
@@ -919,228 +712,114 @@ class PriceEntryAdmin(admin.ModelAdmin):
             'form': form, 'title': _('Avtomatik yaratish'), 'has_permission': True, 'opts': self.model._meta
         })
 
-    def export_to_excel(self, request):
-        """📊 FILTER QILINGAN MA'LUMOTLARNI EXPORT QILISH - PROGRESS BILAN"""
-        import openpyxl
-        from openpyxl.styles import Font, Alignment, PatternFill
-        from io import BytesIO
-        import time
-        from django.contrib.admin.views.main import ChangeList
-
-        start_time = time.time()
-
-        # ✅ FILTER QILINGAN MA'LUMOTLARNI OLISH
-        # Admin filter parametrlarini olish
-        from django.db.models import Q
-
-        # DEBUG: Kelgan parametrlarni ko'rish
-        print(f"\n🔍 DEBUG: Request GET parametrlari:")
-        for key, value in request.GET.items():
-            print(f"   - {key}: {value}")
-
+    def _export_queryset(self, request):
+        """Changelist filtrlarini (model, quti, SIM, qidiruv) export ga qo'llash"""
         queryset = PriceEntry.objects.all()
-        original_count = queryset.count()
 
         # 1. Model filter (model__id__exact=4)
         if request.GET.get('model__id__exact'):
-            model_id = request.GET.get('model__id__exact')
-            queryset = queryset.filter(model_id=model_id)
-            print(f"✅ Model filter qo'llandi: model_id={model_id}, natija: {queryset.count()} ta")
+            queryset = queryset.filter(model_id=request.GET.get('model__id__exact'))
 
         # 2. Quti bor filter (has_box__exact=1 yoki 0)
         if 'has_box__exact' in request.GET:
-            has_box_value = request.GET.get('has_box__exact') == '1'
-            queryset = queryset.filter(has_box=has_box_value)
-            print(f"✅ Quti filter qo'llandi: has_box={has_box_value}, natija: {queryset.count()} ta")
+            queryset = queryset.filter(has_box=request.GET.get('has_box__exact') == '1')
 
         # 3. SIM turi filter (sim_type__exact=physical yoki esim)
         if request.GET.get('sim_type__exact'):
-            sim_type = request.GET.get('sim_type__exact')
-            queryset = queryset.filter(sim_type=sim_type)
-            print(f"✅ SIM filter qo'llandi: sim_type={sim_type}, natija: {queryset.count()} ta")
+            queryset = queryset.filter(sim_type=request.GET.get('sim_type__exact'))
 
         # 4. Search (q=...)
         if request.GET.get('q'):
             search = request.GET.get('q')
-            queryset = queryset.filter(
-                Q(model__name__icontains=search) |
-                Q(note__icontains=search)
-            )
-            print(f"✅ Search qo'llandi: '{search}', natija: {queryset.count()} ta")
+            queryset = queryset.filter(Q(model__name__icontains=search) | Q(note__icontains=search))
 
-        # YAKUNIY NATIJA
-        filtered_count = queryset.count()
-        print(f"\n📊 NATIJA:")
-        print(f"   - Asl ma'lumotlar: {original_count} ta")
-        print(f"   - Filter qilingandan keyin: {filtered_count} ta")
-        print(f"   - Farq: {original_count - filtered_count} ta o'chirildi\n")
+        return queryset
 
-        # Optimallashtirilgan queryset
-        entries = queryset.select_related(
+    def export_to_excel(self, request):
+        """
+        📊 FILTER QILINGAN MA'LUMOTLARNI EXPORT QILISH (oqimli)
+
+        Narx SQL da hisoblanadi (with_computed_price), qatorlar
+        iterator(chunk_size) bilan o'qiladi va write_only workbook ga
+        yoziladi — xotira jadval hajmiga bog'liq emas. Tayyor fayl
+        vaqtinchalik fayldan FileResponse bilan bo'laklab uzatiladi.
+        """
+        start_time = time.time()
+
+        entries = self._export_queryset(request).with_computed_price().select_related(
             'model', 'storage', 'color', 'battery', 'combination'
         ).prefetch_related('replaced_parts').only(
-            'id', 'sim_type', 'has_box', 'manual_adjustment',
-            'model__name', 'model__base_standard_price',
-            'storage__size', 'storage__price_difference',
-            'color__name', 'color__price_difference',
-            'battery__label', 'battery__price_difference',
-            'combination__name', 'combination__custom_price'
-        )
+            'id', 'sim_type', 'has_box',
+            'model__name', 'storage__size', 'color__name', 'battery__label',
+            'combination__name',
+        ).order_by('pk')
 
-        total_entries = entries.count()
-
-        # Agar ma'lumot bo'lmasa
-        if total_entries == 0:
+        if not entries.exists():
             messages.warning(request, "⚠️ Export qilish uchun ma'lumot yo'q!")
             return redirect('admin:botapp_priceentry_changelist')
 
-        # Excel yaratish
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Telefon narxlari"
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Telefon narxlari")
+
+        # Column widths / freeze panes — write_only da qatorlardan oldin
+        column_widths = [8, 25, 12, 15, 10, 15, 8, 40, 30, 12]
+        for i, width in enumerate(column_widths, 1):
+            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
+        ws.freeze_panes = 'A2'
 
         # Sarlavhalar
         headers = [
             'ID', 'Model', 'Xotira', 'Rang', 'SIM',
             'Batareya', 'Quti', 'Qismlar', 'Kombinatsiya', 'Narx ($)'
         ]
-        ws.append(headers)
-
-        # Sarlavhalar formatini sozlash
-        for col in range(1, len(headers) + 1):
-            cell = ws.cell(row=1, column=col)
-            cell.font = Font(bold=True, color="FFFFFF")
-            cell.fill = PatternFill(
-                start_color="4472C4",
-                end_color="4472C4",
-                fill_type="solid"
-            )
-            cell.alignment = Alignment(horizontal='center', vertical='center')
+        header_font = Font(bold=True, color="FFFFFF")
+        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+        header_alignment = Alignment(horizontal='center', vertical='center')
+        header_cells = []
+        for title in headers:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.font = header_font
+            cell.fill = header_fill
+            cell.alignment = header_alignment
+            header_cells.append(cell)
+        ws.append(header_cells)
 
-        # Boshlang'ich xabar
-        print(f"\n{'=' * 60}")
-        print(f"📊 EXCEL EXPORT BOSHLANDI")
-        print(f"{'=' * 60}")
-        print(f"⏰ Vaqt: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"📝 Jami ma'lumotlar: {total_entries} ta")
-        print(f"{'=' * 60}\n")
-
-        # Progress bar uchun
         processed = 0
-        last_percent = 0
-        chunk_size = 100  # Har 100 tadan keyin progress ko'rsatish
-
-        # Ma'lumotlarni yozish
-        for entry in entries.iterator(chunk_size=chunk_size):
-            try:
-                # Qismlar ma'lumoti (tozalangan formatda)
-                if entry.combination:
-                    parts_display = entry.combination.name.replace("🎯 ", "").strip()
-                    combination_name = entry.combination.name.replace("🎯 ", "").strip()
-                elif hasattr(entry, 'replaced_parts'):
-                    parts = list(entry.replaced_parts.all())
-                    if parts:
-                        parts_list = [p.get_part_type_display() for p in parts]
-                        parts_display = " + ".join(parts_list)
-                        combination_name = ""
-                    else:
-                        parts_display = "Yangi"
-                        combination_name = ""
-                else:
-                    parts_display = "Yangi"
-                    combination_name = ""
-
-                # Narxni hisoblash
-                try:
-                    price = float(entry.get_final_price())
-                except:
-                    price = float(entry.model.base_standard_price or 0)
-                    if entry.storage and entry.storage.price_difference:
-                        price += float(entry.storage.price_difference or 0)
-                    if entry.color and entry.color.price_difference:
-                        price += float(entry.color.price_difference or 0)
-                    if entry.battery and entry.battery.price_difference:
-                        price += float(entry.battery.price_difference or 0)
-                    if not entry.has_box:
-                        price += float(entry.model.box_price_difference or 0)
-                    if entry.sim_type != entry.model.default_sim_type:
-                        price += float(entry.model.alternative_sim_price_difference or 0)
-                    if entry.combination:
-                        price += float(entry.combination.custom_price or 0)
-                    elif hasattr(entry, 'replaced_parts'):
-                        for part in entry.replaced_parts.all():
-                            price += float(part.price_reduction or 0)
-                    price += float(entry.manual_adjustment or 0)
-                    price = max(price, 0)
-
-                # Excel ga yozish
-                ws.append([
-                    entry.pk,
-                    entry.model.name,
-                    entry.storage.size,
-                    entry.color.name if entry.color else "",
-                    "eSIM" if entry.sim_type == 'esim' else "SIM karta",
-                    entry.battery.label,
-                    "Bor" if entry.has_box else "Yo'q",
-                    parts_display,
-                    combination_name,
-                    round(price, 2)
-                ])
-
-                processed += 1
-
-                # Progress ko'rsatish (har 10% da)
-                current_percent = int((processed / total_entries) * 100)
-                if current_percent >= last_percent + 10:
-                    last_percent = current_percent
-                    elapsed = time.time() - start_time
-                    speed = processed / elapsed if elapsed > 0 else 0
-                    remaining = (total_entries - processed) / speed if speed > 0 else 0
-
-                    # Progress bar
-                    bar_length = 40
-                    filled = int(bar_length * processed / total_entries)
-                    bar = '█' * filled + '░' * (bar_length - filled)
-
-                    print(f"\r[{bar}] {current_percent}% | "
-                          f"{processed}/{total_entries} | "
-                          f"⚡ {speed:.1f} ta/s | "
-                          f"⏱️ {remaining:.1f}s qoldi", end='', flush=True)
-
-            except Exception as e:
-                print(f"\n❌ Xato entry {entry.pk if hasattr(entry, 'pk') else 'N/A'}: {e}")
-                continue
-
-        print()  # Yangi qator
-
-        # Column widths ni sozlash
-        column_widths = [8, 25, 12, 15, 10, 15, 8, 40, 30, 12]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
+        for entry in entries.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            # Qismlar ma'lumoti (tozalangan formatda)
+            if entry.combination:
+                parts_display = entry.combination.name.replace("🎯 ", "").strip()
+                combination_name = parts_display
+            else:
+                parts = entry.replaced_parts.all()
+                parts_display = " + ".join(p.get_part_type_display() for p in parts) or "Yangi"
+                combination_name = ""
+
+            ws.append([
+                entry.pk,
+                entry.model.name,
+                entry.storage.size,
+                entry.color.name if entry.color else "",
+                "eSIM" if entry.sim_type == 'esim' else "SIM karta",
+                entry.battery.label,
+                "Bor" if entry.has_box else "Yo'q",
+                parts_display,
+                combination_name,
+                round(float(entry.computed_price), 2)
+            ])
+            processed += 1
 
         # Auto filter
         ws.auto_filter.ref = f"A1:J{processed + 1}"
 
-        # Freeze panes
-        ws.freeze_panes = 'A2'
-
-        # Faylni saqlash
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
+        # write_only workbook faqat faylga saqlanadi; TemporaryFile yopilganda o'chadi
+        output = tempfile.TemporaryFile()
+        wb.save(output)
+        file_size = output.tell() / (1024 * 1024)  # MB
+        output.seek(0)
 
-        # Yakuniy ma'lumotlar
         elapsed = time.time() - start_time
-        file_size = len(buffer.getvalue()) / (1024 * 1024)  # MB
-
-        print(f"\n{'=' * 60}")
-        print(f"✅ EXCEL EXPORT MUVAFFAQIYATLI YAKUNLANDI!")
-        print(f"{'=' * 60}")
-        print(f"📊 Jami yozildi: {processed} ta ma'lumot")
-        print(f"📁 Fayl hajmi: {file_size:.2f} MB")
-        print(f"⏱️ Vaqt: {elapsed:.2f} soniya")
-        print(f"⚡ O'rtacha tezlik: {processed / elapsed:.1f} ta/soniya")
-        print(f"{'=' * 60}\n")
+        logger.info("Excel export: %s ta, %.2f MB, %.2fs", processed, file_size, elapsed)
 
         # Django message
         messages.success(
@@ -1148,93 +827,28 @@ class PriceEntryAdmin(admin.ModelAdmin):
             f"✅ Excel export muvaffaqiyatli! {processed} ta ma'lumot ({file_size:.2f} MB, {elapsed:.1f}s)"
         )
 
-        # Response
-        response = HttpResponse(
-            buffer.getvalue(),
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f"telefon_narxlari_filtered_{processed}.xlsx",
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
-        response['Content-Disposition'] = f'attachment; filename="telefon_narxlari_filtered_{processed}.xlsx"'
-        response['Content-Length'] = len(buffer.getvalue())
-
-        return response
 
     def import_from_excel(self, request):
         """📥 Excel dan import qilish (damage formatini tozalash)"""
         if request.method == 'POST' and request.FILES.get('excel_file'):
             try:
                 excel_file = request.FILES['excel_file']
-                wb = openpyxl.load_workbook(excel_file)
-                ws = wb.active
-
-                created, skipped, errors = 0, 0, []
-
-                with transaction.atomic():
-                    for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                        if not any(row):
-                            continue
-
-                        try:
-                            model_name, storage_size, color_name, sim_type, battery_label, has_box_str, parts_str, combination_str, price_str = row
-
-                            model = iPhoneModel.objects.filter(name__icontains=model_name).first()
-                            if not model:
-                                errors.append(f"Qator {row_num}: Model '{model_name}' topilmadi")
-                                continue
-
-                            storage = model.storages.filter(size=storage_size).first()
-                            if not storage:
-                                errors.append(f"Qator {row_num}: Xotira '{storage_size}' topilmadi")
-                                continue
-
-                            color = model.available_colors.filter(
-                                name__icontains=color_name).first() if color_name else None
-
-                            battery = model.battery_ranges.filter(label=battery_label).first()
-                            if not battery:
-                                errors.append(f"Qator {row_num}: Batareya '{battery_label}' topilmadi")
-                                continue
-
-                            sim_map = {'Physical': 'physical', 'SIM karta': 'physical', 'eSIM': 'esim'}
-                            sim_type_value = sim_map.get(sim_type, 'physical')
-
-                            has_box = has_box_str == "Bor"
-
-                            combination = None
-                            if combination_str:
-                                # Kombinatsiya nomini tozalash
-                                clean_combo_name = combination_str.replace("🎯 ", "").strip()
-                                combination = model.part_combinations.filter(name=clean_combo_name,
-                                                                             is_active=True).first()
-
-                            # Qo'shimcha: parts_str ni tozalash
-                            clean_parts_str = parts_str.replace("🔧 ", "").replace(", ", "+").strip()
-
-                            if PriceEntry.objects.filter(
-                                    model=model, storage=storage, color=color,
-                                    sim_type=sim_type_value, battery=battery, has_box=has_box,
-                                    combination=combination
-                            ).exists():
-                                skipped += 1
-                                continue
-
-                            entry = PriceEntry.objects.create(
-                                model=model, storage=storage, color=color,
-                                sim_type=sim_type_value, battery=battery, has_box=has_box,
-                                combination=combination
-                            )
-
-                            if not combination and clean_parts_str and clean_parts_str != "Yangi":
-                                parts_names = clean_parts_str.split("+")
-                                for part_name in parts_names:
-                                    part = model.replaced_parts.filter(part_type__icontains=part_name,
-                                                                       is_active=True).first()
-                                    if part:
-                                        entry.replaced_parts.add(part)
-
-                            created += 1
-
-                        except Exception as e:
-                            errors.append(f"Qator {row_num}: {str(e)}")
+                # Katta fayllar diskka yoziladi (FILE_UPLOAD_MAX_MEMORY_SIZE) — yo'l orqali o'qiymiz
+                source = (excel_file.temporary_file_path()
+                          if hasattr(excel_file, 'temporary_file_path') else excel_file)
+
+                importer = PriceEntryImporter()
+                with ExcelSheetReader(source) as reader, transaction.atomic():
+                    for batch in reader.iter_batches():
+                        importer.import_batch(batch)
+
+                created, skipped, errors = importer.created, importer.skipped, importer.errors
 
                 if errors:
                     messages.warning(request, f"⚠️ {len(errors)} ta xatolik: " + "; ".join(errors[:5]))
@@ -1278,17 +892,19 @@ class PriceEntryAdmin(admin.ModelAdmin):
 
     def parts_info(self, obj):
         if obj.combination:
-            return format_html('<span style="color:purple;">🎯 {} ta</span>', obj.combination.parts.count())
-        count = obj.replaced_parts.count()
+            return format_html('<span style="color:purple;">🎯 {} ta</span>', len(obj.combination.parts.all()))
+        count = len(obj.replaced_parts.all())
         return format_html('<span style="color:green;">✓ Yangi</span>') if count == 0 else format_html(
             '<span style="color:red;">🔧 {} ta</span>', count)
 
     parts_info.short_description = _("Qismlar")
 
     def final_price_display(self, obj):
-        return format_html('<b style="color:#1976d2;">{}</b>', obj.get_final_price_display())
+        # Saqlangan final_price (signals.py yangilab turadi) — qayta hisoblanmaydi
+        return format_html('<b style="color:#1976d2;">{}</b>', f"${obj.final_price:,.2f}")
 
     final_price_display.short_description = _("Narx")
+    final_price_display.admin_order_field = 'final_price'
 
     def changelist_view(self, request, extra_context=None):
         """Filter parametrlarini export URL ga uzatish"""
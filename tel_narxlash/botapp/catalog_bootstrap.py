@@ -0,0 +1,152 @@
+# catalog_bootstrap.py - MODELLAR KATALOGINI BIR YO'LA TAYYORLASH
+#
+# Batareya oraliqlari, almashgan qismlar va kombinatsiyalar avval har bir
+# model uchun alohida sahifada, har bir obyekt uchun filter/.save() bilan
+# yaratilardi. Endi bitta chaqiruv ko'p modelni tayyorlaydi: har bir bosqich
+# bitta upsert (bulk_create + ON CONFLICT DO UPDATE) bilan bajariladi,
+# bosqichlar vaqti esa hisobotda qaytariladi. Admin tugmalari, admin action
+# va `manage.py bootstrap_catalog` shu funksiyalardan foydalanadi.
+import time
+
+from .combination_generator import CombinationRule, plan_combinations, save_combinations
+from .models import BatteryRange, ReplacedPart, PriceEntry
+from .pricing import bump_version
+
+# (label, min_percent, max_percent, price_difference, is_standard)
+BATTERY_RANGES = [
+    ("100%", 100, 100, 0, True),
+    ("98-99%", 98, 99, -10, False),
+    ("95-97%", 95, 97, -20, False),
+    ("90-93%", 90, 93, -30, False),
+    ("86-89%", 86, 89, -40, False),
+    ("83-85%", 83, 85, -50, False),
+    ("80-82%", 80, 82, -60, False),
+    ("75-78%", 75, 78, -70, False),
+    ("70-74%", 70, 74, -80, False),
+]
+
+# (part_type, display_name, price_reduction, order, description) — "🔧 Qismlar" tugmasi
+STANDARD_PARTS = [
+    ('battery', 'Batareyka', -100, 1, "Telefon batareykasi almashgan"),
+    ('back_cover', 'Krishka', -80, 2, "Telefon krishkasi almashgan"),
+    ('face_id', 'Face ID', -120, 3, "Face ID tizimi ishlamaydi"),
+    ('glass', 'Oyna', -70, 4, "Old oyna yorilgan/siniq"),
+    ('screen', 'Ekran', -150, 5, "Ekran almashgan (LCD/LED)"),
+    ('camera', 'Kamera', -90, 6, "Kamera almashgan"),
+    ('broken', 'Qirilgan', -200, 7, "Telefon qirilgan/tushib qolgan"),
+    ('body', 'Korpus', -110, 8, "Korpus almashgan"),
+]
+
+# "⚡ HAMMA" tugmasi, admin action va buyruq ishlatadigan narxlar
+GENERATE_ALL_PARTS = [
+    ('battery', 'Batareyka', -100, 1, "Telefon batareykasi almashgan"),
+    ('back_cover', 'Krishka', -90, 2, "Telefon krishkasi almashgan"),
+    ('face_id', 'Face ID', -110, 3, "Face ID tizimi ishlamaydi"),
+    ('glass', 'Oyna', -105, 4, "Old oyna yorilgan/siniq"),
+    ('screen', 'Ekran', -125, 5, "Ekran almashgan (LCD/LED)"),
+    ('camera', 'Kamera', -110, 6, "Kamera almashgan"),
+    ('broken', 'Qirilgan', -50, 7, "Telefon qirilgan/tushib qolgan"),
+    ('body', 'Korpus', -150, 8, "Korpus almashgan"),
+]
+
+# AutoCombinationForm boshlang'ich qiymatlari
+COMBINATION_RULES = [
+    CombinationRule(2, 15, 0),
+    CombinationRule(3, 20, 150),
+]
+
+
+def _upsert(model_class, rows, unique_fields, update_fields):
+    """
+    bulk_create + ON CONFLICT DO UPDATE. Yaratilgan/yangilangan sonini
+    aniqlash uchun mavjud kalitlar oldindan bitta so'rov bilan olinadi.
+    """
+    model_ids = {row.model_id for row in rows}
+    existing = set(model_class.objects.filter(model_id__in=model_ids).values_list(*unique_fields))
+    updated_models = [
+        row.model_id for row in rows
+        if tuple(getattr(row, field) for field in unique_fields) in existing
+    ]
+
+    model_class.objects.bulk_create(
+        rows, update_conflicts=True,
+        unique_fields=[field.removesuffix('_id') for field in unique_fields],
+        update_fields=update_fields,
+    )
+
+    # bulk_create signal chaqirmaydi: snapshot versiyasi va saqlangan narxlar
+    for model_id in model_ids:
+        bump_version(model_id)
+    if updated_models:
+        PriceEntry.objects.filter(model_id__in=set(updated_models)).refresh_final_price()
+
+    return {'created': len(rows) - len(updated_models), 'updated': len(updated_models)}
+
+
+def upsert_battery_ranges(model_ids, ranges=BATTERY_RANGES):
+    """Batareya oraliqlarini modellar uchun yaratish/yangilash"""
+    return _upsert(BatteryRange, [
+        BatteryRange(
+            model_id=model_id, label=label, min_percent=min_percent, max_percent=max_percent,
+            price_difference=price_diff, is_standard=is_standard
+        )
+        for model_id in model_ids
+        for label, min_percent, max_percent, price_diff, is_standard in ranges
+    ], ('model_id', 'label'), ['min_percent', 'max_percent', 'price_difference', 'is_standard'])
+
+
+def upsert_parts(model_ids, parts=STANDARD_PARTS):
+    """Almashgan qismlarni modellar uchun yaratish/yangilash (is_active tegilmaydi)"""
+    return _upsert(ReplacedPart, [
+        ReplacedPart(
+            model_id=model_id, part_type=part_type, price_reduction=price_reduction,
+            order=order, description=description, is_active=True
+        )
+        for model_id in model_ids
+        for part_type, display_name, price_reduction, order, description in parts
+    ], ('model_id', 'part_type'), ['price_reduction', 'order', 'description'])
+
+
+def bootstrap_catalog(model_ids, battery_ranges=BATTERY_RANGES, parts=GENERATE_ALL_PARTS,
+                      combination_rules=COMBINATION_RULES):
+    """
+    Modellar katalogini bosqichma-bosqich tayyorlash.
+
+    combination_rules bo'sh bo'lsa kombinatsiyalar bosqichi o'tkaziladi.
+    Qaytaradi: {bosqich: {'created', 'updated'/'skipped', 'elapsed'}}.
+    """
+    model_ids = list(model_ids)
+    report = {}
+
+    start = time.monotonic()
+    report['battery_ranges'] = upsert_battery_ranges(model_ids, battery_ranges)
+    report['battery_ranges']['elapsed'] = time.monotonic() - start
+
+    start = time.monotonic()
+    report['parts'] = upsert_parts(model_ids, parts)
+    report['parts']['elapsed'] = time.monotonic() - start
+
+    if combination_rules:
+        start = time.monotonic()
+        plan = plan_combinations(model_ids, combination_rules)
+        result = save_combinations(plan, model_ids)
+        report['combinations'] = {
+            'created': result['created'],
+            'skipped': result['skipped'] + plan.excluded,
+            'elapsed': time.monotonic() - start,
+        }
+
+    return report
+
+
+def format_report(report):
+    """Hisobotni bitta qatorga: xabar va buyruq chiqishi uchun"""
+    titles = {'battery_ranges': "🔋 Batareya", 'parts': "🔧 Qismlar", 'combinations': "🎯 Kombinatsiyalar"}
+    stages = []
+    for stage, result in report.items():
+        extra = result.get('updated', result.get('skipped', 0))
+        extra_label = "yangilandi" if 'updated' in result else "o'tkazildi"
+        stages.append(
+            f"{titles[stage]}: {result['created']} yangi, {extra} {extra_label} ({result['elapsed']:.2f} s)"
+        )
+    return " | ".join(stages)
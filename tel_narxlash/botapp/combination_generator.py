@@ -0,0 +1,203 @@
+# combination_generator.py - KOMBINATSIYALARNI MASSIVLAR BILAN HISOBLASH
+#
+# auto_combinations_view avval har bir model uchun itertools.combinations
+# ustida Decimal bilan sikl yurgizib, har bir kombinatsiyani .create() va
+# .parts.set() bilan alohida saqlardi. Endi tanlangan modellarning faol
+# qismlari bitta so'rov bilan yuklanadi, qismlar soni bir xil modellar
+# guruhlanadi va 2/3-talik yig'indilar, Oyna+Ekran istisnosi, chegirma,
+# limit hamda 5/0 yaxlitlash numpy massivlarida bir yo'la hisoblanadi.
+# Natija (reja) oldindan ko'rish uchun qaytariladi yoki bulk_create va
+# through jadvaliga bitta bulk insert bilan saqlanadi.
+import time
+from collections import defaultdict
+from decimal import Decimal
+from functools import lru_cache
+from itertools import combinations
+from typing import NamedTuple
+
+import numpy as np
+
+from . import counters
+from .models import ReplacedPart, ReplacedPartCombination
+from .pricing import bump_version
+
+# Pul butun sonlarda: 1$ = 10000 birlik (sent × butun chegirma foizi — aniq)
+UNITS = 10000
+CENTS = 100
+
+BULK_CHUNK_SIZE = 2000
+
+# Kombinatsiya hajmi -> ustuvorlik (3 ta qism > 2 ta qism)
+PRIORITY = {2: 5, 3: 10}
+
+PART_LABELS = dict(ReplacedPart.PART_CHOICES)
+
+
+class CombinationRule(NamedTuple):
+    size: int
+    discount_percent: int
+    max_reduction: int  # 0 — cheksiz
+
+
+class PlannedCombination(NamedTuple):
+    model_id: int
+    name: str
+    part_ids: tuple
+    individual_total: Decimal
+    custom_price: Decimal
+    priority: int
+    limited: bool
+    rounded: bool
+
+
+class CombinationPlan(NamedTuple):
+    combinations: list
+    excluded: int  # Oyna + Ekran
+    limited: dict  # hajm -> limitga tushganlar soni
+    rounded: int
+    elapsed: float
+
+
+@lru_cache(maxsize=None)
+def _index_matrix(n, size):
+    """n ta qismdan size talik kombinatsiyalar indekslari, (c, size) massiv"""
+    return np.array(list(combinations(range(n), size)), dtype=np.intp).reshape(-1, size)
+
+
+def _round_to_5_or_0(values):
+    """admin.round_to_5_or_0 ning manfiy qiymatlar uchun massiv varianti"""
+    dollars = (-values + UNITS // 2) // UNITS  # ROUND_HALF_UP (moduli bo'yicha)
+    last_digit = dollars % 10
+    dollars = np.where(
+        (last_digit >= 1) & (last_digit <= 4), dollars - last_digit + 5,
+        np.where(last_digit >= 6, dollars - last_digit, dollars)
+    )
+    return -dollars * UNITS
+
+
+def _load_parts(model_ids):
+    """model_id -> [(part_id, part_type, price_reduction)] (bitta so'rov)"""
+    parts = defaultdict(list)
+    rows = ReplacedPart.objects.filter(model_id__in=model_ids, is_active=True).order_by(
+        'model_id', 'order', 'part_type'
+    ).values_list('model_id', 'id', 'part_type', 'price_reduction')
+    for model_id, part_id, part_type, price_reduction in rows:
+        parts[model_id].append((part_id, part_type, price_reduction))
+    return parts
+
+
+def plan_combinations(model_ids, rules, use_rounding=True, skip_glass_screen=True):
+    """
+    Barcha modellar uchun kombinatsiyalar rejasi (bazaga yozmaydi).
+
+    Narx: yig'indi × (1 - chegirma%); manfiy bo'lsa limit (-max) va
+    5/0 yaxlitlash qo'llanadi — eski calculate_final_price bilan bir xil.
+    """
+    start = time.monotonic()
+    planned, excluded, rounded = [], 0, 0
+    limited = {rule.size: 0 for rule in rules}
+
+    groups = defaultdict(list)
+    for model_id, parts in _load_parts(model_ids).items():
+        groups[len(parts)].append((model_id, parts))
+
+    for n, members in groups.items():
+        cents = np.array([[int(p[2] * CENTS) for p in parts] for _, parts in members], dtype=np.int64)
+        glass = np.array([[p[1] == 'glass' for p in parts] for _, parts in members])
+        screen = np.array([[p[1] == 'screen' for p in parts] for _, parts in members])
+
+        for rule in rules:
+            if n < rule.size:
+                continue
+            index = _index_matrix(n, rule.size)
+
+            totals = cents[:, index].sum(axis=2)  # (modellar, kombinatsiyalar)
+            prices = totals * (CENTS - rule.discount_percent)
+            negative = totals < 0
+
+            capped = np.zeros(prices.shape, dtype=bool)
+            if rule.max_reduction > 0:
+                cap = -rule.max_reduction * UNITS
+                capped = negative & (prices < cap)
+                prices = np.where(capped, cap, prices)
+
+            changed = np.zeros(prices.shape, dtype=bool)
+            if use_rounding:
+                rounded_prices = np.where(negative, _round_to_5_or_0(prices), prices)
+                changed = rounded_prices != prices
+                prices = rounded_prices
+
+            skip = np.zeros(prices.shape, dtype=bool)
+            if skip_glass_screen:
+                skip = glass[:, index].any(axis=2) & screen[:, index].any(axis=2)
+            excluded += int(skip.sum())
+            limited[rule.size] += int((capped & ~skip).sum())
+            rounded += int((changed & ~skip).sum())
+
+            for row, col in zip(*np.nonzero(~skip)):
+                model_id, parts = members[row]
+                chosen = [parts[i] for i in index[col]]
+                planned.append(PlannedCombination(
+                    model_id=model_id,
+                    name=" + ".join(PART_LABELS.get(p[1], p[1]) for p in chosen),
+                    part_ids=tuple(p[0] for p in chosen),
+                    individual_total=Decimal(int(totals[row, col])) / CENTS,
+                    custom_price=Decimal(int(prices[row, col])) / UNITS,
+                    priority=PRIORITY[rule.size],
+                    limited=bool(capped[row, col]),
+                    rounded=bool(changed[row, col]),
+                ))
+
+    return CombinationPlan(planned, excluded, limited, rounded, time.monotonic() - start)
+
+
+def save_combinations(plan, model_ids, overwrite=False):
+    """
+    Rejani saqlash: bulk_create + through ga bitta bulk insert.
+
+    overwrite bo'lsa modellarning eski kombinatsiyalari o'chiriladi, aks
+    holda nomi mavjudlari o'tkazib yuboriladi. Qaytaradi:
+    {'created', 'skipped', 'deleted', 'elapsed'}.
+    """
+    start = time.monotonic()
+    deleted = 0
+    existing = set()
+
+    if overwrite:
+        deleted = ReplacedPartCombination.objects.filter(model_id__in=model_ids).delete()[1].get(
+            ReplacedPartCombination._meta.label, 0)
+    else:
+        existing = set(ReplacedPartCombination.objects.filter(model_id__in=model_ids).values_list('model_id', 'name'))
+
+    new = []
+    for combination in plan.combinations:
+        if (combination.model_id, combination.name) not in existing:
+            existing.add((combination.model_id, combination.name))
+            new.append(combination)
+
+    objects = ReplacedPartCombination.objects.bulk_create([
+        ReplacedPartCombination(
+            model_id=c.model_id, name=c.name, custom_price=c.custom_price,
+            priority=c.priority, is_active=True
+        )
+        for c in new
+    ], batch_size=BULK_CHUNK_SIZE)
+
+    Through = ReplacedPartCombination.parts.through
+    Through.objects.bulk_create([
+        Through(replacedpartcombination_id=obj.pk, replacedpart_id=part_id)
+        for obj, c in zip(objects, new)
+        for part_id in c.part_ids
+    ], batch_size=BULK_CHUNK_SIZE)
+
+    # bulk_create signal chaqirmaydi — snapshot va hisoblagichni shu yerda
+    for model_id in {c.model_id for c in new}:
+        bump_version(model_id)
+    counters.adjust('total_combinations', len(objects))
+
+    return {
+        'created': len(objects),
+        'skipped': len(plan.combinations) - len(new),
+        'deleted': deleted,
+        'elapsed': time.monotonic() - start,
+    }
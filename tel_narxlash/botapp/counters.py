@@ -0,0 +1,114 @@
+# counters.py - ADMIN BOSH SAHIFASI HISOBLAGICHLARI
+#
+# custom_admin_index har ochilganda 5 ta COUNT(*) bajarardi, shu jumladan
+# eng katta jadval — PriceEntry bo'yicha. Endi hisoblagichlar DashboardCounter
+# jadvalida turadi: signals.py yaratish/o'chirishda ularni +1/-1 qiladi,
+# bulk yo'llar adjust() ni o'zlari chaqiradi. adjust() — bitta
+# UPDATE ... SET value = value + delta (F()), shuning uchun atomar, hamma
+# web worker lar va cron buyrug'i bitta qiymatni ko'radi va tranzaksiya
+# bekor qilinsa o'zgarish ham bekor bo'ladi. Signal chetlab o'tadigan yo'llar
+# (queryset.update va h.k.) siljitishi mumkin — qiymat COUNTER_TTL o'tgach
+# (yoki `manage.py recount_counters` bilan) qayta sanaladi.
+#
+# PostgreSQL da katta jadvallar uchun COUNT(*) o'rniga pg_class.reltuples
+# bahosi ishlatiladi — bosh sahifa jadval hajmidan qat'i nazar tez ochiladi.
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import iPhoneModel, StorageOption, Color, PriceEntry, ReplacedPartCombination, DashboardCounter
+
+# Hisoblagich shu muddatdan keyin qayta sanaladi (reconcile)
+COUNTER_TTL = 3600
+
+# reltuples shundan katta bo'lsa aniq COUNT(*) qilinmaydi
+ESTIMATE_THRESHOLD = 100_000
+
+# nom -> (model, filter). Nomlar admin index shablonidagi o'zgaruvchilar
+COUNTERS = {
+    'total_models': (iPhoneModel, {'is_active': True}),
+    'total_prices': (PriceEntry, {}),
+    'total_storages': (StorageOption, {}),
+    'total_colors': (Color, {}),
+    'total_combinations': (ReplacedPartCombination, {'is_active': True}),
+}
+
+
+def estimate_count(model):
+    """
+    pg_class.reltuples bo'yicha taxminiy qatorlar soni.
+
+    PostgreSQL bo'lmasa yoki jadval hali ANALYZE qilinmagan bo'lsa None.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def count(name):
+    """Hisoblagichni bazadan sanash (katta jadvallarda — baho)"""
+    model, filters = COUNTERS[name]
+    if not filters:
+        estimate = estimate_count(model)
+        if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+            return estimate
+    return model.objects.filter(**filters).count()
+
+
+def _store(counts):
+    now = timezone.now()
+    for name, value in counts.items():
+        DashboardCounter.objects.update_or_create(
+            name=name, defaults={'value': value, 'counted_at': now}
+        )
+
+
+def get_counts():
+    """Barcha hisoblagichlar: yo'q yoki eskirganlari qayta sanaladi"""
+    stale_before = timezone.now() - timedelta(seconds=COUNTER_TTL)
+    rows = DashboardCounter.objects.in_bulk(list(COUNTERS))
+    counts, missing = {}, {}
+    for name in COUNTERS:
+        row = rows.get(name)
+        if row is None or row.counted_at < stale_before:
+            counts[name] = missing[name] = count(name)
+        else:
+            counts[name] = row.value
+    if missing:
+        _store(missing)
+    return counts
+
+
+def recount():
+    """Hamma hisoblagichni qayta sanab tuzatish"""
+    counts = {name: count(name) for name in COUNTERS}
+    _store(counts)
+    return counts
+
+
+def adjust(name, delta):
+    """Hisoblagichni delta ga atomar o'zgartirish (qatori yo'q bo'lsa — keyin sanaladi)"""
+    if not delta:
+        return
+    DashboardCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def invalidate(*names):
+    """Hisoblagichlarni o'chirish — keyingi so'rovda qayta sanaladi"""
+    DashboardCounter.objects.filter(name__in=names or list(COUNTERS)).delete()
+
+
+def matches(name, instance):
+    """Obyekt hisoblagich filtriga mos keladimi"""
+    _, filters = COUNTERS[name]
+    return all(getattr(instance, field) == value for field, value in filters.items())
@@ -0,0 +1,102 @@
+# botapp/excel_reader.py - EXCEL NI OQIMLI O'QISH (openpyxl read_only)
+#
+# load_workbook() / pd.read_excel() butun varaqni xotiraga oladi — katta
+# faylda bu bir necha yuz MB. Bu yerda varaq read_only rejimda ochiladi va
+# qatorlar iter_rows(values_only=True) orqali bo'laklab (RowBatch) beriladi,
+# shuning uchun xotira fayl hajmiga emas, bo'lak hajmiga bog'liq.
+#
+# Faqat openpyxl ga bog'liq (Django ga emas): bot importi ham shu modulni
+# ishlatadi — from tel_narxlash.botapp.excel_reader import ExcelSheetReader.
+from collections import namedtuple
+
+import openpyxl
+
+# Bitta bo'lakdagi qatorlar soni
+BATCH_SIZE = 5000
+
+# start_row — bo'lakdagi birinchi qatorning Excel raqami;
+# row_numbers — har bir qatorning Excel raqami (xato xabarlari uchun);
+# rows — har biri sarlavha kengligidagi tuple lar
+RowBatch = namedtuple('RowBatch', ('start_row', 'row_numbers', 'rows'))
+
+
+def unique_names(names):
+    """
+    Takrorlangan sarlavhalarni pandas kabi raqamlash: ['Narx', 'Narx'] ->
+    ['Narx', 'Narx.1']. Aks holda DataFrame da df['Narx'] bitta ustun
+    o'rniga DataFrame qaytaradi.
+    """
+    seen, result = set(), []
+    for name in names:
+        unique, n = name, 0
+        while unique in seen:
+            n += 1
+            unique = f'{name}.{n}'
+        seen.add(unique)
+        result.append(unique)
+    return result
+
+
+class ExcelSheetReader:
+    """
+    Excel varag'ini oqimli o'qish.
+
+        with ExcelSheetReader(path) as reader:
+            reader.header          # ['Model', 'Xotira', ...]
+            for batch in reader.iter_batches():
+                ...
+
+    source — fayl yo'li yoki fayl obyekti. To'liq bo'sh qatorlar tashlab
+    yuboriladi; qisqa qatorlar None bilan to'ldiriladi, uzunlari kesiladi.
+    """
+
+    def __init__(self, source, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.total_rows = 0
+        self._wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        sheet = self._wb.active
+        self._rows = sheet.iter_rows(values_only=True)
+        # Varaq o'lchamidan taxminiy qatorlar soni (progress uchun; fayl
+        # o'lchamni yozmagan bo'lsa 0). Aniq son — total_rows, o'qib bo'lgach
+        self.expected_rows = max((sheet.max_row or 1) - 1, 0)
+
+        first = next(self._rows, None) or ()
+        self.header = unique_names(
+            str(value).strip() if value is not None else f'Unnamed: {i}'
+            for i, value in enumerate(first)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Faylni yopish (read_only rejim faylni ochiq ushlab turadi)"""
+        if self._wb is not None:
+            self._wb.close()
+            self._wb = None
+
+    def iter_batches(self):
+        """RowBatch larni qaytaruvchi generator"""
+        width = len(self.header)
+        padding = (None,) * width
+        numbers, rows = [], []
+
+        for row_num, row in enumerate(self._rows, start=2):
+            if not any(value is not None and value != '' for value in row):
+                continue
+            if len(row) != width:
+                row = (tuple(row) + padding)[:width]
+
+            numbers.append(row_num)
+            rows.append(row)
+            if len(rows) >= self.batch_size:
+                self.total_rows += len(rows)
+                yield RowBatch(numbers[0], numbers, rows)
+                numbers, rows = [], []
+
+        if rows:
+            self.total_rows += len(rows)
+            yield RowBatch(numbers[0], numbers, rows)
@@ -0,0 +1,41 @@
+# bootstrap_catalog.py - MODELLAR KATALOGINI BUYRUQ ORQALI TAYYORLASH
+#
+# Yangi iPhone avlodi qo'shilganda 8-10 ta model uchun batareya oraliqlari,
+# qismlar va kombinatsiyalarni bitta buyruq bilan yaratadi:
+#   python manage.py bootstrap_catalog "iPhone 17" "iPhone 17 Pro"
+#   python manage.py bootstrap_catalog --all --no-combinations
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from botapp.catalog_bootstrap import bootstrap_catalog, format_report
+from botapp.models import iPhoneModel
+
+
+class Command(BaseCommand):
+    help = "Modellar uchun batareya oraliqlari, qismlar va kombinatsiyalarni yaratish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help="Model nomlari (aniq moslik)")
+        parser.add_argument('--all', action='store_true', help="Barcha faol modellar")
+        parser.add_argument('--no-combinations', action='store_true', help="Kombinatsiyalarsiz")
+
+    def handle(self, *args, **options):
+        if options['all']:
+            models = iPhoneModel.objects.filter(is_active=True)
+        elif options['models']:
+            models = iPhoneModel.objects.filter(name__in=options['models'])
+            missing = set(options['models']) - set(models.values_list('name', flat=True))
+            if missing:
+                raise CommandError(f"Model topilmadi: {', '.join(sorted(missing))}")
+        else:
+            raise CommandError("Model nomlarini yoki --all ni kiriting")
+
+        model_ids = list(models.values_list('pk', flat=True))
+        kwargs = {'combination_rules': ()} if options['no_combinations'] else {}
+
+        with transaction.atomic():
+            report = bootstrap_catalog(model_ids, **kwargs)
+
+        for stage in format_report(report).split(" | "):
+            self.stdout.write(stage)
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(model_ids)} ta model tayyorlandi"))
@@ -0,0 +1,17 @@
+# recount_counters.py - ADMIN HISOBLAGICHLARINI QAYTA SANASH
+#
+# Signal bilan yuritiladigan hisoblagichlar vaqt o'tishi bilan siljishi
+# mumkin (signal chetlab o'tadigan bulk yo'llar). Cron dan davriy ishga tushiring:
+#   */30 * * * * python manage.py recount_counters
+from django.core.management.base import BaseCommand
+
+from botapp import counters
+
+
+class Command(BaseCommand):
+    help = "Admin bosh sahifasi hisoblagichlarini bazadan qayta sanash"
+
+    def handle(self, *args, **options):
+        for name, value in counters.recount().items():
+            self.stdout.write(f"{name}: {value}")
+        self.stdout.write(self.style.SUCCESS("✅ Hisoblagichlar yangilandi"))
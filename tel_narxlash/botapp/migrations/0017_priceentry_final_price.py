@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-17 17:46
+
+import botapp.models
+from django.db import migrations, models
+
+
+def fill_final_price(apps, schema_editor):
+    PriceEntry = apps.get_model('botapp', 'PriceEntry')
+    PriceEntry.objects.all().refresh_final_price()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('botapp', '0016_iphone17_cycle_imei'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='priceentry',
+            managers=[
+                ('objects', botapp.models.PriceEntryManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='priceentry',
+            name='final_price',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=15, verbose_name='Yakuniy narx ($)'),
+        ),
+        migrations.RunPython(fill_final_price, migrations.RunPython.noop),
+    ]
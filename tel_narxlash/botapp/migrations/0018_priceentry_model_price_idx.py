@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-17 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('botapp', '0017_priceentry_final_price'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='priceentry',
+            index=models.Index(fields=['model', 'final_price', 'id'], name='priceentry_model_price_idx'),
+        ),
+    ]
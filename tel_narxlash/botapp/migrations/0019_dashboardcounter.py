@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('botapp', '0018_priceentry_model_price_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Nomi')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Qiymati')),
+                ('counted_at', models.DateTimeField(verbose_name='Sanalgan vaqti')),
+            ],
+            options={
+                'verbose_name': 'Hisoblagich',
+                'verbose_name_plural': 'Hisoblagichlar',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('botapp', '0019_dashboardcounter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='iphonemodel',
+            name='default_sim_type',
+            field=models.CharField(choices=[('physical', 'SIM karta'), ('esim', 'eSIM'), ('1imei', '1 IMEI'), ('2imei', '2 IMEI')], default='physical', help_text='iPhone 11-13: SIM karta, iPhone 14+: eSIM', max_length=20, verbose_name='Standart SIM turi'),
+        ),
+        migrations.AlterField(
+            model_name='priceentry',
+            name='sim_type',
+            field=models.CharField(choices=[('physical', 'SIM karta'), ('esim', 'eSIM'), ('1imei', '1 IMEI'), ('2imei', '2 IMEI')], max_length=20, verbose_name='SIM turi'),
+        ),
+    ]
@@ -1,5 +1,7 @@
 # models.py - TO'LIQ VERSIYA (RECURSION FIX)
 from django.db import models
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 
@@ -329,6 +331,54 @@ class ReplacedPartCombination(models.Model):
                 )
 
 
+class PriceEntryQuerySet(models.QuerySet):
+    def with_computed_price(self):
+        """
+        calculate_price() ning SQL ekvivalenti — 'computed_price' annotatsiyasi.
+
+        Qismlar yig'indisi korrelyatsiyalangan subquery bilan olinadi,
+        shuning uchun qatorlar ko'paymaydi va replaced_parts so'ralmaydi.
+        """
+        money = models.DecimalField(max_digits=15, decimal_places=2)
+        zero = Value(0, output_field=money)
+        parts_total = Subquery(
+            self.model.replaced_parts.through.objects
+            .filter(priceentry_id=OuterRef('pk'))
+            .values('priceentry_id')
+            .annotate(total=Sum('replacedpart__price_reduction'))
+            .values('total')[:1],
+            output_field=money,
+        )
+
+        price = (
+            F('model__base_standard_price')
+            + F('storage__price_difference')
+            + Coalesce(F('color__price_difference'), zero)
+            + F('battery__price_difference')
+            + Case(When(has_box=False, then=F('model__box_price_difference')), default=zero)
+            + Case(
+                When(~Q(sim_type=F('model__default_sim_type')),
+                     then=F('model__alternative_sim_price_difference')),
+                default=zero,
+            )
+            + Case(
+                When(combination__isnull=False, then=F('combination__custom_price')),
+                default=Coalesce(parts_total, zero),
+            )
+            + F('manual_adjustment')
+        )
+        return self.annotate(computed_price=Greatest(price, zero, output_field=money))
+
+    def refresh_final_price(self):
+        """final_price ni shu queryset qatorlari uchun bitta UPDATE bilan qayta hisoblash"""
+        computed = self.model.objects.with_computed_price().filter(pk=OuterRef('pk'))
+        return self.update(final_price=Subquery(computed.values('computed_price')[:1]))
+
+
+class PriceEntryManager(models.Manager.from_queryset(PriceEntryQuerySet)):
+    use_in_migrations = True
+
+
 class PriceEntry(models.Model):
     """TELEFON NARXI - kombinatsiya yoki alohida"""
     model = models.ForeignKey(iPhoneModel, on_delete=models.CASCADE, related_name='prices', verbose_name=_("Model"))
@@ -377,6 +427,18 @@ class PriceEntry(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Yaratilgan"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Yangilangan"))
 
+    # calculate_price() natijasi — signals.py dagi signallar orqali yangilanadi
+    final_price = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0,
+        db_index=True,
+        editable=False,
+        verbose_name=_("Yakuniy narx ($)")
+    )
+
+    objects = PriceEntryManager()
+
     def calculate_price(self):
         """
         Avtomatik narx hisoblash
@@ -390,36 +452,12 @@ class PriceEntry(models.Model):
         6. + SIM farqi (agar boshqa bo'lsa)
         7. + Kombinatsiya YOKI Alohida qismlar
         8. + Qo'lda sozlash
-        """
-        price = self.model.base_standard_price
-
-        if self.storage:
-            price += self.storage.price_difference
-
-        if self.color:
-            price += self.color.price_difference
-
-        if self.battery:
-            price += self.battery.price_difference
-
-        if not self.has_box:
-            price += self.model.box_price_difference
 
-        if self.sim_type != self.model.default_sim_type:
-            price += self.model.alternative_sim_price_difference
-
-        # KOMBINATSIYA yoki ALOHIDA
-        if self.combination:
-            # Kombinatsiya tanlangan - uning narxini qo'shish
-            price += self.combination.custom_price
-        else:
-            # Kombinatsiya yo'q - alohida qismlarni hisoblash
-            for part in self.replaced_parts.all():
-                price += part.price_reduction
-
-        price += self.manual_adjustment
-
-        return max(price, 0)
+        Hisob pricing.calculate() da — model snapshot i keshlangan bo'lsa
+        faqat replaced_parts so'raladi.
+        """
+        from .pricing import calculate_for_entry
+        return calculate_for_entry(self).price
 
     def get_final_price(self):
         """Yakuniy narx (dollar)"""
@@ -460,43 +498,11 @@ class PriceEntry(models.Model):
 
     def get_price_breakdown(self):
         """Narx tarkibini ko'rsatish"""
-        breakdown = []
-
-        breakdown.append(f"Standart: ${self.model.base_standard_price:,.2f}")
+        from .pricing import breakdown_lines, calculate_for_entry, get_snapshot
 
-        if self.storage and self.storage.price_difference != 0:
-            breakdown.append(f"Xotira ({self.storage.size}): ${self.storage.price_difference:+,.2f}")
-
-        if self.color and self.color.price_difference != 0:
-            breakdown.append(f"Rang ({self.color.name}): ${self.color.price_difference:+,.2f}")
-
-        if self.battery and self.battery.price_difference != 0:
-            breakdown.append(f"Batareya ({self.battery.label}): ${self.battery.price_difference:+,.2f}")
-
-        if not self.has_box:
-            breakdown.append(f"Quti yo'q: ${self.model.box_price_difference:+,.2f}")
-
-        if self.sim_type != self.model.default_sim_type:
-            sim_label = "eSIM" if self.sim_type == 'esim' else "SIM karta"
-            breakdown.append(f"{sim_label}: ${self.model.alternative_sim_price_difference:+,.2f}")
-
-        # KOMBINATSIYA yoki ALOHIDA
-        if self.combination:
-            parts_list = ", ".join([p.get_part_type_display() for p in self.combination.parts.all()])
-            individual_total = self.combination.get_individual_total()
-            breakdown.append(
-                f"🎯 KOMBINATSIYA ({parts_list}): "
-                f"${self.combination.custom_price:+,.2f} "
-                f"[alohida: ${individual_total:+,.2f}]"
-            )
-        elif self.replaced_parts.exists():
-            for part in self.replaced_parts.all():
-                breakdown.append(f"{part.get_part_type_display()}: ${part.price_reduction:+,.2f}")
-
-        if self.manual_adjustment != 0:
-            breakdown.append(f"Qo'lda: ${self.manual_adjustment:+,.2f}")
-
-        breakdown.append(f"= {self.get_final_price_display()}")
+        result = calculate_for_entry(self)
+        breakdown = breakdown_lines(get_snapshot(self.model_id), result, combination_id=self.combination_id)
+        breakdown.append(f"= ${result.price:,.2f}")
 
         return " | ".join(breakdown)
 
@@ -508,6 +514,10 @@ class PriceEntry(models.Model):
         verbose_name = _("Telefon narxi")
         verbose_name_plural = _("Telefon narxlari")
         ordering = ['-created_at']
+        indexes = [
+            # price_list: model filter + narx bo'yicha keyset sahifalash
+            models.Index(fields=['model', 'final_price', 'id'], name='priceentry_model_price_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         """✅ RECURSION FIX - calculate_price() ni chaqirmaslik"""
@@ -528,4 +538,18 @@ class PriceEntry(models.Model):
             raise ValidationError(
                 "❌ Kombinatsiya va alohida qismlar bir vaqtda tanlanishi mumkin emas! "
                 "Faqat birini tanlang."
-            )
\ No newline at end of file
+            )
+
+class DashboardCounter(models.Model):
+    """Admin bosh sahifasi hisoblagichi (counters.py) — barcha worker lar uchun umumiy"""
+    name = models.CharField(_("Nomi"), max_length=50, primary_key=True)
+    value = models.BigIntegerField(_("Qiymati"), default=0)
+    # Oxirgi marta bazadan sanalgan vaqt (adjust() uni o'zgartirmaydi)
+    counted_at = models.DateTimeField(_("Sanalgan vaqti"))
+
+    class Meta:
+        verbose_name = _("Hisoblagich")
+        verbose_name_plural = _("Hisoblagichlar")
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
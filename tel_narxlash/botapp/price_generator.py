@@ -0,0 +1,121 @@
+# price_generator.py - PriceEntry MATRITSASINI TO'PLAM ASOSIDA YARATISH
+#
+# bulk_generate_view avval 5 ta ichma-ich sikl ichida har bir nomzod uchun
+# filter/.count()/.create() qilardi (bitta model uchun o'n minglab so'rov).
+# Endi: mavjud yozuvlar bitta so'rov bilan "imzo" larga aylantiriladi,
+# dekart ko'paytma xotirada hisoblanadi, farqi esa bo'laklab bulk_create
+# qilinadi va qismlar through model ga bitta bulk insert bilan yoziladi.
+import time
+from itertools import product
+
+from . import counters
+from .models import PriceEntry
+
+BULK_CHUNK_SIZE = 2000
+
+
+def existing_entry_signatures(model):
+    """
+    Model uchun mavjud yozuvlar imzolari (bitta so'rov).
+
+    Kalit: (storage_id, color_id, sim_type, battery_id, has_box).
+    Qaytaradi: (plain, combos) — plain: {(kalit, frozenset(qism_id))}
+    kombinatsiyasiz yozuvlar, combos: {(kalit, combination_id)}.
+    """
+    rows = PriceEntry.objects.filter(model=model).values_list(
+        'id', 'storage_id', 'color_id', 'sim_type', 'battery_id', 'has_box',
+        'combination_id', 'replaced_parts'
+    )
+
+    entries = {}
+    for entry_id, storage_id, color_id, sim_type, battery_id, has_box, combination_id, part_id in rows:
+        entry = entries.get(entry_id)
+        if entry is None:
+            key = (storage_id, color_id, sim_type, battery_id, has_box)
+            entry = entries[entry_id] = (key, combination_id, set())
+        if part_id is not None:
+            entry[2].add(part_id)
+
+    plain, combos = set(), set()
+    for key, combination_id, parts in entries.values():
+        if combination_id is None:
+            plain.add((key, frozenset(parts)))
+        else:
+            combos.add((key, combination_id))
+    return plain, combos
+
+
+def generate_price_entries(model, storages, colors, batteries, sim_types, box_options,
+                           include_clean=True, combinations=(), individual_parts=()):
+    """
+    Tanlangan variantlarning to'liq matritsasini yaratish.
+
+    Har bir (xotira × rang × batareya × SIM × quti) uchun: yangi telefon,
+    har bir kombinatsiya va har bir alohida qism. Mavjudlari o'tkazib
+    yuboriladi. Qaytaradi: {'created', 'skipped', 'elapsed'}.
+    """
+    start = time.monotonic()
+    plain, combos = existing_entry_signatures(model)
+
+    variants = []  # (storage, color, sim, battery, has_box, combination, part)
+    skipped = 0
+
+    for storage, color, battery, sim_type, box_opt in product(
+            storages, colors, batteries, sim_types, box_options):
+        has_box = (box_opt == 'yes')
+        key = (storage.pk, color.pk, sim_type, battery.pk, has_box)
+        base = (storage, color, sim_type, battery, has_box)
+
+        # 1. YANGI TELEFON
+        if include_clean:
+            if (key, frozenset()) in plain:
+                skipped += 1
+            else:
+                variants.append(base + (None, None))
+
+        # 2. KOMBINATSIYALAR
+        for combination in combinations:
+            if (key, combination.pk) in combos:
+                skipped += 1
+            else:
+                variants.append(base + (combination, None))
+
+        # 3. ALOHIDA QISMLAR
+        for part in individual_parts:
+            if (key, frozenset((part.pk,))) in plain:
+                skipped += 1
+            else:
+                variants.append(base + (None, part))
+
+    Through = PriceEntry.replaced_parts.through
+    through_rows, created_ids = [], []
+
+    for offset in range(0, len(variants), BULK_CHUNK_SIZE):
+        chunk = variants[offset:offset + BULK_CHUNK_SIZE]
+        entries = PriceEntry.objects.bulk_create([
+            PriceEntry(
+                model=model, storage=storage, color=color, sim_type=sim_type,
+                battery=battery, has_box=has_box, combination=combination
+            )
+            for storage, color, sim_type, battery, has_box, combination, _ in chunk
+        ])
+        created_ids.extend(entry.pk for entry in entries)
+        through_rows.extend(
+            Through(priceentry_id=entry.pk, replacedpart_id=variant[6].pk)
+            for entry, variant in zip(entries, chunk)
+            if variant[6] is not None
+        )
+
+    if through_rows:
+        Through.objects.bulk_create(through_rows, batch_size=BULK_CHUNK_SIZE)
+
+    # bulk_create signal chaqirmaydi — final_price ni shu yerda hisoblaymiz
+    for offset in range(0, len(created_ids), BULK_CHUNK_SIZE):
+        PriceEntry.objects.filter(pk__in=created_ids[offset:offset + BULK_CHUNK_SIZE]).refresh_final_price()
+    counters.adjust('total_prices', len(created_ids))
+
+    return {
+        'created': len(variants),
+        'skipped': skipped,
+        'elapsed': time.monotonic() - start,
+    }
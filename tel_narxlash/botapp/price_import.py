@@ -0,0 +1,166 @@
+# price_import.py - EXCEL DAN PriceEntry IMPORTI (PRELOAD + BULK)
+#
+# Avval har bir qator uchun 8+ ta so'rov bajarilardi (model, xotira, rang,
+# batareya, kombinatsiya, .exists(), har bir qism). Endi model bo'yicha
+# katalog bir marta lug'atlarga yuklanadi, mavjud yozuvlar kalitlari esa
+# xotiradagi set da saqlanadi. Yangi yozuvlar bo'lak-bo'lak bulk_create
+# qilinadi, M2M qismlar esa through model orqali bitta bulk_create bilan.
+from . import counters
+from .models import iPhoneModel, PriceEntry
+
+SIM_MAP = {'Physical': 'physical', 'SIM karta': 'physical', 'eSIM': 'esim'}
+
+
+def _lower(value):
+    return str(value).lower() if value is not None else ''
+
+
+class ModelCatalog:
+    """Bitta modelning xotira/rang/batareya/qism/kombinatsiyalari (preload)"""
+
+    def __init__(self, model):
+        self.model = model
+        self.storages = {s.size: s for s in model.storages.all()}
+        self.batteries = {b.label: b for b in model.battery_ranges.all()}
+        self.colors = list(model.available_colors.all())
+        self.combinations = {}
+        for combo in model.part_combinations.filter(is_active=True):
+            self.combinations.setdefault(combo.name, combo)
+        self.parts = list(model.replaced_parts.filter(is_active=True))
+
+        # Mavjud yozuvlar: (storage, color, sim, battery, has_box, combination)
+        self.existing = set(
+            PriceEntry.objects.filter(model=model).values_list(
+                'storage_id', 'color_id', 'sim_type', 'battery_id', 'has_box', 'combination_id'
+            )
+        )
+        self._color_cache = {}
+        self._part_cache = {}
+
+    def find_color(self, name):
+        """name__icontains ning xotiradagi ekvivalenti (birinchi mos kelgan)"""
+        key = _lower(name)
+        if key not in self._color_cache:
+            self._color_cache[key] = next(
+                (c for c in self.colors if key in c.name.lower()), None
+            )
+        return self._color_cache[key]
+
+    def find_part(self, name):
+        """part_type__icontains ning xotiradagi ekvivalenti"""
+        key = _lower(name)
+        if key not in self._part_cache:
+            self._part_cache[key] = next(
+                (p for p in self.parts if key in p.part_type.lower()), None
+            )
+        return self._part_cache[key]
+
+
+class PriceEntryImporter:
+    """
+    ExcelSheetReader qatorlaridan PriceEntry yaratish.
+
+    Ustunlar tartibi: Model, Xotira, Rang, SIM, Batareya, Quti, Qismlar,
+    Kombinatsiya, Narx. import_batch() har bir RowBatch uchun chaqiriladi.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self._models = list(iPhoneModel.objects.all())
+        self._model_cache = {}
+        self._catalogs = {}
+
+    def _find_model(self, name):
+        key = _lower(name)
+        if key not in self._model_cache:
+            self._model_cache[key] = next(
+                (m for m in self._models if key in m.name.lower()), None
+            ) if key else None
+        return self._model_cache[key]
+
+    def _catalog(self, model):
+        catalog = self._catalogs.get(model.pk)
+        if catalog is None:
+            catalog = self._catalogs[model.pk] = ModelCatalog(model)
+        return catalog
+
+    def import_batch(self, batch):
+        """Bitta bo'lakni import qilish: bitta bulk_create + bitta M2M bulk_create"""
+        entries, entry_parts = [], []
+
+        for row_num, row in zip(batch.row_numbers, batch.rows):
+            try:
+                model_name, storage_size, color_name, sim_type, battery_label, has_box_str, parts_str, combination_str, price_str = row
+
+                model = self._find_model(model_name)
+                if not model:
+                    self.errors.append(f"Qator {row_num}: Model '{model_name}' topilmadi")
+                    continue
+                catalog = self._catalog(model)
+
+                storage = catalog.storages.get(str(storage_size))
+                if not storage:
+                    self.errors.append(f"Qator {row_num}: Xotira '{storage_size}' topilmadi")
+                    continue
+
+                color = catalog.find_color(color_name) if color_name else None
+
+                battery = catalog.batteries.get(str(battery_label))
+                if not battery:
+                    self.errors.append(f"Qator {row_num}: Batareya '{battery_label}' topilmadi")
+                    continue
+
+                sim_type_value = SIM_MAP.get(sim_type, 'physical')
+                has_box = has_box_str == "Bor"
+
+                combination = None
+                if combination_str:
+                    # Kombinatsiya nomini tozalash
+                    clean_combo_name = combination_str.replace("🎯 ", "").strip()
+                    combination = catalog.combinations.get(clean_combo_name)
+
+                # Qo'shimcha: parts_str ni tozalash
+                clean_parts_str = str(parts_str or "").replace("🔧 ", "").replace(", ", "+").strip()
+
+                key = (
+                    storage.pk, color.pk if color else None, sim_type_value,
+                    battery.pk, has_box, combination.pk if combination else None
+                )
+                if key in catalog.existing:
+                    self.skipped += 1
+                    continue
+                catalog.existing.add(key)
+
+                parts = set()
+                if not combination and clean_parts_str and clean_parts_str != "Yangi":
+                    for part_name in clean_parts_str.split("+"):
+                        part = catalog.find_part(part_name)
+                        if part:
+                            parts.add(part.pk)
+
+                entries.append(PriceEntry(
+                    model=model, storage=storage, color=color,
+                    sim_type=sim_type_value, battery=battery, has_box=has_box,
+                    combination=combination
+                ))
+                entry_parts.append(parts)
+
+            except Exception as e:
+                self.errors.append(f"Qator {row_num}: {str(e)}")
+
+        if not entries:
+            return
+
+        PriceEntry.objects.bulk_create(entries)
+
+        Through = PriceEntry.replaced_parts.through
+        Through.objects.bulk_create([
+            Through(priceentry_id=entry.pk, replacedpart_id=part_id)
+            for entry, parts in zip(entries, entry_parts)
+            for part_id in parts
+        ])
+        PriceEntry.objects.filter(pk__in=[entry.pk for entry in entries]).refresh_final_price()
+        counters.adjust('total_prices', len(entries))
+        self.created += len(entries)
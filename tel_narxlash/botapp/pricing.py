@@ -0,0 +1,417 @@
+# pricing.py - NARX HISOBLASH DVIGATELI
+#
+# Model uchun barcha narx farqlari (xotira, rang, batareya, qismlar,
+# kombinatsiyalar) bitta UNION ALL so'rov bilan o'zgarmas PricingSnapshot
+# ga yuklanadi va (model, versiya) bo'yicha keshlanadi.
+# Narx va uning tarkibi calculate() — DB ga murojaat qilmaydigan sof
+# funksiya. api_calculate (quote), PriceEntry.calculate_price va
+# get_price_breakdown shu funksiyadan, tarkib matni esa breakdown_lines()
+# dan foydalanadi.
+#
+# Versiya signals.py da katalog o'zgarganda yangilanadi va Django keshida
+# turadi. Kesh umumiy bo'lsa (Redis, Memcached) har narx hisobida keshga
+# bormaslik uchun jarayon uni VERSION_CHECK_INTERVAL soniya eslab qoladi —
+# boshqa worker dagi o'zgarish shu muddatda ko'rinadi. Kesh jarayonga xos
+# bo'lsa (default LocMemCache, versions_shared() False), boshqa worker lar
+# eski snapshot ni ko'pi bilan SNAPSHOT_TTL soniya ishlatadi.
+import time
+from decimal import Decimal
+from types import MappingProxyType
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import models
+from django.db.models import F, Value
+
+from .models import (
+    iPhoneModel, StorageOption, Color,
+    BatteryRange, ReplacedPart, ReplacedPartCombination
+)
+
+SNAPSHOT_TTL = 300
+
+# Versiya jarayon xotirasida shuncha soniya qayta tekshirilmaydi
+VERSION_CHECK_INTERVAL = 2
+
+PART_LABELS = dict(ReplacedPart.PART_CHOICES)
+
+
+class Option(NamedTuple):
+    """Xotira / rang / batareya"""
+    id: int
+    label: str
+    delta: Decimal
+
+
+class Part(NamedTuple):
+    id: int
+    part_type: str
+    label: str
+    delta: Decimal
+    is_active: bool
+    order: int
+
+
+class Combination(NamedTuple):
+    id: int
+    name: str
+    custom_price: Decimal
+    is_active: bool
+    part_ids: tuple
+
+
+class PricingSnapshot(NamedTuple):
+    model_id: int
+    is_active: bool
+    default_sim_type: str
+    base_price: Decimal
+    box_delta: Decimal
+    sim_delta: Decimal
+    storages: MappingProxyType
+    colors: MappingProxyType
+    batteries: MappingProxyType
+    parts: MappingProxyType
+    combinations: MappingProxyType
+
+    def individual_total(self, combination_id):
+        """Kombinatsiya qismlarining alohida hisoblangan jami"""
+        combination = self.combinations[combination_id]
+        return sum((self.parts[pk].delta for pk in combination.part_ids), Decimal('0'))
+
+
+class BreakdownItem(NamedTuple):
+    # kind: base, storage, color, battery, box, sim, combination, part, manual
+    kind: str
+    label: str
+    amount: Decimal
+
+
+class PriceResult(NamedTuple):
+    price: Decimal
+    items: tuple
+
+
+class PriceBounds(NamedTuple):
+    """Kalkulyatorda olinishi mumkin bo'lgan eng past / eng yuqori narx"""
+    min_price: Decimal
+    max_price: Decimal
+    # Har bir o'lcham bo'yicha (eng past, eng yuqori) farq
+    storage: tuple
+    color: tuple
+    battery: tuple
+    box: tuple
+    sim: tuple
+    parts: tuple
+
+
+# ============= SNAPSHOT YUKLASH =============
+
+def _snapshot_rows(model_id):
+    """Model va uning barcha narx farqlari — bitta UNION ALL so'rov"""
+    money = models.DecimalField(max_digits=15, decimal_places=2)
+    columns = ('k', 'i', 'r', 'l', 'a', 'a2', 'a3', 'f', 'o')
+
+    def branch(queryset, kind, ref=None, label=None, amount=None, amount2=None, amount3=None,
+               flag=None, order=None, pk='id'):
+        return queryset.annotate(
+            k=Value(kind, output_field=models.CharField()),
+            i=F(pk),
+            r=F(ref) if ref else Value(None, output_field=models.IntegerField()),
+            l=F(label) if label else Value('', output_field=models.CharField()),
+            a=F(amount) if amount else Value(None, output_field=money),
+            a2=F(amount2) if amount2 else Value(None, output_field=money),
+            a3=F(amount3) if amount3 else Value(None, output_field=money),
+            f=F(flag) if flag else Value(True, output_field=models.BooleanField()),
+            o=F(order) if order else Value(0, output_field=models.IntegerField()),
+        ).values_list(*columns).order_by()
+
+    Through = ReplacedPartCombination.parts.through
+    head = branch(
+        iPhoneModel.objects.filter(pk=model_id), 'model',
+        label='default_sim_type', amount='base_standard_price',
+        amount2='box_price_difference', amount3='alternative_sim_price_difference',
+        flag='is_active',
+    )
+    return head.union(
+        branch(StorageOption.objects.filter(model_id=model_id), 'storage',
+               label='size', amount='price_difference'),
+        branch(Color.objects.filter(model_id=model_id), 'color',
+               label='name', amount='price_difference'),
+        branch(BatteryRange.objects.filter(model_id=model_id), 'battery',
+               label='label', amount='price_difference'),
+        branch(ReplacedPart.objects.filter(model_id=model_id), 'part',
+               label='part_type', amount='price_reduction', flag='is_active', order='order'),
+        branch(ReplacedPartCombination.objects.filter(model_id=model_id), 'combination',
+               label='name', amount='custom_price', flag='is_active', order='priority'),
+        branch(Through.objects.filter(replacedpartcombination__model_id=model_id), 'combination_part',
+               pk='replacedpartcombination_id', ref='replacedpart_id'),
+        all=True,
+    )
+
+
+def load_snapshot(model_id):
+    """DB dan snapshot yuklash (model topilmasa iPhoneModel.DoesNotExist)"""
+    head = None
+    options = {'storage': {}, 'color': {}, 'battery': {}}
+    parts, combinations, combination_parts = {}, {}, {}
+
+    for kind, pk, ref, label, amount, amount2, amount3, flag, order in _snapshot_rows(model_id):
+        if kind == 'model':
+            head = (flag, label, amount, amount2, amount3)
+        elif kind in options:
+            options[kind][pk] = Option(pk, label, amount)
+        elif kind == 'part':
+            parts[pk] = Part(pk, label, PART_LABELS.get(label, label), amount, flag, order)
+        elif kind == 'combination':
+            combinations[pk] = (label, amount, flag)
+        elif kind == 'combination_part':
+            combination_parts.setdefault(pk, []).append(ref)
+
+    if head is None:
+        raise iPhoneModel.DoesNotExist(f"Model {model_id} topilmadi")
+
+    is_active, default_sim_type, base_price, box_delta, sim_delta = head
+
+    def part_order(pk):
+        # ReplacedPart.Meta.ordering bilan bir xil
+        part = parts.get(pk)
+        return (part.order, part.part_type) if part else (0, '')
+
+    return PricingSnapshot(
+        model_id=model_id,
+        is_active=is_active,
+        default_sim_type=default_sim_type,
+        base_price=base_price,
+        box_delta=box_delta,
+        sim_delta=sim_delta,
+        storages=MappingProxyType(options['storage']),
+        colors=MappingProxyType(options['color']),
+        batteries=MappingProxyType(options['battery']),
+        parts=MappingProxyType(parts),
+        combinations=MappingProxyType({
+            pk: Combination(pk, name, custom_price, is_active,
+                            tuple(sorted(combination_parts.get(pk, ()), key=part_order)))
+            for pk, (name, custom_price, is_active) in combinations.items()
+        }),
+    )
+
+
+# ============= CACHE =============
+#
+# Versiya Django cache da (barcha worker lar uchun umumiy bo'lishi mumkin),
+# snapshot ning o'zi esa jarayon xotirasida: model_id -> (versiya, vaqt, snapshot).
+# Shunda issiq holatda na DB, na pickle bo'ladi.
+
+_snapshots = {}
+_bounds = {}
+_versions = {}  # model_id -> (versiya, tekshirilgan vaqt)
+
+def versions_shared():
+    """Versiyalar barcha worker lar uchun umumiy keshdami (LocMem / Dummy — yo'q)"""
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+def _version_key(model_id):
+    return f'pricing:version:{model_id}'
+
+
+def get_version(model_id):
+    model_id = int(model_id)
+    now = time.monotonic()
+    checked = _versions.get(model_id)
+    if checked is not None and now - checked[1] < VERSION_CHECK_INTERVAL:
+        return checked[0]
+
+    version = cache.get(_version_key(model_id))
+    if version is None:
+        version = time.time_ns()
+        cache.add(_version_key(model_id), version, None)
+        version = cache.get(_version_key(model_id), version)
+    _versions[model_id] = (version, now)
+    return version
+
+
+def bump_version(model_id):
+    """Model katalogi o'zgardi — keyingi get_snapshot() qayta yuklaydi"""
+    model_id = int(model_id)
+    version = time.time_ns()
+    cache.set(_version_key(model_id), version, None)
+    _versions[model_id] = (version, time.monotonic())
+
+
+def get_snapshot(model_id, refresh=False):
+    """Joriy versiyadagi snapshot (yo'q, eskirgan yoki refresh=True — DB dan)"""
+    model_id = int(model_id)
+    version = get_version(model_id)
+    cached = _snapshots.get(model_id)
+    now = time.monotonic()
+
+    if refresh or cached is None or cached[0] != version or now - cached[1] > SNAPSHOT_TTL:
+        cached = _snapshots[model_id] = (version, now, load_snapshot(model_id))
+    return cached[2]
+
+
+# ============= HISOBLASH =============
+
+def _extremes(deltas, optional=False):
+    """(eng past, eng yuqori); optional — tanlamaslik (0) ham mumkin"""
+    values = list(deltas)
+    if optional or not values:
+        values.append(Decimal('0'))
+    return min(values), max(values)
+
+
+def price_bounds(snapshot):
+    """
+    calculate() natijasining chegaralari (api_calculate tanlov maydoni bo'yicha).
+
+    Rang ixtiyoriy, quti bor/yo'q, SIM standart/boshqa, faol qismlardan
+    istalgan to'plam. Narx 0 dan pastga tushmaydi.
+    """
+    active_parts = [part.delta for part in snapshot.parts.values() if part.is_active]
+    dimensions = {
+        'storage': _extremes(option.delta for option in snapshot.storages.values()),
+        'color': _extremes((option.delta for option in snapshot.colors.values()), optional=True),
+        'battery': _extremes(option.delta for option in snapshot.batteries.values()),
+        'box': _extremes([snapshot.box_delta], optional=True),
+        'sim': _extremes([snapshot.sim_delta], optional=True),
+        'parts': (sum((d for d in active_parts if d < 0), Decimal('0')),
+                  sum((d for d in active_parts if d > 0), Decimal('0'))),
+    }
+    low = snapshot.base_price + sum(extremes[0] for extremes in dimensions.values())
+    high = snapshot.base_price + sum(extremes[1] for extremes in dimensions.values())
+    return PriceBounds(max(low, Decimal('0')), max(high, Decimal('0')), **dimensions)
+
+
+def get_price_bounds(model_id):
+    """Joriy snapshot uchun chegaralar (snapshot o'zgarmaguncha qayta hisoblanmaydi)"""
+    snapshot = get_snapshot(model_id)
+    cached = _bounds.get(snapshot.model_id)
+    if cached is None or cached[0] is not snapshot:
+        cached = _bounds[snapshot.model_id] = (snapshot, price_bounds(snapshot))
+    return cached[1]
+
+
+def calculate(snapshot, storage_id, battery_id, color_id=None, sim_type=None, has_box=True,
+              part_ids=(), combination_id=None, manual_adjustment=Decimal('0')):
+    """
+    Narx va tarkibini hisoblash (sof funksiya, DB siz).
+
+    Snapshot da yo'q id (xotira, batareya, rang, qism, kombinatsiya) —
+    KeyError. Kombinatsiya berilsa qismlar hisobga olinmaydi.
+    """
+    storage = snapshot.storages[storage_id]
+    battery = snapshot.batteries[battery_id]
+    color = snapshot.colors[color_id] if color_id else None
+
+    items = [BreakdownItem('base', '', snapshot.base_price),
+             BreakdownItem('storage', storage.label, storage.delta)]
+    if color:
+        items.append(BreakdownItem('color', color.label, color.delta))
+    items.append(BreakdownItem('battery', battery.label, battery.delta))
+
+    if not has_box:
+        items.append(BreakdownItem('box', '', snapshot.box_delta))
+
+    if sim_type != snapshot.default_sim_type:
+        items.append(BreakdownItem('sim', sim_type or '', snapshot.sim_delta))
+
+    if combination_id:
+        combination = snapshot.combinations[combination_id]
+        items.append(BreakdownItem('combination', combination.name, combination.custom_price))
+    else:
+        for pk in part_ids:
+            part = snapshot.parts[pk]
+            items.append(BreakdownItem('part', part.label, part.delta))
+
+    items.append(BreakdownItem('manual', '', manual_adjustment))
+
+    price = sum((item.amount for item in items), Decimal('0'))
+    return PriceResult(max(price, Decimal('0')), tuple(items))
+
+
+def breakdown_lines(snapshot, result, combination_id=None, decimals=2):
+    """calculate() natijasi tarkibining matni: ['Standart: $500.00', 'Xotira (256GB): $+50.00', ...]"""
+    def money(amount, signed=True):
+        return f"${amount:{'+' if signed else ''},.{decimals}f}"
+
+    titles = {'storage': "Xotira", 'color': "Rang", 'battery': "Batareya"}
+    lines = []
+    for item in result.items:
+        if item.kind == 'base':
+            lines.append(f"Standart: {money(item.amount, signed=False)}")
+        elif item.kind in titles and item.amount != 0:
+            lines.append(f"{titles[item.kind]} ({item.label}): {money(item.amount)}")
+        elif item.kind == 'box':
+            lines.append(f"Quti yo'q: {money(item.amount)}")
+        elif item.kind == 'sim':
+            sim_label = "eSIM" if item.label == 'esim' else "SIM karta"
+            lines.append(f"{sim_label}: {money(item.amount)}")
+        elif item.kind == 'combination':
+            combination = snapshot.combinations[combination_id]
+            parts_list = ", ".join(snapshot.parts[pk].label for pk in combination.part_ids)
+            lines.append(
+                f"🎯 KOMBINATSIYA ({parts_list}): {money(item.amount)} "
+                f"[alohida: {money(snapshot.individual_total(combination_id))}]"
+            )
+        elif item.kind == 'part':
+            lines.append(f"{item.label}: {money(item.amount)}")
+        elif item.kind == 'manual' and item.amount != 0:
+            lines.append(f"Qo'lda: {money(item.amount)}")
+    return lines
+
+
+def quote(model_id, storage_id, battery_id, color_id=None, sim_type=None, has_box=True, part_ids=()):
+    """
+    Kalkulyator (api_calculate) javobi: {'price', 'price_display', 'breakdown'}.
+
+    Noma'lum rang e'tiborsiz qoldiriladi, qismlardan faqat faollari olinadi.
+    Model topilmasa yoki faol bo'lmasa, xotira / batareya modelga tegishli
+    bo'lmasa — None.
+    """
+    def load(refresh=False):
+        try:
+            snapshot = get_snapshot(model_id, refresh=refresh)
+        except iPhoneModel.DoesNotExist:
+            return None
+        if snapshot.is_active and storage_id in snapshot.storages and battery_id in snapshot.batteries:
+            return snapshot
+        return None
+
+    # Cache boshqa worker da eskirgan bo'lishi mumkin — bir marta qayta yuklaymiz
+    snapshot = load() or load(refresh=True)
+    if snapshot is None:
+        return None
+
+    parts = snapshot.parts
+    part_ids = sorted(
+        (pk for pk in set(part_ids) if pk in parts and parts[pk].is_active),
+        key=lambda pk: (parts[pk].order, parts[pk].part_type)
+    )
+    result = calculate(
+        snapshot, storage_id, battery_id,
+        color_id=color_id if color_id in snapshot.colors else None,
+        sim_type=sim_type, has_box=has_box, part_ids=part_ids
+    )
+    return {
+        'price': float(result.price),
+        'price_display': f"${result.price:,.0f}",
+        'breakdown': breakdown_lines(snapshot, result, decimals=0),
+    }
+
+
+def calculate_for_entry(entry):
+    """PriceEntry uchun hisoblash (faqat replaced_parts so'raladi, prefetch bo'lsa — yo'q)"""
+    part_ids = () if entry.combination_id else [part.pk for part in entry.replaced_parts.all()]
+    arguments = dict(
+        storage_id=entry.storage_id, battery_id=entry.battery_id, color_id=entry.color_id,
+        sim_type=entry.sim_type, has_box=entry.has_box, part_ids=part_ids,
+        combination_id=entry.combination_id, manual_adjustment=entry.manual_adjustment,
+    )
+    try:
+        return calculate(get_snapshot(entry.model_id), **arguments)
+    except KeyError:
+        # Cache boshqa worker da eskirgan bo'lishi mumkin — bir marta qayta yuklaymiz
+        return calculate(get_snapshot(entry.model_id, refresh=True), **arguments)
@@ -0,0 +1,148 @@
+# signals.py - PriceEntry.final_price NI YANGILAB TURISH
+#
+# final_price calculate_price() ning saqlangan natijasi. Narxga ta'sir
+# qiluvchi har qanday qiymat o'zgarganda faqat unga bog'liq yozuvlar
+# bitta UPDATE bilan qayta hisoblanadi (refresh_final_price).
+#
+# Shu yerda pricing.py snapshot versiyasi va admin bosh sahifasi
+# hisoblagichlari (counters.py) ham yangilanadi.
+#
+# bulk_create signal chaqirmaydi — price_import.py va price_generator.py
+# yaratilgan yozuvlar uchun refresh_final_price() ni o'zlari chaqiradi.
+# PriceEntry ga post_delete ulanmagan — aks holda kaskad o'chirish tez
+# yo'lni (fast delete) yo'qotadi; o'chirishni admin o'zi hisoblaydi.
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    iPhoneModel, StorageOption, Color,
+    BatteryRange, ReplacedPart, ReplacedPartCombination, PriceEntry
+)
+from . import counters
+from .pricing import bump_version
+
+# model -> (narxga ta'sir qiluvchi maydonlar, PriceEntry dagi lookup)
+PRICE_INPUTS = {
+    iPhoneModel: (
+        ('base_standard_price', 'box_price_difference',
+         'alternative_sim_price_difference', 'default_sim_type'),
+        'model',
+    ),
+    StorageOption: (('price_difference',), 'storage'),
+    Color: (('price_difference',), 'color'),
+    BatteryRange: (('price_difference',), 'battery'),
+    ReplacedPart: (('price_reduction',), 'replaced_parts'),
+    ReplacedPartCombination: (('custom_price',), 'combination'),
+}
+
+
+def _track_price_inputs(sender, instance, **kwargs):
+    """Saqlashdan oldin: narx maydonlari o'zgardimi?"""
+    fields, _ = PRICE_INPUTS[sender]
+    old = sender.objects.filter(pk=instance.pk).values(*fields).first() if instance.pk else None
+    instance._price_inputs_changed = old is not None and any(
+        old[field] != getattr(instance, field) for field in fields
+    )
+
+
+def _refresh_dependents(sender, instance, created, **kwargs):
+    """Saqlangandan keyin: bog'liq yozuvlarni qayta hisoblash"""
+    # Yangi obyektga hali hech qaysi yozuv bog'lanmagan
+    if created or not getattr(instance, '_price_inputs_changed', True):
+        return
+    _, lookup = PRICE_INPUTS[sender]
+    PriceEntry.objects.filter(**{lookup: instance}).refresh_final_price()
+
+
+def _remember_dependents(sender, instance, **kwargs):
+    """O'chirishdan oldin: SET_NULL / CASCADE dan keyin topib bo'lmaydi"""
+    _, lookup = PRICE_INPUTS[sender]
+    instance._dependent_entry_ids = list(
+        PriceEntry.objects.filter(**{lookup: instance}).values_list('pk', flat=True)
+    )
+
+
+def _refresh_remembered(sender, instance, **kwargs):
+    entry_ids = getattr(instance, '_dependent_entry_ids', None)
+    if entry_ids:
+        PriceEntry.objects.filter(pk__in=entry_ids).refresh_final_price()
+
+
+def _bump_pricing_version(sender, instance, **kwargs):
+    """pricing snapshot keshini eskirgan deb belgilash"""
+    bump_version(instance.pk if sender is iPhoneModel else instance.model_id)
+
+
+for _sender in PRICE_INPUTS:
+    post_save.connect(_bump_pricing_version, sender=_sender, dispatch_uid=f'pricing_save_{_sender.__name__}')
+    post_delete.connect(_bump_pricing_version, sender=_sender, dispatch_uid=f'pricing_delete_{_sender.__name__}')
+
+
+@receiver(m2m_changed, sender=ReplacedPartCombination.parts.through, dispatch_uid='pricing_combination_parts')
+def bump_on_combination_parts(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        # reverse da instance — ReplacedPart; ikkalasida ham model_id bor
+        bump_version(instance.model_id)
+
+
+for _sender in PRICE_INPUTS:
+    pre_save.connect(_track_price_inputs, sender=_sender, dispatch_uid=f'final_price_pre_{_sender.__name__}')
+    post_save.connect(_refresh_dependents, sender=_sender, dispatch_uid=f'final_price_post_{_sender.__name__}')
+
+# Kombinatsiya o'chsa yozuvlarda combination=NULL bo'ladi, qism o'chsa M2M qatorlari
+for _sender in (ReplacedPart, ReplacedPartCombination):
+    pre_delete.connect(_remember_dependents, sender=_sender,
+                       dispatch_uid=f'final_price_pre_delete_{_sender.__name__}')
+    post_delete.connect(_refresh_remembered, sender=_sender,
+                        dispatch_uid=f'final_price_post_delete_{_sender.__name__}')
+
+
+@receiver(post_save, sender=PriceEntry, dispatch_uid='final_price_entry_saved')
+def refresh_entry_price(sender, instance, **kwargs):
+    PriceEntry.objects.filter(pk=instance.pk).refresh_final_price()
+    instance.refresh_from_db(fields=['final_price'])
+
+
+@receiver(m2m_changed, sender=PriceEntry.replaced_parts.through, dispatch_uid='final_price_parts_changed')
+def refresh_on_parts_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_entry_price(PriceEntry, instance)
+        return
+
+    # part.priceentry_set.add/remove/clear(...) — instance ReplacedPart
+    if action == 'pre_clear':
+        instance._dependent_entry_ids = list(instance.priceentry_set.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        _refresh_remembered(ReplacedPart, instance)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        PriceEntry.objects.filter(pk__in=pk_set).refresh_final_price()
+
+
+# ============= ADMIN HISOBLAGICHLARI =============
+
+def _counters_for(sender):
+    return [name for name, (model, _) in counters.COUNTERS.items() if model is sender]
+
+
+def _count_saved(sender, instance, created, **kwargs):
+    for name in _counters_for(sender):
+        if created:
+            counters.adjust(name, 1 if counters.matches(name, instance) else 0)
+        elif counters.COUNTERS[name][1]:
+            # is_active o'zgargan bo'lishi mumkin — kichik jadval, qayta sanaladi
+            counters.invalidate(name)
+
+
+def _count_deleted(sender, instance, **kwargs):
+    for name in _counters_for(sender):
+        counters.adjust(name, -1 if counters.matches(name, instance) else 0)
+    if sender is iPhoneModel:
+        # Model bilan birga uning narxlari kaskad (signalsiz) o'chadi
+        counters.invalidate('total_prices')
+
+
+for _sender in {model for model, _ in counters.COUNTERS.values()}:
+    post_save.connect(_count_saved, sender=_sender, dispatch_uid=f'counters_save_{_sender.__name__}')
+    if _sender is not PriceEntry:
+        post_delete.connect(_count_deleted, sender=_sender, dispatch_uid=f'counters_delete_{_sender.__name__}')
@@ -1,10 +1,23 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
 from django.views.decorators.http import require_GET
-from django.db.models import Min, Max, Sum
-from decimal import Decimal
+from django.db.models import Prefetch, Q
+from decimal import Decimal, InvalidOperation
 
 from .models import iPhoneModel, StorageOption, Color, BatteryRange, ReplacedPart, PriceEntry
+from .pricing import SNAPSHOT_TTL, get_price_bounds, get_version, quote, versions_shared
+
+# price_list dagi bitta sahifadagi yozuvlar soni
+PRICE_LIST_PAGE_SIZE = 100
+
+# api_model_options payload keshi (versiya o'zgarsa baribir yangilanadi)
+MODEL_OPTIONS_CACHE_TTL = 24 * 3600
 
 
 # ===== PUBLIC VIEWS =====
@@ -15,17 +28,40 @@ def index(request):
     return render(request, 'index.html', {'models': models})
 
 
+def _parse_decimal(value):
+    """GET parametrini Decimal ga (noto'g'ri bo'lsa None)"""
+    try:
+        return Decimal(value) if value else None
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _parse_cursor(value):
+    """'narx_id' ko'rinishidagi keyset kursori -> (Decimal, int) yoki None"""
+    try:
+        price, pk = value.split('_')
+        return Decimal(price), int(pk)
+    except (AttributeError, InvalidOperation, ValueError):
+        return None
+
+
 def price_list(request):
-    """Barcha narxlar ro'yxati (filter bilan)"""
+    """Barcha narxlar ro'yxati (filter bilan)
+
+    Narx saqlangan final_price ustunida — filter, tartib va sahifalash
+    to'liq SQL da. Sahifalash keyset (after=narx_id) bo'yicha, shuning
+    uchun har bir sahifa OFFSET siz va bir xil tezlikda olinadi.
+    """
     models = iPhoneModel.objects.filter(is_active=True).order_by('order')
     model_id = request.GET.get('model')
     min_price = request.GET.get('min_price')
     max_price = request.GET.get('max_price')
     has_box = request.GET.get('has_box')
+    cursor = _parse_cursor(request.GET.get('after'))
 
     entries = PriceEntry.objects.select_related(
         'model', 'storage', 'color', 'battery', 'combination'
-    ).prefetch_related('replaced_parts', 'combination__parts')
+    ).prefetch_related('replaced_parts')
 
     if model_id:
         entries = entries.filter(model_id=model_id)
@@ -34,19 +70,30 @@ def price_list(request):
     elif has_box == 'no':
         entries = entries.filter(has_box=False)
 
-    # Model tanlanmasa juda ko'p bo'ladi — limitlaymiz
-    entries = entries.order_by('model__order', 'storage__size', 'battery__min_percent')[:500]
+    min_value = _parse_decimal(min_price)
+    max_value = _parse_decimal(max_price)
+    if min_value is not None:
+        entries = entries.filter(final_price__gte=min_value)
+    if max_value is not None:
+        entries = entries.filter(final_price__lte=max_value)
+
+    if cursor:
+        last_price, last_pk = cursor
+        entries = entries.filter(
+            Q(final_price__gt=last_price) | Q(final_price=last_price, pk__gt=last_pk)
+        )
+
+    page = list(entries.order_by('final_price', 'pk')[:PRICE_LIST_PAGE_SIZE + 1])
+    has_next = len(page) > PRICE_LIST_PAGE_SIZE
+    page = page[:PRICE_LIST_PAGE_SIZE]
 
-    price_data = []
-    for entry in entries:
-        price = entry.get_final_price()
-        if min_price and price < Decimal(min_price):
-            continue
-        if max_price and price > Decimal(max_price):
-            continue
-        price_data.append({'entry': entry, 'price': price})
+    price_data = [{'entry': entry, 'price': entry.final_price} for entry in page]
 
-    price_data.sort(key=lambda x: x['price'])
+    next_url = None
+    if has_next:
+        params = request.GET.copy()
+        params['after'] = f"{page[-1].final_price}_{page[-1].pk}"
+        next_url = f"?{params.urlencode()}"
 
     return render(request, 'price_list.html', {
         'price_data': price_data,
@@ -55,6 +102,8 @@ def price_list(request):
         'min_price': min_price or '',
         'max_price': max_price or '',
         'has_box': has_box or '',
+        'next_url': next_url,
+        'is_first_page': cursor is None,
     })
 
 
@@ -65,23 +114,16 @@ def model_detail(request, model_id):
     colors = model.available_colors.all().order_by('name')
     batteries = model.battery_ranges.all().order_by('-min_percent')
 
-    # Faqat 200 ta yozuv ko'rsatish (barcha yuzlab minglab yozuv emas)
+    # Faqat 200 ta eng arzon yozuv (saqlangan final_price bo'yicha, SQL da)
     entries = PriceEntry.objects.filter(model=model).select_related(
         'storage', 'color', 'battery', 'combination'
-    ).prefetch_related('replaced_parts', 'combination__parts').order_by('storage__size', 'battery__min_percent')[:200]
+    ).prefetch_related('replaced_parts', 'combination__parts').order_by('final_price', 'pk')[:200]
 
-    price_data = [{'entry': e, 'price': e.get_final_price()} for e in entries]
-    price_data.sort(key=lambda x: x['price'])
+    price_data = [{'entry': e, 'price': e.final_price} for e in entries]
 
-    # Min/max ni DB aggregatsiya bilan hisoblash
-    storage_min = model.storages.aggregate(m=Min('price_difference'))['m'] or 0
-    battery_min = model.battery_ranges.aggregate(m=Min('price_difference'))['m'] or 0
-    min_price = max(
-        model.base_standard_price + Decimal(str(storage_min)) + Decimal(str(battery_min))
-        + model.box_price_difference + model.alternative_sim_price_difference,
-        Decimal('0')
-    )
-    max_price = model.base_standard_price
+    # Narx oralig'i — pricing snapshot dan (keshlangan, DB so'rovsiz)
+    bounds = get_price_bounds(model.pk)
+    min_price, max_price = bounds.min_price, bounds.max_price
 
     all_models = iPhoneModel.objects.filter(is_active=True).order_by('order')
 
@@ -105,35 +147,22 @@ def compare(request):
     compare_data = []
     if model_ids:
         selected = iPhoneModel.objects.filter(pk__in=model_ids, is_active=True).prefetch_related(
-            'storages', 'available_colors', 'battery_ranges', 'replaced_parts'
+            Prefetch('storages', queryset=StorageOption.objects.order_by('size')),
+            Prefetch('available_colors', queryset=Color.objects.order_by('name')),
+            Prefetch('battery_ranges', queryset=BatteryRange.objects.order_by('-min_percent')),
         )
         for model in selected:
-            # Narx oralig'ini DB query siz, faqat aggregatsiya bilan hisoblash
-            # Max narx = asosiy narx (standart xotira, 100% batareya, quti bor, standart sim, qism yo'q)
-            max_price = model.base_standard_price
-
-            # Min narx = asosiy + eng past xotira + eng past batareya + qutisiz + boshqa sim + eng katta qism ayirmasi
-            storage_min = model.storages.aggregate(m=Min('price_difference'))['m'] or 0
-            battery_min = model.battery_ranges.aggregate(m=Min('price_difference'))['m'] or 0
-            parts_min = model.replaced_parts.filter(is_active=True).aggregate(m=Sum('price_reduction'))['m'] or 0
-
-            min_price = max(
-                model.base_standard_price
-                + Decimal(str(storage_min))
-                + Decimal(str(battery_min))
-                + model.box_price_difference
-                + model.alternative_sim_price_difference
-                + Decimal(str(parts_min)),
-                Decimal('0')
-            )
+            # Narx oralig'i — pricing snapshot dan (api_calculate bilan bir xil hisob)
+            bounds = get_price_bounds(model.pk)
 
             compare_data.append({
                 'model': model,
-                'min_price': min_price,
-                'max_price': max_price,
-                'storages': list(model.storages.values('size', 'price_difference', 'is_standard').order_by('size')),
-                'colors': list(model.available_colors.values('name', 'color_type', 'price_difference').order_by('name')),
-                'batteries': list(model.battery_ranges.values('label', 'min_percent', 'max_percent', 'price_difference').order_by('-min_percent')),
+                'min_price': bounds.min_price,
+                'max_price': bounds.max_price,
+                'bounds': bounds,
+                'storages': model.storages.all(),
+                'colors': model.available_colors.all(),
+                'batteries': model.battery_ranges.all(),
             })
 
     return render(request, 'compare.html', {
@@ -145,17 +174,24 @@ def compare(request):
 
 # ===== AJAX API VIEWS =====
 
-@require_GET
-def api_model_options(request):
-    """Model tanlanganda: xotira, rang, batareya, qismlarni qaytaradi"""
-    model_id = request.GET.get('model_id')
-    if not model_id:
-        return JsonResponse({'error': 'model_id kerak'}, status=400)
-
-    try:
-        model = iPhoneModel.objects.get(pk=model_id, is_active=True)
-    except iPhoneModel.DoesNotExist:
-        return JsonResponse({'error': 'Model topilmadi'}, status=404)
+def _model_options_payload(model_id):
+    """
+    api_model_options javobi: {'active', 'body', 'etag'}.
+
+    JSON bir marta serializatsiya qilinib cache da (model, pricing
+    versiyasi) kaliti bilan saqlanadi — model/variant saqlanganda
+    signals.py versiyani yangilaydi va eski yozuv ishlatilmay qoladi.
+    Kesh jarayonlar orasida umumiy bo'lmasa boshqa worker dagi o'zgarish
+    bu yerga yetmaydi — yozuv SNAPSHOT_TTL dan ortiq saqlanmaydi.
+    """
+    key = f'api:model_options:{model_id}:{get_version(model_id)}'
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    model = iPhoneModel.objects.filter(pk=model_id).first()
+    if model is None:
+        return None
 
     storages = [
         {'id': s.id, 'size': s.size, 'price_diff': float(s.price_difference), 'is_standard': s.is_standard}
@@ -174,7 +210,7 @@ def api_model_options(request):
         for p in model.replaced_parts.filter(is_active=True).order_by('order')
     ]
 
-    return JsonResponse({
+    body = json.dumps({
         'model': {
             'id': model.id,
             'base_price': float(model.base_standard_price),
@@ -186,7 +222,43 @@ def api_model_options(request):
         'colors': colors,
         'batteries': batteries,
         'parts': parts,
-    })
+    }, cls=DjangoJSONEncoder).encode()
+
+    payload = {
+        'active': model.is_active,
+        'body': body,
+        'etag': f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+    }
+    cache.set(key, payload, MODEL_OPTIONS_CACHE_TTL if versions_shared() else SNAPSHOT_TTL)
+    return payload
+
+
+@require_GET
+def api_model_options(request):
+    """Model tanlanganda: xotira, rang, batareya, qismlarni qaytaradi
+
+    Javob keshlangan va kuchli ETag bilan — If-None-Match mos kelsa 304.
+    """
+    model_id = request.GET.get('model_id')
+    if not model_id:
+        return JsonResponse({'error': 'model_id kerak'}, status=400)
+
+    try:
+        payload = _model_options_payload(int(model_id))
+    except ValueError:
+        payload = None
+    if payload is None or not payload['active']:
+        return JsonResponse({'error': 'Model topilmadi'}, status=404)
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (if_none_match.strip() == '*' or payload['etag'] in parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(payload['body'], content_type='application/json')
+    response['ETag'] = payload['etag']
+    # Brauzer har safar tekshiradi (304 arzon), lekin eski katalogni ko'rsatmaydi
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 @require_GET
@@ -204,62 +276,20 @@ def api_calculate(request):
         if not all([model_id, storage_id, battery_id]):
             return JsonResponse({'price': None})
 
-        model = iPhoneModel.objects.get(pk=model_id, is_active=True)
-        storage = StorageOption.objects.get(pk=storage_id, model=model)
-        battery = BatteryRange.objects.get(pk=battery_id, model=model)
-
-        price = model.base_standard_price
-        price += storage.price_difference
-
-        if color_id:
-            try:
-                color = Color.objects.get(pk=color_id, model=model)
-                price += color.price_difference
-            except Color.DoesNotExist:
-                pass
-
-        price += battery.price_difference
-
-        if not has_box:
-            price += model.box_price_difference
-
-        if sim_type != model.default_sim_type:
-            price += model.alternative_sim_price_difference
-
-        if part_ids:
-            parts = model.replaced_parts.filter(pk__in=part_ids, is_active=True)
-            for part in parts:
-                price += part.price_reduction
-
-        price = max(price, Decimal('0'))
-
-        # Breakdown
-        breakdown = [f"Standart: ${float(model.base_standard_price):,.0f}"]
-        if storage.price_difference != 0:
-            breakdown.append(f"Xotira ({storage.size}): ${float(storage.price_difference):+,.0f}")
-        if color_id:
-            try:
-                c = Color.objects.get(pk=color_id, model=model)
-                if c.price_difference != 0:
-                    breakdown.append(f"Rang ({c.name}): ${float(c.price_difference):+,.0f}")
-            except Color.DoesNotExist:
-                pass
-        if battery.price_difference != 0:
-            breakdown.append(f"Batareya ({battery.label}): ${float(battery.price_difference):+,.0f}")
-        if not has_box:
-            breakdown.append(f"Quti yo'q: ${float(model.box_price_difference):+,.0f}")
-        if sim_type != model.default_sim_type:
-            breakdown.append(f"SIM: ${float(model.alternative_sim_price_difference):+,.0f}")
-        if part_ids:
-            parts = model.replaced_parts.filter(pk__in=part_ids, is_active=True)
-            for part in parts:
-                breakdown.append(f"{part.get_part_type_display()}: ${float(part.price_reduction):+,.0f}")
-
-        return JsonResponse({
-            'price': float(price),
-            'price_display': f"${float(price):,.0f}",
-            'breakdown': breakdown,
-        })
+        try:
+            model_id, storage_id, battery_id = int(model_id), int(storage_id), int(battery_id)
+            color_id = int(color_id) if color_id else None
+            part_ids = [int(pk) for pk in part_ids]
+        except ValueError:
+            return JsonResponse({'error': "Noto'g'ri parametr"}, status=400)
+
+        payload = quote(
+            model_id, storage_id, battery_id, color_id=color_id,
+            sim_type=sim_type, has_box=has_box, part_ids=part_ids
+        )
+        if payload is None:
+            return JsonResponse({'error': 'Model topilmadi'}, status=404)
+        return JsonResponse(payload)
 
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
@@ -117,8 +117,10 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Maksimal field soni (admin select all uchun)
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000  # Default: 1000
 
-# Maksimal fayl hajmi (Excel import uchun)
+# Maksimal request hajmi (fayllardan tashqari — fayllar bu limitga kirmaydi)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10 MB
 
-# Maksimal request hajmi
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10 MB
\ No newline at end of file
+# Shundan katta yuklangan fayllar xotirada emas, vaqtinchalik faylda saqlanadi.
+# Excel import ularni read_only rejimda oqimli o'qiydi (botapp/excel_reader.py),
+# shuning uchun fayl hajmiga yuqori chegara yo'q.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5 MB (Django default)
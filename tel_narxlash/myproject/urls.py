@@ -10,15 +10,10 @@ from botapp import views
 _original_index = admin.site.__class__.index
 
 def custom_admin_index(self, request, extra_context=None):
-    from botapp.models import iPhoneModel, StorageOption, Color, PriceEntry, ReplacedPartCombination
+    # Hisoblagichlar keshdan (botapp/counters.py) — COUNT(*) har safar emas
+    from botapp import counters
     extra_context = extra_context or {}
-    extra_context.update({
-        'total_models': iPhoneModel.objects.filter(is_active=True).count(),
-        'total_prices': PriceEntry.objects.count(),
-        'total_storages': StorageOption.objects.count(),
-        'total_colors': Color.objects.count(),
-        'total_combinations': ReplacedPartCombination.objects.filter(is_active=True).count(),
-    })
+    extra_context.update(counters.get_counts())
     return _original_index(self, request, extra_context)
 
 admin.site.__class__.index = custom_admin_index
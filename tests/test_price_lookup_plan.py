@@ -0,0 +1,85 @@
+# tests/test_price_lookup_plan.py - get_price() REJASI: COVERING INDEKS
+#
+# init_db() alohida sxemada (PGOPTIONS search_path) ishga tushiriladi,
+# prices to'ldiriladi va VACUUM ANALYZE dan keyin get_price() so'rovi
+# idx_prices_lookup_covering bo'yicha Index Only Scan ekani tekshiriladi.
+# PostgreSQL (PHONE_DB_*) mavjud bo'lmasa test o'tkazib yuboriladi.
+#
+#   python -m unittest tests.test_price_lookup_plan
+import os
+import unittest
+
+import psycopg2
+
+from utils.db_api import database
+from utils.db_api.database import PRICE_LOOKUP_INDEX, check_price_lookup_plan, get_conn, init_db
+
+TEST_SCHEMA = 'test_price_plan'
+SEED_ROWS = 20000
+
+SQL_SEED = """
+    INSERT INTO prices (model_id, storage_size, color_name, sim_type,
+                        battery_label, has_box, damage_pct, price)
+    SELECT m.id, (64 << (g % 4)) || 'GB', 'Color ' || (g / 4 % 10), 'physical',
+           (80 + g / 40 % 20) || '%%', g % 2 = 0, 'Qism ' || (g / 800), 100 + g % 900
+    FROM generate_series(0, %(rows)s - 1) AS g,
+         (SELECT id FROM models WHERE name = 'Test Phone') m
+"""
+
+
+class PriceLookupPlanTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            conn = get_conn()
+        except psycopg2.OperationalError as e:
+            raise unittest.SkipTest(f"PostgreSQL mavjud emas: {e}")
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {TEST_SCHEMA}")
+        conn.close()
+
+        # get_conn() ning barcha ulanishlari test sxemasida ishlaydi
+        cls._pgoptions = os.environ.get('PGOPTIONS')
+        os.environ['PGOPTIONS'] = f'-c search_path={TEST_SCHEMA}'
+        init_db()
+
+        conn = get_conn()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("INSERT INTO models (name) VALUES ('Test Phone') RETURNING id")
+            cls.model_id = cursor.fetchone()[0]
+            cursor.execute(SQL_SEED, {'rows': SEED_ROWS})
+            # Index Only Scan visibility map ga tayanadi
+            cursor.execute("VACUUM ANALYZE prices")
+        conn.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls._pgoptions is None:
+            os.environ.pop('PGOPTIONS', None)
+        else:
+            os.environ['PGOPTIONS'] = cls._pgoptions
+        conn = get_conn()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE")
+        conn.close()
+
+    def test_index_only_scan_on_covering_index(self):
+        ok, scans = check_price_lookup_plan()
+        self.assertTrue(ok, f"{PRICE_LOOKUP_INDEX} bo'yicha Index Only Scan emas: {scans}")
+        self.assertIn(('Index Only Scan', PRICE_LOOKUP_INDEX), scans)
+
+    def test_plan_for_given_model(self):
+        ok, scans = check_price_lookup_plan(self.model_id)
+        self.assertTrue(ok, scans)
+
+    def test_unknown_model_has_no_plan(self):
+        self.assertIsNone(database.explain_price_lookup(self.model_id + 1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -41,6 +41,17 @@ class SimpleCache:
             if key in self._cache:
                 del self._cache[key]
 
+    async def delete_prefix(self, prefix: str):
+        """Prefiks bilan boshlanadigan barcha kalitlarni o'chirish"""
+        async with self._lock:
+            for key in [k for k in self._cache if k.startswith(prefix)]:
+                del self._cache[key]
+
+    async def clear(self):
+        """Hammasini o'chirish"""
+        async with self._lock:
+            self._cache.clear()
+
     async def clear_expired(self):
         """Vaqti o'tganlarni tozalash"""
         async with self._lock:
@@ -62,4 +73,7 @@ class SimpleCache:
 
 
 # Global cache instance
-cache = SimpleCache()
\ No newline at end of file
+cache = SimpleCache()
+
+# Katalog menyulari uchun (LISTEN/NOTIFY orqali tozalanadi)
+catalog_cache = SimpleCache()
\ No newline at end of file
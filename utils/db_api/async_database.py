@@ -0,0 +1,214 @@
+# utils/db_api/async_database.py - PHONES DB ASYNC (asyncpg POOL)
+#
+# database.py dagi o'qish funksiyalarining async nusxasi. Har bir chaqiruv
+# yangi TCP+auth ulanish ochmaydi — app.py on_startup da yaratilgan
+# cheklangan pool dan ulanish oladi va event loop ni bloklamaydi.
+import logging
+import os
+from datetime import datetime
+
+import asyncpg
+
+from utils.cache import catalog_cache
+from utils.db_api.database import (
+    PHONE_DB_CONFIG,
+    normalize_damage_format,
+)
+from utils.db_api.price_index import make_key, price_index
+
+logger = logging.getLogger(__name__)
+
+# Pool o'lchami (.env orqali o'zgartirish mumkin)
+POOL_MIN_SIZE = int(os.getenv('PHONE_DB_POOL_MIN', '2'))
+POOL_MAX_SIZE = int(os.getenv('PHONE_DB_POOL_MAX', '10'))
+POOL_COMMAND_TIMEOUT = float(os.getenv('PHONE_DB_COMMAND_TIMEOUT', '10'))
+
+# Katalog keshi NOTIFY bilan tozalanadi; TTL faqat ehtiyot chorasi
+CATALOG_CACHE_TTL = 24 * 3600
+
+_pool = None
+
+
+# ============================================================
+# POOL
+# ============================================================
+
+async def create_pool():
+    """Pool yaratish (on_startup da bir marta)"""
+    global _pool
+    if _pool is None:
+        _pool = await asyncpg.create_pool(
+            database=PHONE_DB_CONFIG['dbname'],
+            user=PHONE_DB_CONFIG['user'],
+            password=PHONE_DB_CONFIG['password'],
+            host=PHONE_DB_CONFIG['host'],
+            port=int(PHONE_DB_CONFIG['port']),
+            min_size=POOL_MIN_SIZE,
+            max_size=POOL_MAX_SIZE,
+            command_timeout=POOL_COMMAND_TIMEOUT,
+        )
+        logger.info(f"✅ phones_db pool yaratildi ({POOL_MIN_SIZE}-{POOL_MAX_SIZE})")
+    return _pool
+
+
+async def close_pool():
+    """Pool ni yopish (on_shutdown da)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        logger.info("✅ phones_db pool yopildi")
+
+
+def get_pool():
+    """Mavjud pool (create_pool chaqirilmagan bo'lsa xato)"""
+    if _pool is None:
+        raise RuntimeError("phones_db pool yaratilmagan — avval create_pool() chaqiring")
+    return _pool
+
+
+# ===================== MODEL FUNKSIYALARI =====================
+
+async def _cached(key, loader):
+    """catalog_cache dan olish, bo'lmasa loader() natijasini saqlash"""
+    value = await catalog_cache.get(key)
+    if value is None:
+        value = await loader()
+        await catalog_cache.set(key, value, ttl=CATALOG_CACHE_TTL)
+    return value
+
+
+async def get_models():
+    """Barcha faol modellarni olish"""
+    async def load():
+        rows = await get_pool().fetch(
+            "SELECT * FROM models WHERE is_active = TRUE ORDER BY order_num, name"
+        )
+        return [dict(row) for row in rows]
+
+    return await _cached('catalog:models', load)
+
+
+async def get_model(model_id):
+    """Bitta modelni olish"""
+    row = await get_pool().fetchrow("SELECT * FROM models WHERE id = $1", model_id)
+    return dict(row) if row else None
+
+
+# ===================== STORAGE / COLOR / BATTERY =====================
+
+async def get_storages(model_id):
+    """Model uchun barcha xotiralarni olish"""
+    async def load():
+        rows = await get_pool().fetch(
+            "SELECT * FROM storages WHERE model_id = $1 ORDER BY size", model_id
+        )
+        return [dict(row) for row in rows]
+
+    return await _cached(f'catalog:storages:{model_id}', load)
+
+
+async def get_colors(model_id):
+    """Model uchun barcha ranglarni olish"""
+    async def load():
+        rows = await get_pool().fetch(
+            "SELECT * FROM colors WHERE model_id = $1 ORDER BY name", model_id
+        )
+        return [dict(row) for row in rows] if rows else [{"name": "Standart"}]
+
+    return await _cached(f'catalog:colors:{model_id}', load)
+
+
+async def get_batteries(model_id):
+    """Model uchun barcha batareyalarni olish"""
+    async def load():
+        rows = await get_pool().fetch(
+            "SELECT * FROM batteries WHERE model_id = $1 ORDER BY min_percent DESC", model_id
+        )
+        return [dict(row) for row in rows] if rows else [{"label": "100%"}]
+
+    return await _cached(f'catalog:batteries:{model_id}', load)
+
+
+async def get_sim_types(model_id):
+    """Model uchun SIM turlarini olish"""
+    rows = await get_pool().fetch("SELECT type FROM sim_types WHERE model_id = $1", model_id)
+    types = [row['type'] for row in rows]
+    return [{"type": t} for t in types] if types else [{"type": "physical"}]
+
+
+async def get_parts_for_model(model_id):
+    """Model uchun alohida qismlarni olish"""
+    rows = await get_pool().fetch("SELECT part_name FROM parts WHERE model_id = $1", model_id)
+    return [row['part_name'] for row in rows]
+
+
+# ===================== PRICE FUNKSIYALARI =====================
+
+async def get_price(model_id, storage, color, sim_type, battery, has_box, damage):
+    """Narxni olish (indeks yuklangan bo'lsa — xotiradan)"""
+    if price_index.is_loaded:
+        return price_index.lookup(model_id, storage, color, sim_type, battery, has_box, damage)
+
+    key = make_key(model_id, storage, color, sim_type, battery, has_box, damage)
+
+    price = await get_pool().fetchval("""
+        SELECT price FROM prices
+        WHERE model_id = $1
+        AND storage_size = $2
+        AND color_name = $3
+        AND sim_type = $4
+        AND battery_label = $5
+        AND has_box = $6
+        AND damage_key = $7
+    """, *key)
+
+    return float(price) if price is not None else None
+
+
+async def get_prices_for_model(model_id):
+    """Model uchun barcha narxlarni olish"""
+    rows = await get_pool().fetch("""
+        SELECT * FROM prices
+        WHERE model_id = $1
+        ORDER BY price DESC
+        LIMIT 100
+    """, model_id)
+    return [dict(row) for row in rows]
+
+
+async def get_total_prices_count():
+    """Bazadagi jami narxlar soni"""
+    try:
+        return await get_pool().fetchval("SELECT COUNT(*) FROM prices")
+    except Exception as e:
+        logger.error(f"❌ Narxlar sonini olishda xato: {e}")
+        return 0
+
+
+async def add_price_record(model_id, storage, color, sim_type, battery, has_box, damage, price):
+    """Narxni qo'shish - damage ni bot formatida saqlash"""
+    color_name = color if color and color != "Standart" else ""
+
+    damage = str(damage).strip()
+    if not damage or damage.lower() in ['yangi', 'nan', 'none']:
+        damage_pct = "Yangi"
+    else:
+        damage_pct = normalize_damage_format(damage)
+
+    has_box_bool = True if has_box == "Bor" or has_box == True else False
+
+    try:
+        await get_pool().execute("""
+            INSERT INTO prices
+            (model_id, storage_size, color_name, sim_type, battery_label, has_box, damage_pct, price, updated_at)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+            ON CONFLICT (model_id, storage_size, color_name, sim_type, battery_label, has_box, damage_pct)
+            DO UPDATE SET
+                price = EXCLUDED.price,
+                updated_at = EXCLUDED.updated_at
+        """, model_id, storage, color_name, sim_type, battery, has_box_bool, damage_pct, price, datetime.now())
+        return True
+    except Exception as e:
+        logger.error(f"Narx qo'shishda xato: {e}")
+        return False
@@ -0,0 +1,482 @@
+# utils/db_api/async_user_database.py - USERS DB ASYNC (asyncpg POOL)
+#
+# user_database.py dagi handlerlar ishlatadigan funksiyalarning async
+# nusxasi (bir xil nomlar, argumentlar va natija lug'atlari). psycopg2
+# ThreadedConnectionPool coroutine ichidan sinxron chaqirilganda har bir
+# balans tekshiruvi event loop ni to'xtatardi. Bu yerda:
+#   * asyncpg pool — on_startup da yaratiladi, on_shutdown da yopiladi;
+#   * SQL matnlari modul konstantalari — asyncpg ularni har bir ulanishda
+#     bir marta prepare qiladi va statement cache dan qayta ishlatadi;
+#   * pool.acquire() vaqt chegarasi bilan — pool to'lib qolsa handler
+#     cheksiz kutmaydi, xato lug'ati qaytadi;
+#   * pool_stats() — pool to'lganlik darajasi va kutish ko'rsatkichlari.
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+from data.config import FREE_TRIALS_DEFAULT
+from utils.db_api.history_writer import history_writer
+from utils.db_api.user_database import USER_DB_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Pool sozlamalari (.env orqali o'zgartirish mumkin)
+POOL_MIN_SIZE = int(os.getenv('USER_DB_POOL_MIN', '2'))
+POOL_MAX_SIZE = int(os.getenv('USER_DB_POOL_MAX', '10'))
+POOL_COMMAND_TIMEOUT = float(os.getenv('USER_DB_COMMAND_TIMEOUT', '10'))
+# Bo'sh ulanishni kutish chegarasi (soniya)
+POOL_ACQUIRE_TIMEOUT = float(os.getenv('USER_DB_ACQUIRE_TIMEOUT', '5'))
+# Har bir ulanishdagi prepared statement keshi hajmi
+STATEMENT_CACHE_SIZE = int(os.getenv('USER_DB_STATEMENT_CACHE', '100'))
+
+_pool = None
+
+# Pool ko'rsatkichlari (pool_stats() orqali)
+_metrics = {
+    'acquired': 0,
+    'waiting': 0,
+    'timeouts': 0,
+    'wait_total': 0.0,
+    'wait_max': 0.0,
+}
+
+
+# ============================================================
+# SQL (prepared statement sifatida keshlanadi)
+# ============================================================
+
+SQL_GET_USER = "SELECT * FROM users WHERE telegram_id = $1"
+
+SQL_UPDATE_USER_NAME = """
+    UPDATE users
+    SET full_name = $1,
+        username = $2,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE telegram_id = $3
+    RETURNING *
+"""
+
+SQL_INSERT_USER = """
+    INSERT INTO users
+    (telegram_id, full_name, username, phone_number, free_trials_left, balance, total_pricings, is_active)
+    VALUES ($1, $2, $3, $4, $5, 0, 0, TRUE)
+    RETURNING *
+"""
+
+SQL_UPDATE_PHONE = """
+    UPDATE users
+    SET phone_number = $1, updated_at = CURRENT_TIMESTAMP
+    WHERE telegram_id = $2
+    RETURNING *
+"""
+
+# Kredit yechish bitta atomar so'rovda. Ichki SELECT ... FOR UPDATE qatorni
+# qulflaydi: bir vaqtdagi ikkinchi bosish birinchisi tugashini kutadi va
+# shartni yangi qiymatlar bo'yicha qayta tekshiradi (ikki marta yechilmaydi).
+# $2 = FALSE bo'lsa faqat bepul urinish yechiladi, balansga tegilmaydi.
+# Tarix qatori alohida — history_writer navbati orqali yoziladi.
+SQL_CONSUME_CREDIT = """
+    UPDATE users AS u
+    SET free_trials_left = u.free_trials_left - c.is_free::int,
+        balance = u.balance - (NOT c.is_free)::int,
+        total_pricings = u.total_pricings + 1,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (
+        SELECT id, COALESCE(free_trials_left, 0) > 0 AS is_free
+        FROM users
+        WHERE telegram_id = $1
+          AND (COALESCE(free_trials_left, 0) > 0 OR ($2 AND COALESCE(balance, 0) > 0))
+        FOR UPDATE
+    ) AS c
+    WHERE u.id = c.id
+    RETURNING u.id, c.is_free, u.free_trials_left, u.balance
+"""
+
+SQL_INSERT_PRICING = """
+    INSERT INTO pricing_history
+    (user_id, telegram_id, phone_model, storage, color, battery, sim_type, has_box, damage, price, is_free_trial)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+"""
+
+SQL_USER_EXISTS = "SELECT EXISTS (SELECT 1 FROM users WHERE telegram_id = $1)"
+
+SQL_GET_BALANCE = """
+    SELECT balance, free_trials_left, total_pricings, phone_number
+    FROM users
+    WHERE telegram_id = $1
+"""
+
+SQL_PAYMENT_HISTORY = """
+    SELECT tariff_name, amount, count, payment_status, created_at
+    FROM payment_history
+    WHERE telegram_id = $1
+    ORDER BY created_at DESC
+    LIMIT $2
+"""
+
+
+# ============================================================
+# POOL
+# ============================================================
+
+async def create_user_pool():
+    """Pool yaratish (on_startup da bir marta)"""
+    global _pool
+    if _pool is None:
+        _pool = await asyncpg.create_pool(
+            database=USER_DB_CONFIG['dbname'],
+            user=USER_DB_CONFIG['user'],
+            password=USER_DB_CONFIG['password'],
+            host=USER_DB_CONFIG['host'],
+            port=int(USER_DB_CONFIG['port']),
+            min_size=POOL_MIN_SIZE,
+            max_size=POOL_MAX_SIZE,
+            command_timeout=POOL_COMMAND_TIMEOUT,
+            statement_cache_size=STATEMENT_CACHE_SIZE,
+        )
+        logger.info(f"✅ users_db pool yaratildi ({POOL_MIN_SIZE}-{POOL_MAX_SIZE})")
+    return _pool
+
+
+async def close_user_pool():
+    """Pool ni yopish (on_shutdown da)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        logger.info("✅ users_db pool yopildi")
+
+
+def get_user_pool():
+    """Mavjud pool (create_user_pool chaqirilmagan bo'lsa xato)"""
+    if _pool is None:
+        raise RuntimeError("users_db pool yaratilmagan — avval create_user_pool() chaqiring")
+    return _pool
+
+
+@asynccontextmanager
+async def acquire():
+    """Pool dan ulanish — POOL_ACQUIRE_TIMEOUT dan ortiq kutilmaydi"""
+    pool = get_user_pool()
+    _metrics['waiting'] += 1
+    start = time.monotonic()
+    try:
+        conn = await pool.acquire(timeout=POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _metrics['timeouts'] += 1
+        logger.warning(f"⚠️ users_db pool to'la: {POOL_ACQUIRE_TIMEOUT}s ichida ulanish bo'shamadi")
+        raise asyncio.TimeoutError("users_db pool band, keyinroq urinib ko'ring") from None
+    finally:
+        _metrics['waiting'] -= 1
+
+    waited = time.monotonic() - start
+    _metrics['acquired'] += 1
+    _metrics['wait_total'] += waited
+    _metrics['wait_max'] = max(_metrics['wait_max'], waited)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+def pool_stats():
+    """Pool to'lganlik ko'rsatkichlari (admin/monitoring uchun)"""
+    if _pool is None:
+        return {'active': False}
+    size = _pool.get_size()
+    idle = _pool.get_idle_size()
+    in_use = size - idle
+    acquired = _metrics['acquired']
+    return {
+        'active': True,
+        'size': size,
+        'max_size': _pool.get_max_size(),
+        'in_use': in_use,
+        'idle': idle,
+        'waiting': _metrics['waiting'],
+        'saturation': in_use / _pool.get_max_size(),
+        'acquired': acquired,
+        'timeouts': _metrics['timeouts'],
+        'avg_wait_ms': (_metrics['wait_total'] / acquired * 1000) if acquired else 0.0,
+        'max_wait_ms': _metrics['wait_max'] * 1000,
+    }
+
+
+# ============================================================
+# USER BOSHQARUV FUNKSIYALARI
+# ============================================================
+
+async def create_user(telegram_id, full_name, username=None, phone_number=None):
+    """User yaratish yoki yangilash"""
+    try:
+        async with acquire() as conn:
+            try:
+                # Mavjud usermi tekshirish
+                user = await conn.fetchrow(SQL_GET_USER, telegram_id)
+
+                if user:
+                    # Mavjud user - faqat ma'lumotlarni yangilash
+                    user = await conn.fetchrow(SQL_UPDATE_USER_NAME, full_name, username, telegram_id)
+                    return {
+                        'success': True,
+                        'user': dict(user),
+                        'is_new': False,
+                        'message': '✅ Xush kelibsiz!'
+                    }
+
+                # YANGI user yaratish
+                user = await conn.fetchrow(
+                    SQL_INSERT_USER, telegram_id, full_name, username, phone_number, FREE_TRIALS_DEFAULT
+                )
+                return {
+                    'success': True,
+                    'user': dict(user),
+                    'is_new': True,
+                    'message': f'🎁 Sizga {FREE_TRIALS_DEFAULT} ta bepul urinish berildi!'
+                }
+
+            except asyncpg.UniqueViolationError:
+                # Race condition - qayta tekshirish
+                user = await conn.fetchrow(SQL_GET_USER, telegram_id)
+                if user:
+                    return {
+                        'success': True,
+                        'user': dict(user),
+                        'is_new': False,
+                        'message': '✅ Xush kelibsiz!'
+                    }
+                return {
+                    'success': False,
+                    'error': 'User yaratishda xato',
+                    'user': None,
+                    'is_new': False
+                }
+
+    except Exception as e:
+        logger.error(f"❌ User yaratishda xato: {e}")
+        return {
+            'success': False,
+            'error': str(e),
+            'user': None,
+            'is_new': False
+        }
+
+
+async def get_user(telegram_id):
+    """User ma'lumotlarini olish"""
+    try:
+        async with acquire() as conn:
+            user = await conn.fetchrow(SQL_GET_USER, telegram_id)
+
+        if user:
+            return {
+                'success': True,
+                'user': dict(user)
+            }
+        return {
+            'success': False,
+            'error': 'User topilmadi',
+            'user': None
+        }
+
+    except Exception as e:
+        logger.error(f"❌ User olishda xato: {e}")
+        return {
+            'success': False,
+            'error': str(e),
+            'user': None
+        }
+
+
+async def update_phone_number(telegram_id, phone_number):
+    """User telefon raqamini yangilash"""
+    try:
+        async with acquire() as conn:
+            user = await conn.fetchrow(SQL_UPDATE_PHONE, phone_number, telegram_id)
+
+        if user:
+            return {
+                'success': True,
+                'user': dict(user),
+                'message': '✅ Telefon raqam yangilandi'
+            }
+        return {
+            'success': False,
+            'error': 'User topilmadi'
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Telefon raqam yangilashda xato: {e}")
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+# ============================================================
+# NARXLASH FUNKSIYALARI
+# ============================================================
+
+async def check_can_price(telegram_id):
+    """User narx olishi mumkinmi tekshirish"""
+    try:
+        async with acquire() as conn:
+            user = await conn.fetchrow(SQL_GET_USER, telegram_id)
+
+        if not user:
+            return {
+                'can_price': False,
+                'reason': 'User topilmadi',
+                'free_trials_left': 0,
+                'balance': 0
+            }
+
+        free_trials = user['free_trials_left'] or 0
+        balance = user['balance'] or 0
+
+        if free_trials > 0:
+            reason = 'free_trial'
+        elif balance > 0:
+            reason = 'balance'
+        else:
+            reason = 'no_credits'
+
+        return {
+            'can_price': reason != 'no_credits',
+            'reason': reason,
+            'free_trials_left': free_trials,
+            'balance': balance
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Check can price xato: {e}")
+        return {
+            'can_price': False,
+            'reason': 'error',
+            'error': str(e),
+            'free_trials_left': 0,
+            'balance': 0
+        }
+
+
+async def use_pricing(telegram_id, phone_model, storage, color, battery, sim_type, has_box, damage, price,
+                      allow_balance=True):
+    """
+    Narxlash qilish va tarixga qo'shish.
+
+    Kredit bitta atomar so'rov bilan yechiladi: bepul urinish, bo'lmasa
+    (allow_balance=True da) balans. Oldindan check_can_price() shart emas:
+    kredit yo'q bo'lsa reason='no_credits' bilan success=False qaytadi.
+    Tarix qatori history_writer navbatiga qo'yiladi (pricing_id=None);
+    navbat ishlamayotgan bo'lsa darhol yoziladi.
+
+    Xato sabablari (reason): 'no_credits', 'User topilmadi',
+    'unavailable' — pool yo'q yoki ulanib bo'lmadi, kredit yechilmagan;
+    'error' — kredit so'rovi yuborilgan, natijasi noma'lum (yechilgan
+    bo'lishi mumkin).
+    """
+    # Kredit yechilgan bo'lishi mumkinmi (so'rov yuborilgan, javob yo'q)
+    maybe_consumed = False
+    try:
+        async with acquire() as conn:
+            maybe_consumed = True
+            row = await conn.fetchrow(SQL_CONSUME_CREDIT, telegram_id, allow_balance)
+            maybe_consumed = row is not None
+            if row is None:
+                # Faqat muvaffaqiyatsiz holatda: xato sababini aniqlash
+                exists = await conn.fetchval(SQL_USER_EXISTS, telegram_id)
+            else:
+                history = (
+                    row['id'], telegram_id, phone_model, storage, color, battery,
+                    sim_type, has_box, damage, price, row['is_free'],
+                )
+
+        # Navbat ishlamayotgan (yoki to'xtab qolgan) bo'lsa — darhol yoziladi
+        # (kredit allaqachon yechilgan — tarix xatosi narxlashni to'xtatmaydi)
+        if row is not None and not await history_writer.add(history):
+            try:
+                async with acquire() as conn:
+                    await conn.execute(SQL_INSERT_PRICING, *history)
+            except Exception as e:
+                logger.error(f"❌ pricing_history ga yozilmadi (telegram_id={telegram_id}): {e}")
+
+        if row is None:
+            if not exists:
+                return {
+                    'success': False,
+                    'reason': 'User topilmadi',
+                    'error': 'User topilmadi'
+                }
+            return {
+                'success': False,
+                'reason': 'no_credits',
+                'error': 'Balans yoki bepul urinish yo\'q'
+            }
+
+        return {
+            'success': True,
+            'pricing_id': None,
+            'is_free_trial': row['is_free'],
+            'free_trials_left': row['free_trials_left'],
+            'balance': row['balance'],
+            'message': '✅ Narx tarixga qo\'shildi'
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Use pricing xato: {e}")
+        return {
+            'success': False,
+            'reason': 'error' if maybe_consumed else 'unavailable',
+            'error': str(e)
+        }
+
+
+# ============================================================
+# BALANS VA TO'LOV TARIXI
+# ============================================================
+
+async def get_user_balance(telegram_id):
+    """User balansini olish"""
+    try:
+        async with acquire() as conn:
+            result = await conn.fetchrow(SQL_GET_BALANCE, telegram_id)
+
+        if result:
+            return {
+                'success': True,
+                'balance': result['balance'],
+                'free_trials_left': result['free_trials_left'],
+                'total_pricings': result['total_pricings'],
+                'phone': result['phone_number'],
+            }
+        return {
+            'success': False,
+            'error': 'User topilmadi',
+            'balance': 0,
+            'free_trials_left': 0,
+            'total_pricings': 0
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Balans olishda xato: {e}")
+        return {
+            'success': False,
+            'error': str(e),
+            'balance': 0,
+            'free_trials_left': 0,
+            'total_pricings': 0
+        }
+
+
+async def get_user_payment_history(telegram_id, limit=5):
+    """Foydalanuvchi to'lov tarixini olish"""
+    try:
+        async with acquire() as conn:
+            rows = await conn.fetch(SQL_PAYMENT_HISTORY, telegram_id, limit)
+        return {'success': True, 'payments': [dict(r) for r in rows]}
+    except Exception as e:
+        return {'success': False, 'payments': [], 'error': str(e)}
@@ -0,0 +1,117 @@
+# utils/db_api/catalog_listener.py - KATALOG KESHINI LISTEN/NOTIFY ORQALI TOZALASH
+#
+# init_db() dagi triggerlar (va admin import) CATALOG_CHANNEL ga jadval nomini
+# yuboradi. Bu yerda alohida asyncpg ulanishi shu kanalni tinglaydi va
+# catalog_cache dagi tegishli kalitlarni o'chiradi. Ulanish uzilsa — kesh
+# to'liq tozalanadi va narx indeksi qayta yuklanadi (NOTIFY o'tkazib
+# yuborilgan bo'lishi mumkin).
+import asyncio
+import logging
+
+import asyncpg
+
+from utils.cache import catalog_cache
+from utils.db_api.database import PHONE_DB_CONFIG, CATALOG_CHANNEL, PRICES_RELOAD_PAYLOAD
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 5
+
+# NOTIFY payload (jadval nomi) -> o'chiriladigan kesh prefikslari
+_INVALIDATION_MAP = {
+    'models': ('catalog:models',),
+    'storages': ('catalog:storages:',),
+    'colors': ('catalog:colors:',),
+    'batteries': ('catalog:batteries:',),
+}
+
+_task = None
+
+
+async def _invalidate(payload):
+    prefixes = _INVALIDATION_MAP.get(payload)
+    if prefixes is None:
+        # 'prices', 'import' va noma'lum manbalar — hammasini tozalaymiz
+        await catalog_cache.clear()
+    else:
+        for prefix in prefixes:
+            await catalog_cache.delete_prefix(prefix)
+
+    if payload == PRICES_RELOAD_PAYLOAD:
+        await _reload_price_index()
+    elif payload in ('prices', 'import'):
+        from utils.db_api.async_database import get_pool
+        from utils.db_api.price_index import price_index
+        await price_index.refresh(get_pool())
+
+
+async def _reload_price_index():
+    """O'chirilgan / kaliti o'zgargan narxlar — indeksni to'liq qayta yuklash"""
+    from utils.db_api.async_database import get_pool
+    from utils.db_api.price_index import price_index
+    if price_index.is_loaded:
+        await price_index.load(get_pool())
+
+
+async def _listen_forever():
+    loop = asyncio.get_running_loop()
+
+    def on_notify(connection, pid, channel, payload):
+        loop.create_task(_invalidate(payload))
+
+    reconnected = False
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(
+                database=PHONE_DB_CONFIG['dbname'],
+                user=PHONE_DB_CONFIG['user'],
+                password=PHONE_DB_CONFIG['password'],
+                host=PHONE_DB_CONFIG['host'],
+                port=int(PHONE_DB_CONFIG['port']),
+            )
+            closed = loop.create_future()
+            conn.add_termination_listener(
+                lambda c: closed.done() or closed.set_result(None)
+            )
+            await conn.add_listener(CATALOG_CHANNEL, on_notify)
+
+            # Ulanish yo'q paytda kelgan o'zgarishlar uchun
+            await catalog_cache.clear()
+            if reconnected:
+                # Startup da indeks hozirgina yuklangan
+                await _reload_price_index()
+            reconnected = True
+            logger.info(f"✅ LISTEN {CATALOG_CHANNEL}")
+
+            await closed
+            logger.warning("⚠️ Katalog listener ulanishi uzildi")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Katalog listener xato: {e}")
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+
+        await catalog_cache.clear()
+        await asyncio.sleep(RECONNECT_DELAY)
+
+
+def start_listener():
+    """Fon LISTEN vazifasini ishga tushirish (on_startup)"""
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_listen_forever())
+
+
+async def stop_listener():
+    """Fon vazifani to'xtatish (on_shutdown)"""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
@@ -1,6 +1,9 @@
 # utils/db_api/database.py - PostgreSQL TO'LIQ VERSIYA (VACUUM FIXED)
 import psycopg2
 import psycopg2.extras
+import csv
+import json
+import io
 import os
 from datetime import datetime
 from dotenv import load_dotenv, find_dotenv
@@ -17,6 +20,12 @@ PHONE_DB_CONFIG = {
     'port': os.getenv('PHONE_DB_PORT', '5432')
 }
 
+# Katalog o'zgarganda NOTIFY yuboriladigan kanal
+CATALOG_CHANNEL = 'catalog_changed'
+CATALOG_TABLES = ('models', 'storages', 'colors', 'batteries', 'prices')
+# prices dan qator o'chirilganda yoki kaliti o'zgarganda yuboriladigan payload
+PRICES_RELOAD_PAYLOAD = 'prices:reload'
+
 
 def get_conn():
     """PostgreSQL database ulanishini yaratish"""
@@ -134,10 +143,20 @@ def init_db():
         ''')
         print("✅ PRICES jadvali yaratildi")
 
+        # ===================== MIGRATSIYA: damage_key =====================
+        # damage_pct aralash registrda saqlanadi. LOWER(damage_pct) bilan
+        # qidirish indeksdan foydalana olmaydi — shuning uchun kichik harfli
+        # kalit alohida (generated) ustunda saqlanadi.
+        cursor.execute('''
+            ALTER TABLE prices ADD COLUMN IF NOT EXISTS damage_key VARCHAR(255)
+            GENERATED ALWAYS AS (LOWER(damage_pct)) STORED
+        ''')
+        print("✅ PRICES.damage_key ustuni tayyor")
+
         conn.commit()
 
         # ============================================================
-        # 🚀 PERFORMANCE INDEKSLARI (21 TA)
+        # 🚀 PERFORMANCE INDEKSLARI (22 TA)
         # ============================================================
 
         print("\n🔄 Indekslar yaratilmoqda...")
@@ -237,12 +256,16 @@ def init_db():
         ''')
         print("✅ PARTS: 2 ta indeks")
 
-        # ========== PRICES INDEKSLARI (5 ta) ⭐ ENG MUHIM! ==========
+        # ========== PRICES INDEKSLARI (6 ta) ⭐ ENG MUHIM! ==========
+        # Covering indeks: get_price() index-only scan bo'ladi.
+        # Eski idx_prices_full_lookup UNIQUE cheklov indeksini takrorlardi.
+        cursor.execute("DROP INDEX IF EXISTS idx_prices_full_lookup")
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_prices_full_lookup 
-            ON prices(model_id, storage_size, color_name, sim_type, battery_label, has_box, damage_pct)
+            CREATE INDEX IF NOT EXISTS idx_prices_lookup_covering 
+            ON prices(model_id, storage_size, color_name, sim_type, battery_label, has_box, damage_key)
+            INCLUDE (price)
         ''')
-        print("✅ PRICES: Full lookup indeks")
+        print("✅ PRICES: Covering lookup indeks (damage_key + price)")
 
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_prices_model_storage 
@@ -268,6 +291,59 @@ def init_db():
         ''')
         print("✅ PRICES: Price value indeks")
 
+        # Narx indeksi (price_index.refresh) updated_at >= ... bilan o'qiydi
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_prices_updated
+            ON prices(updated_at)
+        ''')
+        print("✅ PRICES: Updated indeks")
+
+        conn.commit()
+
+        # ============================================================
+        # 🔔 KATALOG O'ZGARISHI TRIGGERLARI (LISTEN/NOTIFY)
+        # ============================================================
+        # Statement darajasida: 200k qatorli import ham bitta NOTIFY beradi
+        cursor.execute(f'''
+            CREATE OR REPLACE FUNCTION notify_catalog_change() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('{CATALOG_CHANNEL}', TG_TABLE_NAME);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        ''')
+
+        for table in CATALOG_TABLES:
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_catalog_notify ON {table}")
+            cursor.execute(f'''
+                CREATE TRIGGER trg_{table}_catalog_notify
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION notify_catalog_change()
+            ''')
+        print(f"✅ NOTIFY triggerlari: {len(CATALOG_TABLES)} ta jadval")
+
+        # Narx indeksi updated_at bo'yicha faqat qo'shilgan/yangilangan
+        # qatorlarni ko'radi. O'chirish va kalit ustunlarini o'zgartirish
+        # alohida payload bilan yuboriladi — bot indeksni to'liq qayta yuklaydi
+        cursor.execute(f'''
+            CREATE OR REPLACE FUNCTION notify_prices_reload() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('{CATALOG_CHANNEL}', '{PRICES_RELOAD_PAYLOAD}');
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        ''')
+        cursor.execute("DROP TRIGGER IF EXISTS trg_prices_reload_notify ON prices")
+        cursor.execute('''
+            CREATE TRIGGER trg_prices_reload_notify
+            AFTER DELETE OR TRUNCATE
+               OR UPDATE OF model_id, storage_size, color_name, sim_type,
+                            battery_label, has_box, damage_pct
+            ON prices
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_prices_reload()
+        ''')
+        print("✅ NOTIFY: prices o'chirish / kalit o'zgarishi")
+
         conn.commit()
 
         # ============================================================
@@ -300,9 +376,9 @@ def init_db():
         print("   - BATTERIES:  3 ta indeks")
         print("   - SIM_TYPES:  2 ta indeks")
         print("   - PARTS:      2 ta indeks")
-        print("   - PRICES:     5 ta indeks ⭐")
+        print("   - PRICES:     6 ta indeks ⭐")
         print("   " + "-" * 56)
-        print("   JAMI:        21 TA PERFORMANCE INDEKS! 🚀")
+        print("   JAMI:        22 TA PERFORMANCE INDEKS! 🚀")
         print("=" * 60)
         print("\n🎯 KUTILAYOTGAN NATIJALAR:")
         print("   - get_price():       ~200x tezroq (2000ms → 10ms)")
@@ -694,7 +770,7 @@ def get_price(model_id, storage, color, sim_type, battery, has_box, damage):
             AND sim_type = %s
             AND battery_label = %s
             AND has_box = %s
-            AND LOWER(damage_pct) = %s
+            AND damage_key = %s
         """, (model_id, storage, color_name, sim_type, battery, has_box_bool, search_damage))
 
         row = cursor.fetchone()
@@ -776,6 +852,97 @@ def add_price_record(model_id, storage, color, sim_type, battery, has_box, damag
         conn.close()
 
 
+class PriceCopyLoader:
+    """
+    Narxlarni COPY orqali ommaviy yuklash.
+
+    Qatorlar vaqtinchalik staging jadvalga COPY FROM STDIN bilan oqib
+    tushadi (SQL satr yasash yo'q — katak ichidagi qo'shtirnoq/SQL xavfsiz),
+    so'ng merge() bitta INSERT ... SELECT ... ON CONFLICT bilan hammasini
+    bitta tranzaksiyada prices ga o'tkazadi. Bir xil kalit bir necha marta
+    kelsa — oxirgisi yutadi.
+
+    Har bir qator: (model_id, storage_size, color_name, sim_type,
+    battery_label, has_box, damage_pct, price)
+    """
+
+    def __init__(self):
+        self.conn = get_conn()
+        self.cursor = self.conn.cursor()
+        self.staged = 0
+        self.cursor.execute('''
+            CREATE TEMP TABLE prices_stage (
+                seq BIGSERIAL,
+                model_id INTEGER NOT NULL,
+                storage_size VARCHAR(50) NOT NULL,
+                color_name VARCHAR(100) NOT NULL,
+                sim_type VARCHAR(50) NOT NULL,
+                battery_label VARCHAR(50) NOT NULL,
+                has_box BOOLEAN NOT NULL,
+                damage_pct VARCHAR(255) NOT NULL,
+                price NUMERIC(12, 2) NOT NULL
+            ) ON COMMIT DROP
+        ''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.conn.rollback()
+        self.close()
+        return False
+
+    def copy_rows(self, rows):
+        """Qatorlarni staging jadvalga COPY qilish"""
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        if not count:
+            return 0
+
+        buf.seek(0)
+        # FORCE_NOT_NULL: bo'sh rang ('') NULL emas, bo'sh satr bo'lib qoladi
+        self.cursor.copy_expert('''
+            COPY prices_stage (model_id, storage_size, color_name, sim_type,
+                               battery_label, has_box, damage_pct, price)
+            FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (
+                storage_size, color_name, sim_type, battery_label, damage_pct))
+        ''', buf)
+        self.staged += count
+        return count
+
+    def merge(self):
+        """Staging dan prices ga bitta UPSERT va COMMIT. Yozilgan qatorlar sonini qaytaradi"""
+        self.cursor.execute('''
+            INSERT INTO prices
+            (model_id, storage_size, color_name, sim_type, battery_label,
+             has_box, damage_pct, price, created_at, updated_at)
+            SELECT DISTINCT ON (model_id, storage_size, color_name, sim_type, battery_label, has_box, damage_pct)
+                model_id, storage_size, color_name, sim_type, battery_label,
+                has_box, damage_pct, price, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+            FROM prices_stage
+            ORDER BY model_id, storage_size, color_name, sim_type, battery_label, has_box, damage_pct, seq DESC
+            ON CONFLICT (model_id, storage_size, color_name, sim_type, battery_label, has_box, damage_pct)
+            DO UPDATE SET
+                price = EXCLUDED.price,
+                updated_at = EXCLUDED.updated_at
+        ''')
+        merged = self.cursor.rowcount
+        self.conn.commit()
+        return merged
+
+    def close(self):
+        try:
+            self.cursor.close()
+            self.conn.close()
+        except Exception:
+            pass
+
+
 def clear_all_prices():
     """Narxlarni tozalash"""
     conn = get_conn()
@@ -794,8 +961,78 @@ def clear_all_prices():
         conn.close()
 
 
+def notify_catalog_changed(cursor, source='import'):
+    """Katalog keshini tozalash uchun NOTIFY (commit bilan birga yetkaziladi)"""
+    cursor.execute("SELECT pg_notify(%s, %s)", (CATALOG_CHANNEL, source))
+
+
 # ===================== TEST FUNKSIYASI =====================
 
+# get_price() so'rovi shu indeks bo'yicha Index Only Scan bo'lishi kerak
+PRICE_LOOKUP_INDEX = 'idx_prices_lookup_covering'
+
+
+def explain_price_lookup(model_id=None):
+    """get_price() so'rovining rejasi (EXPLAIN FORMAT JSON, 'Plan' tuguni).
+
+    Mavjud qator kaliti bilan tekshiriladi (model_id berilsa — shu
+    modelning qatori); mos qator bo'lmasa None.
+    """
+    conn = get_conn()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT model_id, storage_size, color_name, sim_type, battery_label, has_box, damage_key "
+            "FROM prices WHERE %(model_id)s IS NULL OR model_id = %(model_id)s LIMIT 1",
+            {'model_id': model_id}
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        cursor.execute("""
+            EXPLAIN (FORMAT JSON) SELECT price FROM prices
+            WHERE model_id = %s
+            AND storage_size = %s
+            AND color_name = %s
+            AND sim_type = %s
+            AND battery_label = %s
+            AND has_box = %s
+            AND damage_key = %s
+        """, row)
+        result = cursor.fetchone()[0]
+        if isinstance(result, str):
+            result = json.loads(result)
+        return result[0]['Plan']
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _plan_scans(plan):
+    """Reja daraxtidagi skan tugunlari: [('Index Only Scan', 'idx_...'), ...]"""
+    scans = []
+    if 'Scan' in plan['Node Type']:
+        scans.append((plan['Node Type'], plan.get('Index Name')))
+    for child in plan.get('Plans', []):
+        scans.extend(_plan_scans(child))
+    return scans
+
+
+def check_price_lookup_plan(model_id=None):
+    """
+    get_price() covering indeks bo'yicha Index Only Scan ekanini tekshirish.
+
+    Qaytaradi: (ok, skanlar) — ok True/False, prices bo'sh bo'lsa None
+    (reja hali ma'noga ega emas).
+    """
+    plan = explain_price_lookup(model_id)
+    if plan is None:
+        return None, []
+    scans = _plan_scans(plan)
+    return ('Index Only Scan', PRICE_LOOKUP_INDEX) in scans, scans
+
+
 def test_connection():
     """PostgreSQL ulanishini tekshirish"""
     try:
@@ -817,4 +1054,8 @@ if __name__ == "__main__":
     # Test ulanish
     if test_connection():
         # Database yaratish
-        init_db()
\ No newline at end of file
+        init_db()
+
+        # get_price rejasi
+        ok, scans = check_price_lookup_plan()
+        print(f"{'✅' if ok else '⚠️'} get_price rejasi: {scans}")
\ No newline at end of file
@@ -0,0 +1,196 @@
+# utils/db_api/history_writer.py - PRICING_HISTORY UCHUN WRITE-BEHIND NAVBAT
+#
+# pricing_history faqat statistika va analitika uchun o'qiladi, shuning
+# uchun har bir narxlashda uni so'rov yo'lida yozish shart emas. Kredit
+# yechish (async_user_database.use_pricing) sinxron qoladi, tarix qatori
+# esa cheklangan navbatga qo'yiladi. Fon vazifa navbatni HISTORY_BATCH_SIZE
+# qator yoki HISTORY_FLUSH_MS millisekund to'lganda bitta COPY bilan
+# yozadi. on_shutdown da stop() qolgan qatorlarni yozib tugatadi.
+#
+# COPY xato bersa bo'lak HISTORY_COPY_RETRIES marta qayta yuboriladi, keyin
+# qatorlar bittadan INSERT qilinadi — bitta yaroqsiz qator (o'chirilgan
+# user FK si, juda uzun satr) boshqa userlarning tarixini olib ketmaydi.
+# Fon vazifa kutilmaganda to'xtasa is_running False bo'ladi, add() False
+# qaytaradi (use_pricing o'zi yozadi) va navbatda qolganlar yozib olinadi.
+#
+# created_at ustuni berilmaydi — DB default (CURRENT_TIMESTAMP) qo'yadi;
+# navbatdagi kechikish HISTORY_FLUSH_MS dan oshmaydi.
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+HISTORY_BATCH_SIZE = int(os.getenv('PRICING_HISTORY_BATCH', '200'))
+HISTORY_FLUSH_MS = int(os.getenv('PRICING_HISTORY_FLUSH_MS', '500'))
+# Navbat to'lsa add() joy bo'shashini kutadi (backpressure)
+HISTORY_QUEUE_MAX = int(os.getenv('PRICING_HISTORY_QUEUE_MAX', '10000'))
+# COPY muvaffaqiyatsiz bo'lsa qayta urinishlar soni va ular orasidagi pauza
+HISTORY_COPY_RETRIES = int(os.getenv('PRICING_HISTORY_COPY_RETRIES', '2'))
+HISTORY_RETRY_DELAY = float(os.getenv('PRICING_HISTORY_RETRY_DELAY', '0.5'))
+
+HISTORY_COLUMNS = (
+    'user_id', 'telegram_id', 'phone_model', 'storage', 'color', 'battery',
+    'sim_type', 'has_box', 'damage', 'price', 'is_free_trial',
+)
+
+SQL_INSERT_ROW = f"""
+    INSERT INTO pricing_history ({', '.join(HISTORY_COLUMNS)})
+    VALUES ({', '.join(f'${i}' for i in range(1, len(HISTORY_COLUMNS) + 1))})
+"""
+
+_STOP = object()
+
+
+class HistoryWriter:
+    """pricing_history qatorlarini bo'laklab yozuvchi fon vazifa"""
+
+    def __init__(self, batch_size=HISTORY_BATCH_SIZE, flush_ms=HISTORY_FLUSH_MS, max_queue=HISTORY_QUEUE_MAX):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.max_queue = max_queue
+        self._queue = None
+        self._pool = None
+        self._task = None
+        self._salvage_task = None
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def is_running(self):
+        return self._task is not None
+
+    def stats(self):
+        """Navbat holati (monitoring uchun)"""
+        return {
+            'running': self.is_running,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'written': self.written,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
+
+    async def add(self, row):
+        """
+        Qatorni navbatga qo'yish (HISTORY_COLUMNS tartibida).
+
+        Navbat ishlamayotgan bo'lsa False — chaqiruvchi qatorni o'zi yozadi.
+        """
+        if not self.is_running:
+            return False
+        await self._queue.put(row)
+        return True
+
+    async def _insert_rows(self, batch):
+        """Qatorlarni bittadan yozish — yaroqsiz qator faqat o'zini yo'qotadi"""
+        done = 0
+        try:
+            async with self._pool.acquire() as conn:
+                for row in batch:
+                    try:
+                        await conn.execute(SQL_INSERT_ROW, *row)
+                        self.written += 1
+                    except Exception as e:
+                        # Tarix faqat statistika uchun — kredit allaqachon yechilgan
+                        self.failed += 1
+                        logger.error(f"❌ pricing_history qatori yozilmadi (telegram_id={row[1]}): {e}")
+                    done += 1
+        except Exception as e:
+            self.failed += len(batch) - done
+            logger.error(f"❌ pricing_history ga {len(batch) - done} ta qator yozilmadi: {e}")
+
+    async def _flush(self, batch):
+        error = None
+        for attempt in range(HISTORY_COPY_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(HISTORY_RETRY_DELAY * attempt)
+            try:
+                async with self._pool.acquire() as conn:
+                    await conn.copy_records_to_table(
+                        'pricing_history', records=batch, columns=HISTORY_COLUMNS
+                    )
+                self.written += len(batch)
+                self.batches += 1
+                return
+            except Exception as e:
+                error = e
+
+        logger.warning(f"⚠️ pricing_history COPY ({len(batch)} ta qator) o'tmadi, bittadan yoziladi: {error}")
+        await self._insert_rows(batch)
+
+    async def _run(self):
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    def start(self, pool):
+        """Fon yozish vazifasini ishga tushirish (on_startup da)"""
+        if self._task is None:
+            self._pool = pool
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.create_task(self._run())
+            self._task.add_done_callback(self._on_done)
+            logger.info(f"✅ pricing_history navbati ishga tushdi ({self.batch_size} qator / {self.flush_interval * 1000:.0f} ms)")
+
+    def _on_done(self, task):
+        """Vazifa tugadi: kutilmagan xato bo'lsa navbatda qolganlarni yozib olish"""
+        if self._task is task:
+            self._task = None
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.error(f"❌ pricing_history navbati kutilmaganda to'xtadi: {task.exception()}")
+        self._salvage_task = asyncio.get_running_loop().create_task(self._salvage())
+
+    async def _salvage(self):
+        # put() da kutayotganlar ham joy bo'shagach shu siklda olinadi
+        queue = self._queue
+        while not queue.empty():
+            batch = []
+            while not queue.empty() and len(batch) < self.batch_size:
+                item = queue.get_nowait()
+                if item is not _STOP:
+                    batch.append(item)
+            if batch:
+                await self._insert_rows(batch)
+
+    async def stop(self):
+        """Navbatdagi hamma qatorni yozib, vazifani to'xtatish (on_shutdown da)"""
+        task = self._task
+        if task is not None:
+            await self._queue.put(_STOP)
+            await asyncio.gather(task, return_exceptions=True)
+            self._task = None
+        if self._salvage_task is not None:
+            await self._salvage_task
+            self._salvage_task = None
+        if task is not None:
+            logger.info(f"✅ pricing_history navbati to'xtadi ({self.written} ta yozildi, {self.failed} ta xato)")
+
+
+# Global navbat
+history_writer = HistoryWriter()
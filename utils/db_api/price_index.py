@@ -0,0 +1,169 @@
+# utils/db_api/price_index.py - NARXLAR XOTIRADAGI INDEKSI
+#
+# prices jadvali to'liq xotiraga yuklanadi: kalit qismlari intern qilingan
+# satrlar, narxlar esa array('d') da saqlanadi. Shunda get_price() bitta
+# dict lookup bo'ladi (DB round trip yo'q). Indeks updated_at bo'yicha
+# inkremental yangilanadi.
+#
+# refresh() faqat idx_prices_updated bo'yicha oxirgi o'zgarishlarni o'qiydi.
+# updated_at o'chirilgan qatorlarni va eski kalitlarni ko'rsatmaydi — ular
+# uchun prices dagi DELETE / TRUNCATE / kalit ustunlarini UPDATE qilish
+# PRICES_RELOAD_PAYLOAD NOTIFY ini yuboradi va catalog_listener load()
+# qiladi (listener qayta ulanganda ham — NOTIFY o'tkazib yuborilgan
+# bo'lishi mumkin).
+import asyncio
+import logging
+import os
+import sys
+from array import array
+from datetime import timedelta
+
+from utils.db_api.database import normalize_damage_format, normalize_for_search
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = float(os.getenv('PRICE_INDEX_REFRESH', '30'))
+# Uzoq tranzaksiyalar (bulk import) updated_at ni commitdan oldin qo'yadi —
+# shuning uchun oxirgi belgidan biroz orqaroqdan qayta o'qiymiz.
+REFRESH_OVERLAP = timedelta(seconds=int(os.getenv('PRICE_INDEX_OVERLAP', '60')))
+
+_SELECT_SQL = """
+    SELECT model_id, storage_size, color_name, sim_type, battery_label,
+           has_box, damage_key AS damage, price, updated_at
+    FROM prices
+"""
+
+
+def make_key(model_id, storage, color, sim_type, battery, has_box, damage):
+    """get_price() argumentlaridan indeks kalitini yasash"""
+    color_name = color if color and color != "Standart" else ""
+    has_box_bool = True if has_box == "Bor" or has_box == True else False
+
+    damage_pct = str(damage).strip()
+    if not damage_pct or damage_pct.lower() in ["yangi", "none", "nan"]:
+        damage_pct = "Yangi"
+    else:
+        damage_pct = normalize_damage_format(damage_pct)
+
+    return (
+        model_id, storage, color_name, sim_type, battery,
+        has_box_bool, normalize_for_search(damage_pct)
+    )
+
+
+def _intern(value):
+    return sys.intern(value) if value else ''
+
+
+class PriceIndex:
+    """prices jadvalining xotiradagi nusxasi"""
+
+    def __init__(self):
+        self._slots = {}           # kalit -> _prices dagi indeks
+        self._prices = array('d')
+        self._watermark = None     # eng katta ko'rilgan updated_at
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    @property
+    def is_loaded(self):
+        return self._loaded
+
+    def __len__(self):
+        return len(self._slots)
+
+    def lookup(self, model_id, storage, color, sim_type, battery, has_box, damage):
+        """Narxni olish (topilmasa None)"""
+        slot = self._slots.get(make_key(model_id, storage, color, sim_type, battery, has_box, damage))
+        return self._prices[slot] if slot is not None else None
+
+    def _apply(self, rows):
+        slots = self._slots
+        prices = self._prices
+        watermark = self._watermark
+
+        for row in rows:
+            key = (
+                row['model_id'],
+                _intern(row['storage_size']),
+                _intern(row['color_name']),
+                _intern(row['sim_type']),
+                _intern(row['battery_label']),
+                bool(row['has_box']),
+                _intern(row['damage']),
+            )
+            price = float(row['price'])
+            slot = slots.get(key)
+            if slot is None:
+                slots[key] = len(prices)
+                prices.append(price)
+            else:
+                prices[slot] = price
+
+            updated_at = row['updated_at']
+            if updated_at and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+
+        self._watermark = watermark
+        return len(rows)
+
+    async def _load(self, conn):
+        rows = await conn.fetch(_SELECT_SQL)
+        self._slots = {}
+        self._prices = array('d')
+        self._watermark = None
+        self._apply(rows)
+        self._loaded = True
+
+    async def load(self, pool):
+        """To'liq yuklash (startup, o'chirish va kalit o'zgarishidan keyin)"""
+        async with self._lock:
+            async with pool.acquire() as conn:
+                await self._load(conn)
+        logger.info(f"✅ Narx indeksi yuklandi: {len(self._slots):,} ta")
+
+    async def refresh(self, pool):
+        """updated_at bo'yicha inkremental yangilash (o'chirishlar — NOTIFY orqali load())"""
+        if not self._loaded:
+            await self.load(pool)
+            return
+
+        async with self._lock:
+            if self._watermark is None:
+                rows = await pool.fetch(_SELECT_SQL)
+            else:
+                rows = await pool.fetch(
+                    _SELECT_SQL + " WHERE updated_at >= $1",
+                    self._watermark - REFRESH_OVERLAP
+                )
+            self._apply(rows)
+
+    async def _refresh_loop(self, pool, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(pool)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Narx indeksini yangilashda xato: {e}")
+
+    def start(self, pool, interval=REFRESH_INTERVAL):
+        """Fon yangilash vazifasini ishga tushirish"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(pool, interval))
+
+    async def stop(self):
+        """Fon vazifani to'xtatish"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global indeks
+price_index = PriceIndex()
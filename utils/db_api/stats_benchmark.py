@@ -0,0 +1,222 @@
+# utils/db_api/stats_benchmark.py - STATISTIKA SO'ROVLARI REJALARINI SOLISHTIRISH
+#
+# Eski (DATE(created_at) = CURRENT_DATE, DATE_TRUNC(...) = DATE_TRUNC(...))
+# va yangi (STATS_TIMEZONE bo'yicha yarim ochiq oraliq) so'rovlarni bir xil
+# ma'lumotda solishtiradi. users_db ichida alohida `stats_bench` sxemasi
+# yaratiladi, pricing_history nusxasi generate_series bilan to'ldiriladi
+# (standart 5 000 000 qator) va har bir so'rov ikki indeks to'plamida
+# EXPLAIN (ANALYZE, BUFFERS) qilinadi:
+#   * base      — eski created_at DESC va phone_model indekslari;
+#   * composite — (created_at, phone_model) va (created_at, telegram_id).
+# Asosiy pricing_history ga tegilmaydi; oxirida sxema o'chiriladi.
+#
+#   python -m utils.db_api.stats_benchmark --rows 5000000 --days 365
+import argparse
+import json
+import time
+
+import psycopg2
+
+from utils.db_api.user_database import USER_DB_CONFIG, period_range
+
+BENCH_SCHEMA = 'stats_bench'
+
+BENCH_MODELS = [
+    f"iPhone {series}{suffix}"
+    for series in ('11', '12', '13', '14', '15', '16')
+    for suffix in ('', ' Mini', ' Pro', ' Pro Max', ' Plus')
+]
+
+SQL_CREATE_TABLE = """
+    CREATE TABLE pricing_history (
+        id BIGSERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        telegram_id BIGINT NOT NULL,
+        phone_model VARCHAR(255) NOT NULL,
+        storage VARCHAR(50),
+        color VARCHAR(100),
+        battery VARCHAR(50),
+        sim_type VARCHAR(50),
+        has_box VARCHAR(10),
+        damage VARCHAR(255),
+        price INTEGER,
+        is_free_trial BOOLEAN DEFAULT FALSE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# created_at — LOCALTIMESTAMP dan oxirgi `days` kun ichida tekis taqsimlangan
+SQL_SEED = """
+    INSERT INTO pricing_history
+        (user_id, telegram_id, phone_model, storage, color, battery, sim_type,
+         has_box, damage, price, is_free_trial, created_at)
+    SELECT
+        g.u, 1000000000 + g.u,
+        m.models[1 + floor(random() * cardinality(m.models))::int],
+        '128GB', 'Black', '100%%', 'eSIM', 'Bor', 'Yangi',
+        (random() * 1000)::int,
+        random() < 0.3,
+        LOCALTIMESTAMP - random() * make_interval(days => %(days)s)
+    FROM (
+        SELECT floor(random() * %(users)s)::int + 1 AS u
+        FROM generate_series(1, %(rows)s)
+    ) g,
+    (SELECT %(models)s::text[] AS models) m
+"""
+
+INDEX_SETS = {
+    'base': [
+        "CREATE INDEX bench_created ON pricing_history(created_at DESC)",
+        "CREATE INDEX bench_model ON pricing_history(phone_model)",
+    ],
+    'composite': [
+        "CREATE INDEX bench_created_model ON pricing_history(created_at, phone_model)",
+        "CREATE INDEX bench_created_telegram ON pricing_history(created_at, telegram_id)",
+    ],
+}
+
+_TOP_MODELS = """
+    SELECT phone_model, COUNT(*) as count, COUNT(DISTINCT telegram_id) as unique_users
+    FROM pricing_history
+    WHERE phone_model IS NOT NULL AND phone_model != ''
+    {time_filter}
+    GROUP BY phone_model
+    ORDER BY count DESC
+    LIMIT 10
+"""
+
+_RANGE = "created_at >= %(start)s AND created_at < %(end)s"
+
+# nom -> (davr, eski so'rov, yangi so'rov)
+QUERIES = {
+    'today_pricings': (
+        'daily',
+        "SELECT COUNT(*) FROM pricing_history WHERE DATE(created_at) = CURRENT_DATE",
+        f"SELECT COUNT(*) FROM pricing_history WHERE {_RANGE}",
+    ),
+    'month_active_users': (
+        'monthly',
+        """SELECT COUNT(DISTINCT telegram_id) FROM pricing_history
+           WHERE DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE)""",
+        f"SELECT COUNT(DISTINCT telegram_id) FROM pricing_history WHERE {_RANGE}",
+    ),
+    'top_models_daily': (
+        'daily',
+        _TOP_MODELS.format(time_filter="AND DATE(created_at) = CURRENT_DATE"),
+        _TOP_MODELS.format(time_filter=f"AND {_RANGE}"),
+    ),
+    'top_models_weekly': (
+        'weekly',
+        _TOP_MODELS.format(time_filter="AND created_at >= CURRENT_DATE - INTERVAL '7 days'"),
+        _TOP_MODELS.format(time_filter=f"AND {_RANGE}"),
+    ),
+}
+
+
+def _plan_nodes(plan):
+    """Reja daraxtidagi skan tugunlari: 'Index Only Scan(bench_created_model)'"""
+    nodes = []
+    node_type = plan['Node Type']
+    if 'Scan' in node_type:
+        index = plan.get('Index Name')
+        nodes.append(f"{node_type}({index})" if index else node_type)
+    for child in plan.get('Plans', []):
+        nodes.extend(_plan_nodes(child))
+    return nodes
+
+
+def explain(cursor, sql, params, repeat):
+    """
+    EXPLAIN (ANALYZE, BUFFERS) — eng yaxshi natija.
+
+    Qaytaradi: {'ms', 'buffers', 'plan'}.
+    """
+    best = None
+    for _ in range(repeat):
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+        result = cursor.fetchone()[0]
+        if isinstance(result, str):
+            result = json.loads(result)
+        root = result[0]
+        plan = root['Plan']
+        run = {
+            'ms': root['Execution Time'],
+            'buffers': plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0),
+            'plan': " > ".join(_plan_nodes(plan)),
+        }
+        if best is None or run['ms'] < best['ms']:
+            best = run
+    return best
+
+
+def seed(cursor, rows, days, users):
+    """Sxema va jadvalni yaratib, qatorlar bilan to'ldirish"""
+    cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+    cursor.execute(f"SET search_path TO {BENCH_SCHEMA}")
+    cursor.execute(SQL_CREATE_TABLE)
+
+    start = time.monotonic()
+    cursor.execute(SQL_SEED, {'rows': rows, 'days': days, 'users': users, 'models': BENCH_MODELS})
+    print(f"✅ {rows:,} ta qator yozildi ({time.monotonic() - start:.1f} s)")
+
+
+def use_indexes(cursor, name):
+    """Faqat tanlangan indeks to'plamini qoldirish va VACUUM ANALYZE"""
+    for statements in INDEX_SETS.values():
+        for statement in statements:
+            index = statement.split()[2]
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+    start = time.monotonic()
+    for statement in INDEX_SETS[name]:
+        cursor.execute(statement)
+    # Index Only Scan uchun visibility map kerak
+    cursor.execute("VACUUM ANALYZE pricing_history")
+    print(f"🔄 Indekslar: {name} ({time.monotonic() - start:.1f} s)")
+
+
+def run(rows, days, users, repeat, keep):
+    conn = psycopg2.connect(**USER_DB_CONFIG)
+    conn.autocommit = True
+    cursor = conn.cursor()
+
+    try:
+        seed(cursor, rows, days, users)
+
+        results = []
+        for index_set in INDEX_SETS:
+            use_indexes(cursor, index_set)
+            for name, (period, old_sql, new_sql) in QUERIES.items():
+                start, end = period_range(period)
+                for variant, sql in (('old', old_sql), ('new', new_sql)):
+                    result = explain(cursor, sql, {'start': start, 'end': end}, repeat)
+                    results.append((name, variant, index_set, result))
+
+        print("\n{:<20} {:<8} {:<10} {:>10} {:>10}  {}".format("so'rov", 'variant', 'indeks', 'ms', 'bufer', 'reja'))
+        print("-" * 100)
+        for name, variant, index_set, result in results:
+            print(
+                f"{name:<20} {variant:<8} {index_set:<10} "
+                f"{result['ms']:>10.1f} {result['buffers']:>10,}  {result['plan']}"
+            )
+    finally:
+        if not keep:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statistika so'rovlari: eski va yangi rejalar")
+    parser.add_argument('--rows', type=int, default=5_000_000, help="pricing_history qatorlari")
+    parser.add_argument('--days', type=int, default=365, help="created_at oralig'i (kun)")
+    parser.add_argument('--users', type=int, default=50_000, help="turli telegram_id soni")
+    parser.add_argument('--repeat', type=int, default=3, help="har bir so'rov necha marta")
+    parser.add_argument('--keep', action='store_true', help="stats_bench sxemasini qoldirish")
+    args = parser.parse_args()
+    run(args.rows, args.days, args.users, args.repeat, args.keep)
+
+
+if __name__ == '__main__':
+    main()
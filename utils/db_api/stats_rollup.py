@@ -0,0 +1,229 @@
+# utils/db_api/stats_rollup.py - ADMIN STATISTIKASI UCHUN KUNLIK JAMLANMALAR
+#
+# get_users_statistics / get_detailed_users_statistics avval har bir
+# ochilishda users va pricing_history ustida o'ntacha COUNT bajarardi
+# (jumladan butun tarix bo'yicha). Endi kunlik jamlanmalar alohida
+# jadvallarda saqlanadi va statistika bir necha qatorni o'qiydi:
+#   * stats_daily        — kun: yangi userlar, aktiv userlar, narxlashlar,
+#                          bepul / pullik narxlashlar;
+#   * stats_daily_models — kun × model: narxlashlar soni;
+#   * stats_daily_users  — kun × telegram_id: oylik aktivlarni (DISTINCT)
+#                          kunlik sonlarni qo'shib bo'lmagani uchun.
+#
+# Jamlanmalarni fon vazifa yangilaydi: har STATS_ROLLUP_INTERVAL soniyada
+# oxirgi (hali yopilmagan) kundan bugungacha qayta hisoblanadi, shuning
+# uchun pricing_history dan faqat shu kunlarning qatorlari o'qiladi.
+# Birinchi ishga tushishda (yoki uzoq to'xtashdan keyin) tarix
+# STATS_ROLLUP_CHUNK_DAYS kunlik bo'laklar bilan, har bo'lak alohida
+# tranzaksiyada jamlanadi — bitta ulkan so'rov command_timeout ga
+# urilib, har safar boshidan qayta boshlanmaydi. Jamlanma bugungacha
+# yetmaguncha statistika funksiyalari to'g'ridan-to'g'ri hisoblaydi
+# (user_database._rollup_ready). Narxlash
+# yo'liga hech narsa qo'shilmaydi — "bugun" qatorini har narxlashda
+# yangilash hamma tranzaksiyalarni bitta qator qulfiga navbatga qo'yardi.
+#
+# Kunlar STATS_TIMEZONE (Asia/Tashkent) bo'yicha: pricing_history faqat
+# created_at >= (kun boshi) oralig'i bilan o'qiladi va (created_at,
+# phone_model) / (created_at, telegram_id) indekslaridan olinadi.
+import asyncio
+import logging
+import os
+import time
+from datetime import timedelta
+
+from utils.db_api.user_database import STATS_TIMEZONE, stats_today
+
+logger = logging.getLogger(__name__)
+
+STATS_ROLLUP_INTERVAL = float(os.getenv('STATS_ROLLUP_INTERVAL', '60'))
+# Bir nechta bot jarayoni bo'lsa jamlashni faqat bittasi bajaradi
+STATS_ROLLUP_LOCK_ID = 72024
+# Bitta tranzaksiyada jamlanadigan kunlar soni. Har bo'lak oxirgi jamlangan
+# kundan (u qayta hisoblanadi) boshlanadi — 1 kunlik bo'lak hech qachon
+# oldinga siljimasdi, shuning uchun kamida 2
+STATS_ROLLUP_CHUNK_DAYS = max(int(os.getenv('STATS_ROLLUP_CHUNK_DAYS', '31')), 2)
+# Jamlash so'rovlari vaqt chegarasi (pool dagi command_timeout o'rniga)
+STATS_ROLLUP_TIMEOUT = float(os.getenv('STATS_ROLLUP_TIMEOUT', '600'))
+
+SQL_TRY_LOCK = "SELECT pg_try_advisory_xact_lock($1)"
+
+# Parametrlar: $1 — boshlang'ich kun, $2 — vaqt mintaqasi, $3 — oxirgi
+# kun (ichida). created_at (mintaqasiz, server vaqti) -> STATS_TIMEZONE sanasi
+LOCAL_DAY = "(created_at::timestamptz AT TIME ZONE $2::text)::date"
+# [$1 boshi, $3 + 1 boshi) — indeks bo'yicha yarim ochiq oraliq
+DAY_RANGE = (
+    "created_at >= ($1::date::timestamp AT TIME ZONE $2::text) "
+    "AND created_at < (($3::date + 1)::timestamp AT TIME ZONE $2::text)"
+)
+
+# Oxirgi jamlangan kun (u ham qayta hisoblanadi — yarim tunda yopiladi).
+# Jamlanma bo'sh bo'lsa — eng birinchi yozuv kuni. $1 — mintaqa, $2 — bugun.
+SQL_START_DAY = """
+    SELECT COALESCE(
+        (SELECT MAX(day) FROM stats_daily),
+        (LEAST(
+            (SELECT MIN(created_at) FROM users),
+            (SELECT MIN(created_at) FROM pricing_history)
+        )::timestamptz AT TIME ZONE $1::text)::date,
+        $2::date
+    )
+"""
+
+SQL_DELETE_MODELS = "DELETE FROM stats_daily_models WHERE day BETWEEN $1::date AND $2::date"
+
+SQL_INSERT_MODELS = f"""
+    INSERT INTO stats_daily_models (day, phone_model, pricings)
+    SELECT {LOCAL_DAY}, phone_model, COUNT(*)
+    FROM pricing_history
+    WHERE {DAY_RANGE}
+      AND phone_model IS NOT NULL AND phone_model != ''
+    GROUP BY 1, 2
+"""
+
+SQL_DELETE_USERS = "DELETE FROM stats_daily_users WHERE day BETWEEN $1::date AND $2::date"
+
+SQL_INSERT_USERS = f"""
+    INSERT INTO stats_daily_users (day, telegram_id)
+    SELECT DISTINCT {LOCAL_DAY}, telegram_id
+    FROM pricing_history
+    WHERE {DAY_RANGE}
+"""
+
+SQL_UPSERT_DAILY = f"""
+    INSERT INTO stats_daily
+        (day, new_users, active_users, pricings, free_pricings, paid_pricings, updated_at)
+    SELECT
+        d.day,
+        COALESCE(u.new_users, 0),
+        COALESCE(a.active_users, 0),
+        COALESCE(p.pricings, 0),
+        COALESCE(p.free_pricings, 0),
+        COALESCE(p.paid_pricings, 0),
+        CURRENT_TIMESTAMP
+    FROM (
+        SELECT g.day::date AS day
+        FROM generate_series($1::date, $3::date, INTERVAL '1 day') AS g(day)
+    ) d
+    LEFT JOIN (
+        SELECT {LOCAL_DAY} AS day, COUNT(*) AS new_users
+        FROM users
+        WHERE {DAY_RANGE}
+        GROUP BY 1
+    ) u ON u.day = d.day
+    LEFT JOIN (
+        SELECT day, COUNT(*) AS active_users
+        FROM stats_daily_users
+        WHERE day BETWEEN $1::date AND $3::date
+        GROUP BY 1
+    ) a ON a.day = d.day
+    LEFT JOIN (
+        SELECT
+            {LOCAL_DAY} AS day,
+            COUNT(*) AS pricings,
+            COUNT(CASE WHEN is_free_trial = TRUE THEN 1 END) AS free_pricings,
+            COUNT(CASE WHEN is_free_trial = FALSE THEN 1 END) AS paid_pricings
+        FROM pricing_history
+        WHERE {DAY_RANGE}
+        GROUP BY 1
+    ) p ON p.day = d.day
+    ON CONFLICT (day) DO UPDATE SET
+        new_users = EXCLUDED.new_users,
+        active_users = EXCLUDED.active_users,
+        pricings = EXCLUDED.pricings,
+        free_pricings = EXCLUDED.free_pricings,
+        paid_pricings = EXCLUDED.paid_pricings,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+class StatsRollup:
+    """Kunlik statistika jadvallarini yangilovchi fon vazifa"""
+
+    def __init__(self):
+        self._task = None
+        self.last_refresh = None   # oxirgi muvaffaqiyatli yangilash (time.time())
+        self.last_elapsed = 0.0
+
+    @property
+    def is_running(self):
+        return self._task is not None
+
+    async def _refresh_chunk(self, pool, tz, today):
+        """
+        Bitta bo'lak: oxirgi jamlangan kundan STATS_ROLLUP_CHUNK_DAYS kun
+        (bugundan oshmaydi), bitta tranzaksiyada. Qaytaradi: (from_day,
+        to_day) yoki boshqa jarayon jamlayotgan bo'lsa None.
+        """
+        timeout = STATS_ROLLUP_TIMEOUT
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if not await conn.fetchval(SQL_TRY_LOCK, STATS_ROLLUP_LOCK_ID, timeout=timeout):
+                    return None
+
+                from_day = await conn.fetchval(SQL_START_DAY, tz, today, timeout=timeout)
+                to_day = min(today, from_day + timedelta(days=STATS_ROLLUP_CHUNK_DAYS - 1))
+                await conn.execute(SQL_DELETE_MODELS, from_day, to_day, timeout=timeout)
+                await conn.execute(SQL_INSERT_MODELS, from_day, tz, to_day, timeout=timeout)
+                await conn.execute(SQL_DELETE_USERS, from_day, to_day, timeout=timeout)
+                await conn.execute(SQL_INSERT_USERS, from_day, tz, to_day, timeout=timeout)
+                await conn.execute(SQL_UPSERT_DAILY, from_day, tz, to_day, timeout=timeout)
+        return from_day, to_day
+
+    async def refresh(self, pool):
+        """
+        Oxirgi jamlangan kundan bugungacha qayta hisoblash — bo'laklab,
+        har bo'lak alohida commit qilinadi.
+
+        Qaytaradi: qayta hisoblangan birinchi kun, yoki boshqa jarayon
+        jamlayotgan bo'lsa None.
+        """
+        start = time.monotonic()
+        tz, today = STATS_TIMEZONE.key, stats_today()
+        first_day = None
+
+        while True:
+            chunk = await self._refresh_chunk(pool, tz, today)
+            if chunk is None:
+                return None
+            from_day, to_day = chunk
+            if first_day is None:
+                first_day = from_day
+            if to_day >= today:
+                break
+            logger.info(f"📊 Statistika jamlanmoqda: {from_day} — {to_day}")
+
+        self.last_refresh = time.time()
+        self.last_elapsed = time.monotonic() - start
+        return first_day
+
+    async def _refresh_loop(self, pool, interval):
+        while True:
+            try:
+                from_day = await self.refresh(pool)
+                if from_day is not None:
+                    logger.debug(f"📊 Statistika jamlandi: {from_day} dan ({self.last_elapsed:.2f} s)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ Kunlik statistikani yangilashda xato: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, pool, interval=STATS_ROLLUP_INTERVAL):
+        """Fon yangilash vazifasini ishga tushirish (birinchi yangilash darhol)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(pool, interval))
+            logger.info(f"✅ Kunlik statistika jamlanmasi ishga tushdi (har {interval:.0f} s)")
+
+    async def stop(self):
+        """Fon vazifani to'xtatish"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global jamlovchi
+stats_rollup = StatsRollup()
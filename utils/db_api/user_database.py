@@ -3,7 +3,8 @@ import psycopg2
 import psycopg2.extras
 from psycopg2 import pool as psycopg2_pool
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
 from dotenv import load_dotenv, find_dotenv
 
 from data.config import FREE_TRIALS_DEFAULT
@@ -20,6 +21,9 @@ USER_DB_CONFIG = {
     'port': os.getenv('USER_DB_PORT', '5432')
 }
 
+# Statistika kunlari (bugun / hafta / oy) shu mintaqa bo'yicha hisoblanadi
+STATS_TIMEZONE = ZoneInfo(os.getenv('STATS_TIMEZONE', 'Asia/Tashkent'))
+
 # ============================================================
 # CONNECTION POOL
 # ============================================================
@@ -171,6 +175,36 @@ def init_user_db():
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_rating_salesman ON seller_ratings(salesman_name)')
         print("✅ SELLER_RATINGS jadvali yaratildi")
 
+        # ===================== KUNLIK STATISTIKA JADVALLARI =====================
+        # stats_rollup.py fon vazifasi to'ldiradi, admin statistikasi o'qiydi
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_daily (
+                day DATE PRIMARY KEY,
+                new_users INTEGER NOT NULL DEFAULT 0,
+                active_users INTEGER NOT NULL DEFAULT 0,
+                pricings INTEGER NOT NULL DEFAULT 0,
+                free_pricings INTEGER NOT NULL DEFAULT 0,
+                paid_pricings INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_daily_models (
+                day DATE NOT NULL,
+                phone_model VARCHAR(255) NOT NULL,
+                pricings INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, phone_model)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_daily_users (
+                day DATE NOT NULL,
+                telegram_id BIGINT NOT NULL,
+                PRIMARY KEY (day, telegram_id)
+            )
+        ''')
+        print("✅ STATS_DAILY jadvallari yaratildi")
+
         conn.commit()
 
         # ===================== INDEKSLAR =====================
@@ -187,10 +221,15 @@ def init_user_db():
         # PRICING_HISTORY indekslari
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_pricing_user ON pricing_history(user_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_pricing_telegram ON pricing_history(telegram_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pricing_created ON pricing_history(created_at DESC)')
+        # Vaqt oralig'i + model / user: statistika va jamlanma so'rovlari
+        # indeksning o'zidan o'qiladi. Ular created_at bo'yicha saralashni
+        # ham qoplaydi — eski idx_pricing_created ortiqcha yozuv edi.
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pricing_created_model ON pricing_history(created_at, phone_model)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pricing_created_telegram ON pricing_history(created_at, telegram_id)')
+        cursor.execute('DROP INDEX IF EXISTS idx_pricing_created')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_pricing_free ON pricing_history(is_free_trial)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_pricing_model ON pricing_history(phone_model)')
-        print("✅ PRICING_HISTORY: 5 ta indeks")
+        print("✅ PRICING_HISTORY: 6 ta indeks")
 
         # PAYMENT_HISTORY indekslari
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_payment_user ON payment_history(user_id)')
@@ -203,7 +242,7 @@ def init_user_db():
 
         print("\n" + "=" * 60)
         print("✅ PostgreSQL user database tayyor!")
-        print("✅ Jami 13 ta indeks yaratildi")
+        print("✅ Jami 14 ta indeks yaratildi")
         print("=" * 60 + "\n")
 
         # VACUUM ANALYZE
@@ -444,73 +483,75 @@ def check_can_price(telegram_id):
         conn.close()
 
 
-def use_pricing(telegram_id, phone_model, storage, color, battery, sim_type, has_box, damage, price):
-    """Narxlash qilish va tarixga qo'shish"""
+def use_pricing(telegram_id, phone_model, storage, color, battery, sim_type, has_box, damage, price,
+                allow_balance=True):
+    """
+    Narxlash qilish va tarixga qo'shish — bitta atomar so'rov.
+
+    Bepul urinish, bo'lmasa (allow_balance=True da) balans yechiladi.
+    Ichki SELECT ... FOR UPDATE bir vaqtdagi ikkinchi chaqiruvni
+    kutdiradi, shart yangi qiymatlar bo'yicha qayta tekshiriladi.
+    """
     conn = get_user_conn()
     cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
     try:
-        # User olish
-        cursor.execute("SELECT * FROM users WHERE telegram_id = %s", (telegram_id,))
-        user = cursor.fetchone()
-
-        if not user:
-            return {
-                'success': False,
-                'error': 'User topilmadi'
-            }
-
-        user_dict = dict(user)
-        user_id = user_dict['id']
-        free_trials = user_dict.get('free_trials_left', 0)
-        balance = user_dict.get('balance', 0)
-
-        is_free_trial = False
-
-        # Bepul urinish
-        if free_trials > 0:
-            cursor.execute("""
-                UPDATE users 
-                SET free_trials_left = free_trials_left - 1,
-                    total_pricings = total_pricings + 1,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE telegram_id = %s
-            """, (telegram_id,))
-            is_free_trial = True
-
-        # Balansdan olish
-        elif balance > 0:
-            cursor.execute("""
-                UPDATE users 
-                SET balance = balance - 1,
-                    total_pricings = total_pricings + 1,
+        cursor.execute("""
+            WITH consumed AS (
+                UPDATE users AS u
+                SET free_trials_left = u.free_trials_left - c.is_free::int,
+                    balance = u.balance - (NOT c.is_free)::int,
+                    total_pricings = u.total_pricings + 1,
                     updated_at = CURRENT_TIMESTAMP
-                WHERE telegram_id = %s
-            """, (telegram_id,))
-            is_free_trial = False
+                FROM (
+                    SELECT id, COALESCE(free_trials_left, 0) > 0 AS is_free
+                    FROM users
+                    WHERE telegram_id = %(telegram_id)s
+                      AND (COALESCE(free_trials_left, 0) > 0
+                           OR (%(allow_balance)s AND COALESCE(balance, 0) > 0))
+                    FOR UPDATE
+                ) AS c
+                WHERE u.id = c.id
+                RETURNING u.id, c.is_free, u.free_trials_left, u.balance
+            ), history AS (
+                INSERT INTO pricing_history
+                (user_id, telegram_id, phone_model, storage, color, battery, sim_type, has_box, damage, price, is_free_trial)
+                SELECT id, %(telegram_id)s, %(phone_model)s, %(storage)s, %(color)s, %(battery)s,
+                       %(sim_type)s, %(has_box)s, %(damage)s, %(price)s, is_free
+                FROM consumed
+                RETURNING id
+            )
+            SELECT history.id AS pricing_id, consumed.is_free, consumed.free_trials_left, consumed.balance
+            FROM consumed, history
+        """, {
+            'telegram_id': telegram_id, 'phone_model': phone_model, 'storage': storage,
+            'color': color, 'battery': battery, 'sim_type': sim_type, 'has_box': has_box,
+            'damage': damage, 'price': price, 'allow_balance': allow_balance,
+        })
+        row = cursor.fetchone()
+        conn.commit()
 
-        else:
+        if row is None:
+            # Faqat muvaffaqiyatsiz holatda: xato sababini aniqlash
+            cursor.execute("SELECT 1 FROM users WHERE telegram_id = %s", (telegram_id,))
+            if cursor.fetchone() is None:
+                return {
+                    'success': False,
+                    'reason': 'User topilmadi',
+                    'error': 'User topilmadi'
+                }
             return {
                 'success': False,
+                'reason': 'no_credits',
                 'error': 'Balans yoki bepul urinish yo\'q'
             }
 
-        # Tarixga qo'shish
-        cursor.execute("""
-            INSERT INTO pricing_history 
-            (user_id, telegram_id, phone_model, storage, color, battery, sim_type, has_box, damage, price, is_free_trial)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """, (
-        user_id, telegram_id, phone_model, storage, color, battery, sim_type, has_box, damage, price, is_free_trial))
-
-        pricing_id = cursor.fetchone()['id']
-        conn.commit()
-
         return {
             'success': True,
-            'pricing_id': pricing_id,
-            'is_free_trial': is_free_trial,
+            'pricing_id': row['pricing_id'],
+            'is_free_trial': row['is_free'],
+            'free_trials_left': row['free_trials_left'],
+            'balance': row['balance'],
             'message': '✅ Narx tarixga qo\'shildi'
         }
 
@@ -519,6 +560,7 @@ def use_pricing(telegram_id, phone_model, storage, color, battery, sim_type, has
         print(f"❌ Use pricing xato: {e}")
         return {
             'success': False,
+            'reason': 'error',
             'error': str(e)
         }
     finally:
@@ -776,99 +818,178 @@ def get_user_history(telegram_id, limit=20):
         conn.close()
 
 
+# Admin statistikasi: users bo'yicha joriy holat bitta o'tishda, davrlar
+# bo'yicha sonlar esa stats_rollup.py to'ldiradigan kunlik jamlanmalardan
+# (pricing_history skan qilinmaydi).
+#
+# Davrlar STATS_TIMEZONE bo'yicha Python da hisoblanadi va so'rovga
+# parametr sifatida beriladi: created_at >= start AND created_at < end
+# (yarim ochiq oraliq) indeks bo'yicha o'qiladi, DATE(created_at) yoki
+# DATE_TRUNC(...) esa har bir qatorda funksiya hisoblatardi.
+
+def stats_today():
+    """Bugungi sana (STATS_TIMEZONE bo'yicha)"""
+    return datetime.now(STATS_TIMEZONE).date()
+
+
+def local_day_start(day):
+    """Kun boshi — STATS_TIMEZONE dagi yarim tun (aware datetime)"""
+    return datetime.combine(day, dt_time.min, tzinfo=STATS_TIMEZONE)
+
+
+def period_range(period, today=None):
+    """
+    Davr uchun [start, end) oraliq (aware datetime).
+
+    'daily' — bugun, 'weekly' — oxirgi 7 kun va bugun, 'monthly' — shu oy.
+    """
+    today = today or stats_today()
+    if period == 'daily':
+        first = today
+    elif period == 'weekly':
+        first = today - timedelta(days=7)
+    elif period == 'monthly':
+        first = today.replace(day=1)
+    else:
+        raise ValueError(f"Noma'lum davr: {period}")
+    return local_day_start(first), local_day_start(today + timedelta(days=1))
+
+
+def _period_days(today=None):
+    """stats_daily.day bilan solishtirish uchun davrlar boshi (sana)"""
+    today = today or stats_today()
+    return {
+        'today': today,
+        'week_start': today - timedelta(days=7),
+        'month_start': today.replace(day=1),
+    }
+
+
+def _users_summary(cursor):
+    """users jadvali bo'yicha joriy holat — bitta so'rov"""
+    cursor.execute("""
+        SELECT 
+            COUNT(*) as total_users,
+            COUNT(CASE WHEN is_active = TRUE THEN 1 END) as total_active_users,
+            COUNT(CASE WHEN is_active = FALSE THEN 1 END) as total_inactive_users,
+            COUNT(CASE WHEN phone_number IS NOT NULL AND phone_number != '' THEN 1 END) as users_with_phone,
+            COUNT(CASE WHEN balance > 0 THEN 1 END) as users_with_balance,
+            COUNT(CASE WHEN free_trials_left > 0 THEN 1 END) as users_with_free_trials,
+            COALESCE(SUM(balance), 0) as total_balance,
+            COALESCE(SUM(free_trials_left), 0) as total_free_trials
+        FROM users
+    """)
+    stats = {key: int(value or 0) for key, value in cursor.fetchone().items()}
+
+    total = stats['total_users']
+    stats['active_percentage'] = round(stats['total_active_users'] / total * 100, 1) if total else 0
+    stats['phone_percentage'] = round(stats['users_with_phone'] / total * 100, 1) if total else 0
+    return stats
+
+
+def _rollup_ready(cursor, today):
+    """stats_daily bugungacha jamlanganmi (birinchi to'ldirish tugaganmi)"""
+    cursor.execute("SELECT MAX(day) as last_day FROM stats_daily")
+    row = cursor.fetchone()
+    last_day = row['last_day'] if isinstance(row, dict) else row[0]
+    return last_day is not None and last_day >= today
+
+
+def _live_bounds(days):
+    """_period_days sanalari -> oraliq chegaralari (aware datetime)"""
+    return {
+        'today_start': local_day_start(days['today']),
+        'week_start': local_day_start(days['week_start']),
+        'month_start': local_day_start(days['month_start']),
+        'first': local_day_start(min(days['week_start'], days['month_start'])),
+        'end': local_day_start(days['today'] + timedelta(days=1)),
+    }
+
+
+def _live_summary(cursor, days):
+    """
+    Jamlanma hali tayyor bo'lmaganda o'sha sonlar to'g'ridan-to'g'ri:
+    davrlar indeksli oraliq bilan, jami sonlar esa butun jadval bo'yicha.
+    """
+    bounds = _live_bounds(days)
+    cursor.execute("""
+        SELECT 
+            COUNT(CASE WHEN created_at >= %(today_start)s THEN 1 END) as today_new_users,
+            COUNT(CASE WHEN created_at >= %(week_start)s THEN 1 END) as week_new_users,
+            COUNT(CASE WHEN created_at >= %(month_start)s THEN 1 END) as month_new_users
+        FROM users
+        WHERE created_at >= %(first)s AND created_at < %(end)s
+    """, bounds)
+    stats = {key: int(value or 0) for key, value in cursor.fetchone().items()}
+
+    cursor.execute("""
+        SELECT 
+            COUNT(DISTINCT CASE WHEN created_at >= %(today_start)s THEN telegram_id END) as today_active_users,
+            COUNT(DISTINCT CASE WHEN created_at >= %(month_start)s THEN telegram_id END) as month_active_users,
+            COUNT(CASE WHEN created_at >= %(today_start)s THEN 1 END) as today_pricings,
+            COUNT(CASE WHEN created_at >= %(month_start)s THEN 1 END) as month_pricings
+        FROM pricing_history
+        WHERE created_at >= %(first)s AND created_at < %(end)s
+    """, bounds)
+    stats.update({key: int(value or 0) for key, value in cursor.fetchone().items()})
+
+    cursor.execute("""
+        SELECT 
+            COUNT(*) as total_pricings,
+            COUNT(CASE WHEN is_free_trial = TRUE THEN 1 END) as free_pricings,
+            COUNT(CASE WHEN is_free_trial = FALSE THEN 1 END) as paid_pricings
+        FROM pricing_history
+    """)
+    stats.update({key: int(value or 0) for key, value in cursor.fetchone().items()})
+    return stats
+
+
+def _period_summary(cursor, days):
+    """Davrlar bo'yicha sonlar: jamlanmadan, u tayyor bo'lmasa — to'g'ridan-to'g'ri"""
+    if _rollup_ready(cursor, days['today']):
+        stats = _rollup_summary(cursor, days)
+        stats['rollup_ready'] = True
+    else:
+        stats = _live_summary(cursor, days)
+        stats['rollup_ready'] = False
+    return stats
+
+
+def _rollup_summary(cursor, days):
+    """Kun / hafta / oy bo'yicha sonlar — stats_daily dan"""
+    cursor.execute("""
+        SELECT 
+            SUM(CASE WHEN day = %(today)s THEN new_users ELSE 0 END) as today_new_users,
+            SUM(CASE WHEN day >= %(week_start)s THEN new_users ELSE 0 END) as week_new_users,
+            SUM(CASE WHEN day >= %(month_start)s THEN new_users ELSE 0 END) as month_new_users,
+            SUM(CASE WHEN day = %(today)s THEN active_users ELSE 0 END) as today_active_users,
+            SUM(pricings) as total_pricings,
+            SUM(CASE WHEN day = %(today)s THEN pricings ELSE 0 END) as today_pricings,
+            SUM(CASE WHEN day >= %(month_start)s THEN pricings ELSE 0 END) as month_pricings,
+            SUM(free_pricings) as free_pricings,
+            SUM(paid_pricings) as paid_pricings
+        FROM stats_daily
+    """, days)
+    stats = {key: int(value or 0) for key, value in cursor.fetchone().items()}
+
+    # Oylik aktivlar: kunlik sonlarni qo'shib bo'lmaydi (bir user bir necha kun)
+    cursor.execute("""
+        SELECT COUNT(DISTINCT telegram_id) as count 
+        FROM stats_daily_users 
+        WHERE day >= %(month_start)s
+    """, days)
+    stats['month_active_users'] = cursor.fetchone()['count'] or 0
+    return stats
+
+
 def get_users_statistics():
     """Umumiy foydalanuvchilar statistikasi - TO'LIQ"""
     conn = get_user_conn()
     cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
     try:
-        stats = {}
-
-        # ========== JAMI USERLAR ==========
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(CASE WHEN is_active = TRUE THEN 1 END) as active,
-                COUNT(CASE WHEN is_active = FALSE THEN 1 END) as inactive
-            FROM users
-        """)
-        user_counts = cursor.fetchone()
-        stats['total_users'] = user_counts['total'] or 0
-        stats['total_active_users'] = user_counts['active'] or 0
-        stats['total_inactive_users'] = user_counts['inactive'] or 0
-
-        # Aktiv foiz
-        if stats['total_users'] > 0:
-            stats['active_percentage'] = round((stats['total_active_users'] / stats['total_users']) * 100, 1)
-        else:
-            stats['active_percentage'] = 0
-
-        # ========== BUGUNGI STATISTIKA ==========
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM users 
-            WHERE DATE(created_at) = CURRENT_DATE
-        """)
-        stats['today_new_users'] = cursor.fetchone()['count'] or 0
-
-        # Bugungi aktiv userlar (bugun narxlash qilganlar)
-        cursor.execute("""
-            SELECT COUNT(DISTINCT telegram_id) as count 
-            FROM pricing_history 
-            WHERE DATE(created_at) = CURRENT_DATE
-        """)
-        stats['today_active_users'] = cursor.fetchone()['count'] or 0
-
-        # ========== HAFTALIK STATISTIKA ==========
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM users 
-            WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
-        """)
-        stats['week_new_users'] = cursor.fetchone()['count'] or 0
-
-        # ========== OYLIK STATISTIKA ==========
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM users 
-            WHERE DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE)
-        """)
-        stats['month_new_users'] = cursor.fetchone()['count'] or 0
-
-        # Oylik aktiv userlar (bu oyda narxlash qilganlar)
-        cursor.execute("""
-            SELECT COUNT(DISTINCT telegram_id) as count 
-            FROM pricing_history 
-            WHERE DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE)
-        """)
-        stats['month_active_users'] = cursor.fetchone()['count'] or 0
-
-        # ========== TELEFON STATISTIKASI ==========
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM users 
-            WHERE phone_number IS NOT NULL AND phone_number != ''
-        """)
-        stats['users_with_phone'] = cursor.fetchone()['count'] or 0
-
-        # Telefon foiz
-        if stats['total_users'] > 0:
-            stats['phone_percentage'] = round((stats['users_with_phone'] / stats['total_users']) * 100, 1)
-        else:
-            stats['phone_percentage'] = 0
-
-        # ========== BALANS STATISTIKASI ==========
-        cursor.execute("SELECT COUNT(*) as count FROM users WHERE balance > 0")
-        stats['users_with_balance'] = cursor.fetchone()['count'] or 0
-
-        cursor.execute("SELECT COUNT(*) as count FROM users WHERE free_trials_left > 0")
-        stats['users_with_free_trials'] = cursor.fetchone()['count'] or 0
-
-        # ========== NARXLASHLAR ==========
-        cursor.execute("SELECT COUNT(*) as count FROM pricing_history")
-        stats['total_pricings'] = cursor.fetchone()['count'] or 0
-
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM pricing_history 
-            WHERE DATE(created_at) = CURRENT_DATE
-        """)
-        stats['today_pricings'] = cursor.fetchone()['count'] or 0
+        stats = _users_summary(cursor)
+        stats.update(_period_summary(cursor, _period_days()))
 
         return {
             'success': True,
@@ -895,21 +1016,11 @@ def get_detailed_users_statistics():
     cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
     try:
-        stats = {}
-
-        # ========== USER STATISTIKASI ==========
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_users,
-                COUNT(CASE WHEN is_active = TRUE THEN 1 END) as active_users,
-                COUNT(CASE WHEN DATE(created_at) = CURRENT_DATE THEN 1 END) as today_users,
-                COUNT(CASE WHEN DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE) THEN 1 END) as month_users,
-                COUNT(CASE WHEN balance > 0 THEN 1 END) as users_with_balance,
-                COUNT(CASE WHEN free_trials_left > 0 THEN 1 END) as users_with_free_trials
-            FROM users
-        """)
-        user_stats = cursor.fetchone()
-        stats.update(dict(user_stats))
+        # ========== USER VA NARXLASH SONLARI ==========
+        days = _period_days()
+        stats = _users_summary(cursor)
+        stats.update(_period_summary(cursor, days))
+        ready = stats['rollup_ready']
 
         # ========== TOP 10 USERS ==========
         cursor.execute("""
@@ -918,6 +1029,7 @@ def get_detailed_users_statistics():
                 u.full_name,
                 u.username,
                 u.total_pricings,
+                u.total_pricings as pricing_count,
                 u.balance,
                 u.free_trials_left,
                 u.created_at
@@ -929,57 +1041,27 @@ def get_detailed_users_statistics():
         stats['top_users'] = [dict(row) for row in cursor.fetchall()]
 
         # ========== KUNLIK TREND (oxirgi 7 kun) ==========
-        cursor.execute("""
-            SELECT 
-                DATE(created_at) as date,
-                COUNT(*) as new_users
-            FROM users
-            WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
-            GROUP BY DATE(created_at)
-            ORDER BY date DESC
-        """)
+        if ready:
+            cursor.execute("""
+                SELECT 
+                    day as date,
+                    new_users
+                FROM stats_daily
+                WHERE day >= %(week_start)s AND new_users > 0
+                ORDER BY day DESC
+            """, days)
+        else:
+            cursor.execute("""
+                SELECT 
+                    (created_at::timestamptz AT TIME ZONE %(tz)s)::date as date,
+                    COUNT(*) as new_users
+                FROM users
+                WHERE created_at >= %(week_start)s AND created_at < %(end)s
+                GROUP BY 1
+                ORDER BY date DESC
+            """, {**_live_bounds(days), 'tz': STATS_TIMEZONE.key})
         stats['daily_trend'] = [dict(row) for row in cursor.fetchall()]
 
-        # ========== JAMI NARXLASHLAR ==========
-        cursor.execute("SELECT COUNT(*) as count FROM pricing_history")
-        stats['total_pricings'] = cursor.fetchone()['count'] or 0
-
-        cursor.execute("""
-            SELECT COUNT(*) as count 
-            FROM pricing_history 
-            WHERE DATE(created_at) = CURRENT_DATE
-        """)
-        stats['today_pricings'] = cursor.fetchone()['count'] or 0
-
-        cursor.execute("""
-            SELECT COUNT(*) as count 
-            FROM pricing_history 
-            WHERE DATE_TRUNC('month', created_at) = DATE_TRUNC('month', CURRENT_DATE)
-        """)
-        stats['month_pricings'] = cursor.fetchone()['count'] or 0
-
-        # ========== BEPUL VS PULLIK NARXLASHLAR ==========
-        cursor.execute("""
-            SELECT 
-                COUNT(CASE WHEN is_free_trial = TRUE THEN 1 END) as free_count,
-                COUNT(CASE WHEN is_free_trial = FALSE THEN 1 END) as paid_count
-            FROM pricing_history
-        """)
-        ratio = cursor.fetchone()
-        stats['free_pricings'] = ratio['free_count'] or 0
-        stats['paid_pricings'] = ratio['paid_count'] or 0
-
-        # ========== UMUMIY BALANS VA BEPUL URINISHLAR ==========
-        cursor.execute("""
-            SELECT 
-                COALESCE(SUM(balance), 0) as total_balance,
-                COALESCE(SUM(free_trials_left), 0) as total_free_trials
-            FROM users
-        """)
-        totals = cursor.fetchone()
-        stats['total_balance'] = int(totals['total_balance'])
-        stats['total_free_trials'] = int(totals['total_free_trials'])
-
         # ========== TO'LOVLAR STATISTIKASI ==========
         cursor.execute("""
             SELECT 
@@ -996,16 +1078,27 @@ def get_detailed_users_statistics():
         stats['pending_payments'] = payments['pending_payments'] or 0
 
         # ========== ENG KO'P NARXLANAYOTGAN TELEFONLAR ==========
-        cursor.execute("""
-            SELECT 
-                phone_model,
-                COUNT(*) as count
-            FROM pricing_history
-            WHERE phone_model IS NOT NULL AND phone_model != ''
-            GROUP BY phone_model
-            ORDER BY count DESC
-            LIMIT 10
-        """)
+        if ready:
+            cursor.execute("""
+                SELECT 
+                    phone_model,
+                    SUM(pricings) as count
+                FROM stats_daily_models
+                GROUP BY phone_model
+                ORDER BY count DESC
+                LIMIT 10
+            """)
+        else:
+            cursor.execute("""
+                SELECT 
+                    phone_model,
+                    COUNT(*) as count
+                FROM pricing_history
+                WHERE phone_model IS NOT NULL AND phone_model != ''
+                GROUP BY phone_model
+                ORDER BY count DESC
+                LIMIT 10
+            """)
         stats['top_phone_models'] = [dict(row) for row in cursor.fetchall()]
 
         return {
@@ -1042,11 +1135,14 @@ def get_all_users_count():
 
 
 def get_total_pricings():
-    """Jami narxlashlar soni"""
+    """Jami narxlashlar soni (kunlik jamlanmadan, u tayyor bo'lmasa — COUNT)"""
     conn = get_user_conn()
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT COUNT(*) FROM pricing_history")
+        if _rollup_ready(cursor, stats_today()):
+            cursor.execute("SELECT COALESCE(SUM(pricings), 0) FROM stats_daily")
+        else:
+            cursor.execute("SELECT COUNT(*) FROM pricing_history")
         return cursor.fetchone()[0] or 0
     except:
         return 0
@@ -1210,12 +1306,12 @@ def get_top_models_analytics(period='daily', limit=10):
     conn = get_user_conn()
     cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
     try:
-        if period == 'daily':
-            time_filter = "AND DATE(created_at) = CURRENT_DATE"
-        elif period == 'weekly':
-            time_filter = "AND created_at >= CURRENT_DATE - INTERVAL '7 days'"
-        else:
-            time_filter = ""
+        params = {'limit': limit}
+        time_filter = ""
+        if period in ('daily', 'weekly'):
+            # idx_pricing_created_model bo'yicha oraliq skan
+            time_filter = "AND created_at >= %(start)s AND created_at < %(end)s"
+            params['start'], params['end'] = period_range(period)
 
         cursor.execute(f"""
             SELECT
@@ -1227,8 +1323,8 @@ def get_top_models_analytics(period='daily', limit=10):
             {time_filter}
             GROUP BY phone_model
             ORDER BY count DESC
-            LIMIT %s
-        """, (limit,))
+            LIMIT %(limit)s
+        """, params)
         rows = cursor.fetchall()
         return {'success': True, 'models': [dict(r) for r in rows]}
     except Exception as e:
@@ -0,0 +1,358 @@
+# utils/price_import.py - EXCEL NARX IMPORTI (EVENT LOOP DAN TASHQARIDA)
+#
+# process_import() dagi qatorma-qator df.iterrows() o'rniga: har bir ustun
+# bir marta pandas str amallari bilan tozalanadi, damage esa faqat unikal
+# qiymatlar bo'yicha normallashtiriladi (memo map).
+#
+# import_price_sheet() butunlay process pool da bajariladi: varaq bo'laklab
+# o'qiladi va har bir bo'lak parse qilinib, shu worker ning o'zida COPY ga
+# beriladi — xotira fayl hajmiga bog'liq emas, asosiy jarayonga faqat
+# natija sonlari qaytadi. Progress Manager navbati orqali keladi, bot shu
+# paytda ham boshqa foydalanuvchilarga odatdagidek javob beradi.
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.db_api.database import (
+    get_conn,
+    normalize_damage_format,
+    notify_catalog_changed,
+    PriceCopyLoader,
+)
+from tel_narxlash.botapp.excel_reader import ExcelSheetReader
+
+logger = logging.getLogger(__name__)
+
+# Bitta COPY bo'lagidagi qatorlar soni
+COPY_CHUNK_SIZE = 10000
+
+# Natija ustunlari (tartib PriceCopyLoader qatori bilan bir xil, model_id dan tashqari)
+PARSED_COLUMNS = ('model', 'storage', 'color', 'sim', 'battery', 'box', 'damage', 'price')
+
+_BOX_YES_PATTERN = 'bor|ha|yes|1'
+
+
+def _text_column(df, col_name, default):
+    """get_cell_value() ning ustun bo'yicha ekvivalenti"""
+    if not col_name or col_name not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[col_name].fillna(default).astype(str).str.strip()
+
+
+def parse_price_frame(df, col_map):
+    """
+    Excel DataFrame ni narxlar jadvaliga tayyorlash.
+
+    Qaytaradi: (parsed, skipped) — parsed PARSED_COLUMNS ustunli DataFrame,
+    skipped — model nomi yo'q yoki narxi <= 0 bo'lgan qatorlar soni.
+    """
+    total = len(df)
+
+    model = _text_column(df, col_map.get('model'), '')
+    price_raw = _text_column(df, col_map.get('price'), '0')
+    price = pd.to_numeric(
+        price_raw.str.replace(r'[^\d.]', '', regex=True),
+        errors='coerce'
+    ).fillna(0).to_numpy(dtype=np.float64)
+
+    keep = (model != '').to_numpy() & (price > 0)
+    skipped = int(total - keep.sum())
+
+    df = df.loc[keep]
+    model = model[keep]
+
+    sim_raw = _text_column(df, col_map.get('sim'), 'physical')
+    sim = np.where(sim_raw.str.lower().str.contains('esim', regex=False), 'esim', 'physical')
+
+    box_raw = _text_column(df, col_map.get('box'), 'Bor')
+    box = box_raw.str.lower().str.contains(_BOX_YES_PATTERN, regex=True).to_numpy(dtype=bool)
+
+    damage_raw = _text_column(df, col_map.get('damage'), 'Yangi')
+    damage_map = {value: normalize_damage_format(value) for value in damage_raw.unique()}
+
+    parsed = pd.DataFrame({
+        'model': model.to_numpy(dtype=object),
+        'storage': _text_column(df, col_map.get('storage'), '128GB').to_numpy(dtype=object),
+        'color': _text_column(df, col_map.get('color'), '').to_numpy(dtype=object),
+        'sim': sim.astype(object),
+        'battery': _text_column(df, col_map.get('battery'), '100%').to_numpy(dtype=object),
+        'box': box,
+        'damage': damage_raw.map(damage_map).to_numpy(dtype=object),
+        'price': price[keep],
+    })
+    return parsed, skipped
+
+
+def detect_columns(df_columns):
+    """Ustunlarni avtomatik aniqlash"""
+    mapping = {
+        'model': None,
+        'storage': None,
+        'color': None,
+        'sim': None,
+        'battery': None,
+        'box': None,
+        'damage': None,
+        'price': None
+    }
+
+    # Model
+    for col in df_columns:
+        col_lower = col.lower()
+        if 'model' in col_lower or 'телефон' in col_lower:
+            mapping['model'] = col
+            break
+
+    # Storage
+    for col in df_columns:
+        col_lower = col.lower()
+        if 'xotira' in col_lower or 'storage' in col_lower or 'память' in col_lower or 'gb' in col_lower:
+            mapping['storage'] = col
+            break
+
+    # Color
+    for col in df_columns:
+        col_lower = col.lower()
+        if 'rang' in col_lower or 'color' in col_lower or 'цвет' in col_lower:
+            mapping['color'] = col
+            break
+
+    # SIM
+    for col in df_columns:
+        col_lower = col.lower()
+        if 'sim' in col_lower:
+            mapping['sim'] = col
+            break
+
+    # Battery
+    for col in df_columns:
+        col_lower = col.lower()
+        if 'batar' in col_lower or 'battery' in col_lower or 'батарея' in col_lower or 'akkum' in col_lower:
+            mapping['battery'] = col
+            break
+
+    # Box
+    for col in df_columns:
+        col_lower = col.lower()
+        if 'quti' in col_lower or 'box' in col_lower or 'коробка' in col_lower:
+            mapping['box'] = col
+            break
+
+    # Damage
+    for col in df_columns:
+        col_lower = col.lower()
+        if 'qism' in col_lower or 'damage' in col_lower or 'повреж' in col_lower or 'част' in col_lower:
+            mapping['damage'] = col
+            break
+
+    # Price
+    for col in df_columns:
+        col_lower = col.lower()
+        if 'narx' in col_lower or 'price' in col_lower or 'цена' in col_lower or 'сум' in col_lower or 'usd' in col_lower:
+            mapping['price'] = col
+            break
+
+    return mapping
+
+
+def _upsert_models_and_params(cursor, parsed, model_ids):
+    """
+    Modellar va ularning parametrlarini qo'shish. model_ids (model nomi ->
+    id) to'ldiriladi; unda bor modellar qayta so'ralmaydi.
+    """
+    for model_name in parsed['model'].unique():
+        if model_name in model_ids:
+            continue
+        cursor.execute(
+            "INSERT INTO models (name) VALUES (%s) ON CONFLICT (name) DO NOTHING RETURNING id",
+            (model_name,)
+        )
+        result = cursor.fetchone()
+        if result:
+            model_ids[model_name] = result[0]
+        else:
+            cursor.execute("SELECT id FROM models WHERE name = %s", (model_name,))
+            model_ids[model_name] = cursor.fetchone()[0]
+
+    # Parametrlarni yig'ish (unikal juftliklar)
+    params = parsed[['model', 'storage', 'color', 'battery', 'sim']].drop_duplicates()
+    params = params.assign(model_id=params['model'].map(model_ids)).dropna(subset=['model_id'])
+    params['model_id'] = params['model_id'].astype(int)
+
+    for model_id, storage in params[['model_id', 'storage']].drop_duplicates().itertuples(index=False):
+        cursor.execute(
+            "INSERT INTO storages (model_id, size) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+            (model_id, storage)
+        )
+
+    colors = params.loc[params['color'] != '', ['model_id', 'color']].drop_duplicates()
+    for model_id, color in colors.itertuples(index=False):
+        cursor.execute(
+            "INSERT INTO colors (model_id, name) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+            (model_id, color)
+        )
+
+    for model_id, battery in params[['model_id', 'battery']].drop_duplicates().itertuples(index=False):
+        cursor.execute(
+            "INSERT INTO batteries (model_id, label) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+            (model_id, battery)
+        )
+
+    for model_id, sim_type in params[['model_id', 'sim']].drop_duplicates().itertuples(index=False):
+        cursor.execute(
+            "INSERT INTO sim_types (model_id, type) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+            (model_id, sim_type)
+        )
+
+
+def import_price_sheet(file_path, progress=None):
+    """
+    Excel faylni o'qib, bo'lakma-bo'lak bazaga yozish (process pool da ishlaydi).
+
+    Har bir ExcelSheetReader bo'lagi shu zahoti parse qilinadi, modellari
+    qo'shiladi va PriceCopyLoader ga COPY qilinadi — xotirada bir vaqtda
+    faqat bitta bo'lak turadi, to'liq DataFrame yig'ilmaydi va asosiy
+    jarayonga qaytarilmaydi.
+
+    progress — multiprocessing.Manager().Queue() (yoki None); unga
+    hodisalar yuboriladi:
+      ('copy', yuklangan, taxminiy_jami)
+      ('merge', yuklangan)
+
+    Qaytaradi: {'total_rows', 'col_map', 'can_parse', 'skipped',
+    'valid_count', 'success_count', 'error_count'}.
+    """
+    report = progress.put if progress is not None else (lambda event: None)
+
+    with ExcelSheetReader(file_path) as reader:
+        col_map = detect_columns(reader.header)
+        can_parse = bool(col_map['model'] and col_map['price'])
+        skipped = valid_count = error_count = success_count = 0
+
+        if not can_parse:
+            for _ in reader.iter_batches():
+                pass  # faqat qatorlarni sanaymiz
+        else:
+            model_ids = {}
+            conn = get_conn()
+            try:
+                with PriceCopyLoader() as loader:
+                    for batch in reader.iter_batches():
+                        df = pd.DataFrame.from_records(batch.rows, columns=reader.header)
+                        parsed, batch_skipped = parse_price_frame(df, col_map)
+                        skipped += batch_skipped
+                        valid_count += len(parsed)
+                        if parsed.empty:
+                            continue
+
+                        # Rollback bo'lsa bekor qilingan id lar model_ids ga tushmasin
+                        batch_ids = dict(model_ids)
+                        cursor = conn.cursor()
+                        try:
+                            _upsert_models_and_params(cursor, parsed, batch_ids)
+                            conn.commit()
+                            model_ids = batch_ids
+                        except Exception as e:
+                            logger.error(f"❌ Modellar/parametrlarni qo'shishda xato: {e}")
+                            conn.rollback()
+                        finally:
+                            cursor.close()
+
+                        model_id_col = parsed['model'].map(model_ids)
+                        known = model_id_col.notna().to_numpy()
+                        error_count += int(len(parsed) - known.sum())
+
+                        rows = parsed.loc[known]
+                        columns = [model_id_col[known].astype(int).to_numpy()] + [
+                            rows[col].to_numpy() for col in PARSED_COLUMNS[1:]
+                        ]
+                        for start in range(0, len(rows), COPY_CHUNK_SIZE):
+                            end = min(start + COPY_CHUNK_SIZE, len(rows))
+                            loader.copy_rows(zip(*(column[start:end] for column in columns)))
+                        report(('copy', loader.staged, max(reader.expected_rows, reader.total_rows)))
+
+                    if loader.staged:
+                        report(('merge', loader.staged))
+                        success_count = loader.merge()
+            finally:
+                conn.close()
+
+        total_rows = reader.total_rows
+
+    # Bot keshlari (menyular, narx indeksi) NOTIFY orqali yangilanadi
+    if success_count:
+        try:
+            conn = get_conn()
+            cursor = conn.cursor()
+            notify_catalog_changed(cursor)
+            conn.commit()
+            cursor.close()
+            conn.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Katalog NOTIFY yuborilmadi: {e}")
+
+    return {
+        'total_rows': total_rows,
+        'col_map': col_map,
+        'can_parse': can_parse,
+        'skipped': skipped,
+        'valid_count': valid_count,
+        'success_count': success_count,
+        'error_count': error_count,
+    }
+
+
+def next_progress_event(progress):
+    """
+    progress navbatidagi eng so'nggi hodisa (worker thread da chaqiriladi).
+
+    Birinchi hodisani kutadi, qolganlarini tashlab yuboradi — Telegram
+    sekin bo'lsa faqat oxirgi holat ko'rsatiladi. None (tugadi) tashlanmaydi.
+    """
+    event = progress.get()
+    while event is not None and not progress.empty():
+        event = progress.get_nowait()
+    return event
+
+
+# ============================================================
+# PROCESS POOL
+# ============================================================
+
+_executor = None
+_manager = None
+
+
+# fork bot jarayonining event loop, ochiq socket va thread larini (asyncpg
+# pool, aiohttp sessiya) worker ga nusxalaydi — spawn toza jarayon ochadi
+_mp_context = multiprocessing.get_context('spawn')
+
+
+def get_import_executor():
+    """Excel import uchun process pool (bir marta yaratiladi)"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=_mp_context)
+    return _executor
+
+
+def new_progress_queue():
+    """Worker jarayondan progress olish uchun navbat (Manager bir marta yaratiladi)"""
+    global _manager
+    if _manager is None:
+        _manager = _mp_context.Manager()
+    return _manager.Queue()
+
+
+def shutdown_import_executor():
+    """Process pool va Manager ni yopish (on_shutdown)"""
+    global _executor, _manager
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _manager is not None:
+        _manager.shutdown()
+        _manager = None